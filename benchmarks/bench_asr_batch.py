@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+ASRバッチ窓とスループットのトレードオフ
+複数ストリームの発話終了がばらついて届く状況を再現し、窓ごとに
+スループット（発話/秒）・発話終了→認識結果の遅延・平均バッチサイズを表示する。
+faster-whisperが無い場合（または--fake）は代替バックエンドのコストモデルで計測する。
+
+    uv run python -m benchmarks.bench_asr_batch --streams 8 --windows 0 25 50 100 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import numpy as np
+
+from src.audio.asr import BatchedASR
+from src.core.config import load_config
+from benchmarks.fakes import FakeASR
+from benchmarks.run import load_fixture
+
+RATE = 16000
+
+
+def load_asr(config_path: str, fake: bool):
+    if not fake:
+        try:
+            from src.audio.asr import ASR
+            asr = ASR(load_config(config_path).asr)
+            asr.warm_up()
+            return asr, f"faster-whisper:{asr.config.model_size}"
+        except Exception as e:
+            print(f"ASR unavailable, using fake: {e}")
+    return FakeASR(rtf=0.1, overhead_s=0.05), "fake"
+
+
+class DecodeTimer:
+    """ASRのデコード処理（単発・バッチ）が1つ以上動いていた時間の合計を計る"""
+
+    def __init__(self, asr):
+        self.busy_s = 0.0
+        self.active = 0
+        self.since = 0.0
+        self.lock = threading.Lock()
+        asr._transcribe = self.wrap(asr._transcribe)
+        asr._transcribe_batch = self.wrap(asr._transcribe_batch)
+
+    def wrap(self, func):
+        def timed(*args):
+            with self.lock:
+                if self.active == 0:
+                    self.since = time.perf_counter()
+                self.active += 1
+            try:
+                return func(*args)
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    if self.active == 0:
+                        self.busy_s += time.perf_counter() - self.since
+        return timed
+
+
+async def replay(asr, timer: DecodeTimer, window_ms: int, arrivals: list[float], audio: np.ndarray) -> dict:
+    """arrivals[i]秒後に発話iが終わったものとして認識を要求"""
+    busy_before = timer.busy_s
+    target = BatchedASR(asr, window_ms, max_batch=len(arrivals)) if window_ms > 0 else asr
+    latencies = []
+    origin = time.perf_counter()
+
+    async def request(at: float):
+        await asyncio.sleep(max(0.0, at - (time.perf_counter() - origin)))
+        start = time.perf_counter()
+        await target.transcribe(audio)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(request(at) for at in arrivals))
+    busy = timer.busy_s - busy_before
+    return {
+        "window_ms": window_ms,
+        # デコードに使った時間あたりの処理発話数（到着間隔の待ちは含めない）
+        "throughput_per_s": len(arrivals) / busy if busy else 0.0,
+        "latency_p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "latency_p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        "mean_batch": target.utterances / target.batches if window_ms > 0 and target.batches else 1.0,
+    }
+
+
+async def main_async(args):
+    asr, backend = load_asr(args.config, args.fake)
+    audio = load_fixture(args.fixture, RATE, tail_silence_s=0.0)
+    rng = random.Random(0)
+    # ストリームごとにturn_interval_s間隔で発話が終わり、終了時刻はspread_msの範囲でばらつく
+    arrivals = sorted(
+        turn * args.turn_interval_s + rng.uniform(0, args.spread_ms / 1000)
+        for _ in range(args.streams)
+        for turn in range(args.turns)
+    )
+    timer = DecodeTimer(asr)
+    results = [await replay(asr, timer, window, arrivals, audio) for window in args.windows]
+    print(json.dumps({
+        "backend": backend,
+        "streams": args.streams,
+        "utterance_s": round(len(audio) / RATE, 2),
+        "results": results,
+    }, ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", default="resource/hello.wav")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--fake", action="store_true")
+    parser.add_argument("--streams", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--turn-interval-s", type=float, default=3.0)
+    parser.add_argument("--spread-ms", type=float, default=300, help="同じターンの発話終了時刻のばらつき")
+    parser.add_argument("--windows", type=int, nargs="*", default=[0, 25, 50, 100, 200])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+ASRモデルルーティング（asr.fast_model_size）の遅延と認識精度
+正解テキスト付きの発話を大きいモデルのみ・ルーティングありの両方でデコードし、
+経路（main / fast / fast_fallback）ごとの件数・遅延・文字誤り率（CER）を表示する。
+faster-whisperとモデルが必要（代替バックエンドでは精度が測れないため）。
+
+    uv run python -m benchmarks.bench_asr_route --fast-model tiny --manifest utterances.jsonl
+    uv run python -m benchmarks.bench_asr_route --fast-model tiny --reference "こんにちは"
+
+manifestは1行1発話のJSONL: {"wav": "path/to.wav", "text": "正解テキスト"}
+--archiveはprivacy.save_audioで保存したアーカイブを使い、保存時の認識結果（"reference"があればそちら）を正解とする。
+
+    uv run python -m benchmarks.bench_asr_route --fast-model tiny --archive logs/archive
+"""
+import argparse
+import json
+import time
+import unicodedata
+from collections import defaultdict
+import numpy as np
+
+from src.audio.asr import ASR
+from src.core.archive import iter_archive
+from src.core.config import load_config
+from benchmarks.run import load_fixture
+
+RATE = 16000
+IGNORED = {"P", "Z"}  # 句読点・空白は比較しない
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    return "".join(c for c in text if unicodedata.category(c)[0] not in IGNORED)
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def load_utterances(args) -> list[tuple[str, np.ndarray, str]]:
+    if args.archive:
+        return [
+            (f"{record.get('stream')}#{record['turn_id']}", pcm, record.get("reference", record.get("transcript", "")))
+            for record, pcm in iter_archive(args.archive)
+            if pcm is not None and len(pcm)
+        ]
+    if args.manifest:
+        with open(args.manifest, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+    else:
+        entries = [{"wav": args.fixture, "text": args.reference}]
+    return [(e["wav"], load_fixture(e["wav"], RATE, tail_silence_s=0.0), e["text"]) for e in entries]
+
+
+def summarize(rows: list[dict]) -> dict:
+    latencies = [r["latency_ms"] for r in rows]
+    errors = sum(r["errors"] for r in rows)
+    chars = sum(r["chars"] for r in rows)
+    return {
+        "utterances": len(rows),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "cer": round(errors / chars, 4) if chars else 0.0,
+    }
+
+
+def measure(decode, utterances, repeat: int) -> list[dict]:
+    rows = []
+    for _ in range(repeat):
+        for path, audio, reference in utterances:
+            start = time.perf_counter()
+            decoded, route = decode(audio)
+            latency = time.perf_counter() - start
+            reference = normalize(reference)
+            rows.append({
+                "wav": path,
+                "route": route,
+                "duration_s": round(len(audio) / RATE, 2),
+                "latency_ms": latency * 1000,
+                "errors": edit_distance(normalize(decoded.text), reference),
+                "chars": len(reference),
+                "avg_logprob": round(decoded.avg_logprob, 3),
+                "no_speech_prob": round(decoded.no_speech_prob, 3),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--manifest", help="正解テキスト付き発話のJSONL")
+    parser.add_argument("--archive", help="アーカイブのディレクトリ（privacy.save_audio）")
+    parser.add_argument("--fixture", default="resource/hello.wav")
+    parser.add_argument("--reference", default="", help="--fixtureの正解テキスト")
+    parser.add_argument("--fast-model", help="asr.fast_model_sizeを上書き（例: tiny）")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--verbose", action="store_true", help="発話ごとの結果も表示")
+    args = parser.parse_args()
+
+    config = load_config(args.config).asr
+    if args.fast_model:
+        config = config.model_copy(update={"fast_model_size": args.fast_model})
+    if not config.fast_model_size:
+        parser.error("asr.fast_model_size is not set (use --fast-model)")
+    asr = ASR(config)
+    asr.warm_up()
+    utterances = load_utterances(args)
+
+    baseline = measure(lambda audio: (asr._decode(asr.model, audio), "main"), utterances, args.repeat)
+    routed = measure(asr._decode_routed, utterances, args.repeat)
+    by_route = defaultdict(list)
+    for row in routed:
+        by_route[row["route"]].append(row)
+
+    report = {
+        "model": config.model_size,
+        "fast_model": config.fast_model_size,
+        "main_only": summarize(baseline),
+        "routed": summarize(routed),
+        "routes": {route: summarize(rows) for route, rows in sorted(by_route.items())},
+    }
+    if args.verbose:
+        report["utterances"] = routed[:len(utterances)]
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+再生用オーディオフォーマット変換のベンチマーク
+WAVデコード・int16/float32変換・リサンプリングを素朴な実装と比較する
+
+    uv run python -m benchmarks.bench_audio_format
+"""
+import argparse
+import io
+import struct
+import time
+import wave
+import numpy as np
+from scipy.signal import resample, resample_poly
+
+from src.audio.format import (
+    convert_pcm,
+    float32_to_int16,
+    int16_to_float32,
+    parse_wav,
+    resample as poly_resample,
+)
+
+
+def make_wav(seconds: float, rate: int) -> bytes:
+    """テスト用のWAV（正弦波+ノイズ）を生成"""
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.05 * np.random.default_rng(0).standard_normal(len(t))
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(float32_to_int16(signal.astype(np.float32)).tobytes())
+    return buf.getvalue()
+
+
+def bench(fn, repeat: int) -> float:
+    """1回あたりの平均秒数"""
+    fn()  # ウォームアップ
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def naive_decode(data: bytes) -> list[float]:
+    with wave.open(io.BytesIO(data), "rb") as wav_file:
+        frames = wav_file.readframes(wav_file.getnframes())
+    return [s / 32768.0 for s in struct.unpack(f"<{len(frames) // 2}h", frames)]
+
+
+def wave_decode(data: bytes) -> np.ndarray:
+    with wave.open(io.BytesIO(data), "rb") as wav_file:
+        frames = wav_file.readframes(wav_file.getnframes())
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def linear_resample(x: np.ndarray, src: int, dst: int) -> np.ndarray:
+    n_out = int(len(x) * dst / src)
+    return np.interp(np.linspace(0, len(x) - 1, n_out), np.arange(len(x)), x).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="音声の長さ（秒）")
+    parser.add_argument("--src-rate", type=int, default=24000, help="元のレート（VOICEVOXは24kHz）")
+    parser.add_argument("--dst-rate", type=int, default=48000, help="出力デバイスのレート")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    data = make_wav(args.seconds, args.src_rate)
+    pcm = parse_wav(data).samples
+    x = int16_to_float32(pcm)
+    src, dst = args.src_rate, args.dst_rate
+
+    cases = [
+        ("decode", "wave + struct + list", lambda: naive_decode(data)),
+        ("decode", "wave + np.frombuffer", lambda: wave_decode(data)),
+        ("decode", "parse_wav (memoryview)", lambda: int16_to_float32(parse_wav(data).samples)),
+        ("int16->f32", "python loop", lambda: [s / 32768.0 for s in pcm.tolist()]),
+        ("int16->f32", "vectorized", lambda: int16_to_float32(pcm)),
+        ("f32->int16", "python loop", lambda: [int(max(-1.0, min(1.0, s)) * 32767) for s in x.tolist()]),
+        ("f32->int16", "vectorized", lambda: float32_to_int16(x)),
+        ("resample", "np.interp (linear)", lambda: linear_resample(x, src, dst)),
+        ("resample", "scipy FFT resample", lambda: resample(x, int(len(x) * dst / src))),
+        ("resample", "resample_poly (per-call design)", lambda: resample_poly(x, dst, src)),
+        ("resample", "cached polyphase", lambda: poly_resample(x, src, dst)),
+        ("end-to-end", "convert_pcm", lambda: convert_pcm(pcm.data, src, dst)),
+    ]
+
+    print(f"{args.seconds:.1f}s audio, {src}Hz -> {dst}Hz, {args.repeat} runs")
+    print(f"{'stage':<12} {'method':<34} {'ms/call':>10} {'x realtime':>12}")
+    for stage, method, fn in cases:
+        # 純Pythonのループは遅いので回数を抑える
+        seconds = bench(fn, 1 if "loop" in method or "list" in method else args.repeat)
+        print(f"{stage:<12} {method:<34} {seconds * 1000:>10.2f} {args.seconds / seconds:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+投機的デコーディング（llm.speculative）と通常のcreate_completionの比較
+典型的な発話（ツール結果の読み上げを含む）のプロンプトで生成し、
+方式ごとのトークン/秒・下書きの受理率・通常生成との出力一致を表示する（GGUFモデルが必要）。
+
+    uv run python -m benchmarks.bench_llm_speculative
+    uv run python -m benchmarks.bench_llm_speculative --draft-gguf models/llm/draft-q4_k_m.gguf --temp 0
+"""
+import argparse
+import json
+import time
+
+from src.core.config import load_config
+from src.nlp.agent import Agent, Conversation
+from src.nlp.llm import LocalLLM
+from src.tools.clock import ClockTool
+from src.tools.iot_mock import IoTMockTool
+
+# (履歴, 発話)
+SCENARIOS = [
+    ([], "電気つけて"),
+    ([], "今何時？"),
+    ([], "エアコンを消して、テレビをつけて"),
+    ([], "買い物リストを読み上げて。牛乳、卵、食パン、バナナ、醤油"),
+    (
+        [{
+            "human": "リビングの電気の状態は？",
+            "assistant": "<tool:iot_mock device=light action=status>\n[iot_mockの結果: 電気はついています]\n",
+        }],
+        "じゃあ消して、消えたか教えて"
+    ),
+]
+
+
+def build_prompts(system_prompt: str) -> list[str]:
+    agent = Agent(None, {"clock": ClockTool(), "iot_mock": IoTMockTool()}, system_prompt)
+    prompts = []
+    for history, text in SCENARIOS:
+        conversation = Conversation()
+        conversation.history.extend(history)
+        prompts.append(agent._build_prompt(text, conversation))
+    return prompts
+
+
+def run_mode(config, prompts: list[str], runs: int) -> dict:
+    llm = LocalLLM(config)
+    if llm.llm is None:
+        return {"skipped": "model unavailable"}
+    llm.warm_up()
+    outputs = []
+    tokens = 0
+    elapsed = 0.0
+    for _ in range(runs):
+        for prompt in prompts:
+            # プロンプト再利用の影響を揃えるため毎回KVキャッシュを捨てる
+            llm.llm.reset()
+            start = time.perf_counter()
+            text = llm.generate(prompt)
+            elapsed += time.perf_counter() - start
+            tokens += len(llm.llm.tokenize(text.encode("utf-8"), add_bos=False))
+            outputs.append(text)
+    result = {
+        "tokens": tokens,
+        "tokens_per_s": round(tokens / elapsed, 2) if elapsed else 0.0,
+        "mean_latency_ms": round(elapsed / len(outputs) * 1000, 1),
+    }
+    if llm.draft is not None:
+        result["draft_proposed"] = llm.draft.proposed
+        result["draft_accepted"] = llm.draft.accepted
+        result["acceptance"] = round(llm.draft.accepted / llm.draft.proposed, 3) if llm.draft.proposed else None
+    return result | {"outputs": outputs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--draft-gguf", help="draft方式も計測する場合の小さいモデル")
+    parser.add_argument("--draft-tokens", type=int, help="llm.draft_tokensを上書き")
+    parser.add_argument("--temp", type=float, help="llm.tempを上書き（0で貪欲、出力一致の比較向け）")
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--verbose", action="store_true", help="生成結果も表示")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    try:
+        with open(config.agent.system_prompt_path, encoding="utf-8") as f:
+            system_prompt = f.read()
+    except FileNotFoundError:
+        system_prompt = "あなたは親しみやすい音声アシスタントです。"
+    prompts = build_prompts(system_prompt)
+
+    update = {}
+    if args.temp is not None:
+        update["temp"] = args.temp
+    if args.draft_tokens is not None:
+        update["draft_tokens"] = args.draft_tokens
+    modes = {"off": {}, "prompt_lookup": {}}
+    if args.draft_gguf:
+        modes["draft"] = {"draft_gguf_path": args.draft_gguf}
+
+    results = {}
+    for mode, extra in modes.items():
+        llm_config = config.llm.model_copy(update=update | extra | {"speculative": mode})
+        results[mode] = run_mode(llm_config, prompts, args.runs)
+
+    baseline = results["off"].get("outputs")
+    for mode, result in results.items():
+        outputs = result.pop("outputs", None)
+        if baseline and outputs and mode != "off":
+            # 貪欲生成（--temp 0）なら投機的デコーディングでも出力は同じになるはず
+            result["same_output"] = round(sum(a == b for a, b in zip(outputs, baseline)) / len(baseline), 3)
+            if results["off"]["tokens_per_s"]:
+                result["speedup"] = round(result["tokens_per_s"] / results["off"]["tokens_per_s"], 2)
+        if args.verbose and outputs:
+            result["outputs"] = outputs[:len(prompts)]
+
+    print(json.dumps({
+        "model": config.llm.gguf_path,
+        "prompts": len(prompts),
+        "temp": update.get("temp", config.llm.temp),
+        "results": results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+フレームごとのログ出力のオーバーヘッド
+Wake/VADに録音済みWAVを30msフレームで流し、Wakeスコアが毎フレームデバッグログに出る状況で
+1フレームの処理時間を比較する。遅いコンソールは1回の書き込みごとにconsole-delay-ms待つストリームで模擬する。
+
+- before: 同期のstderrシンク、間引き無し（毎フレーム書き込み）
+- queued: 書き込みを専用スレッドへ（logging.enqueue）
+- after: queued＋呼び出し箇所ごとの間引き（Throttle）
+
+    uv run python -m benchmarks.bench_logging
+    uv run python -m benchmarks.bench_logging --console-delay-ms 5 --frames 2000
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+from src.audio import wake_vad as wake_vad_module
+from src.audio.wake_vad import WakeAndVAD
+from src.core.config import load_config
+from src.core.logging import setup_logging
+from benchmarks.run import RATE, chunks, load_fixture
+
+from loguru import logger
+
+CHUNK_MS = 30  # OpenWakeWordの判定は400サンプル以上のフレームのみ
+
+
+class SlowStream:
+    """書き込みごとにdelay_s待つコンソール（出力は捨てる）"""
+
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+        self.devnull = open(os.devnull, "w")
+        self.writes = 0
+
+    def write(self, message: str):
+        self.writes += 1
+        self.devnull.write(message)
+        time.sleep(self.delay_s)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+class ScoringWakeModel:
+    """OpenWakeWord互換。検出はしないがログに出るスコア（0.05超）を毎回返す"""
+
+    def __init__(self, keywords: int):
+        self.scores = {f"keyword_{i}": 0.1 for i in range(keywords)}
+        self.prediction_buffer = {keyword: [] for keyword in self.scores}
+
+    def predict(self, audio_int16: np.ndarray) -> dict[str, float]:
+        return self.scores
+
+    def reset(self):
+        pass
+
+
+def run_mode(config, frames: list, enqueue: bool, throttle: bool, args) -> dict:
+    stream = SlowStream(args.console_delay_ms / 1000)
+    setup_logging(level="DEBUG", enqueue=enqueue, stream=stream)
+    throttles = (wake_vad_module.WAKE_PREDICTION_LOG,)
+    saved = [t.interval_s for t in throttles]
+    if not throttle:
+        for t in throttles:
+            t.interval_s = 0.0  # 間引き無し（従来どおり毎回出力）
+    try:
+        wake_vad = WakeAndVAD(config.wake.model_copy(update={"enabled": False}), config.vad)
+        wake_vad.wake_model = ScoringWakeModel(args.keywords)
+        state = wake_vad.new_state()
+        per_frame = []
+        for frame in frames:
+            start = time.perf_counter()
+            wake_vad._detect_wake_word(frame, state)
+            wake_vad._is_speech(frame, state=state)
+            per_frame.append(time.perf_counter() - start)
+    finally:
+        for t, interval_s in zip(throttles, saved):
+            t.interval_s = interval_s
+        logger.remove()  # キューに残った分を書き出して止める
+    per_frame_ms = np.array(per_frame) * 1000
+    return {
+        "enqueue": enqueue,
+        "throttle": throttle,
+        "mean_ms": round(float(per_frame_ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(per_frame_ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(per_frame_ms, 95)), 4),
+        "max_ms": round(float(per_frame_ms.max()), 3),
+        # チャンク長を超えたフレームは実時間では入力の取りこぼしにつながる
+        "over_chunk_frames": int((per_frame_ms > CHUNK_MS).sum()),
+        "console_writes": stream.writes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--fixture", default="resource/hello.wav")
+    parser.add_argument("--frames", type=int, default=1000, help="計測するフレーム数（fixtureを繰り返す）")
+    parser.add_argument("--keywords", type=int, default=3, help="フレームごとにスコアを出すWake Wordの数")
+    parser.add_argument("--console-delay-ms", type=float, default=1.0, help="コンソール1回の書き込みにかかる時間")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    audio = load_fixture(args.fixture, RATE)
+    frames = list(chunks(audio, CHUNK_MS))
+    frames = (frames * (args.frames // len(frames) + 1))[:args.frames]
+
+    results = {
+        "before": run_mode(config, frames, enqueue=False, throttle=False, args=args),
+        "queued": run_mode(config, frames, enqueue=True, throttle=False, args=args),
+        "after": run_mode(config, frames, enqueue=True, throttle=True, args=args),
+    }
+    setup_logging(level="INFO", enqueue=False)
+    print(json.dumps({
+        "frames": len(frames),
+        "chunk_ms": CHUNK_MS,
+        "keywords": args.keywords,
+        "console_delay_ms": args.console_delay_ms,
+        "results": results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+定型応答のセグメント組み立てと全文合成の比較
+合成レイテンシ（初回/キャッシュ後）と、全文合成に対する長さ・音量包絡の近さを表示する
+（VOICEVOX EngineまたはPiperモデルが必要）
+
+    uv run python -m benchmarks.bench_segment_tts
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+
+from src.core.config import load_config
+from src.io.segment_tts import SegmentedTTS, trim_silence
+from src.io.tts import PiperTTS
+from src.io.voicevox_tts import VoicevoxTTS
+from src.audio.format import int16_to_float32
+
+SENTENCES = [
+    "2026年10月17日 14時05分",
+    "2026年10月17日 14時06分",
+    "エアコンをつけました",
+    "テレビを消しました",
+    "電気をつけました",
+]
+
+
+def envelope(audio: np.ndarray, rate: int, frame_ms: int = 20) -> np.ndarray:
+    """フレームごとのRMS包絡"""
+    frame = rate * frame_ms // 1000
+    n = len(audio) // frame
+    return np.sqrt(np.mean(audio[:n * frame].reshape(n, frame) ** 2, axis=1))
+
+
+def similarity(assembled: np.ndarray, full: np.ndarray, rate: int) -> tuple[float, float]:
+    """(長さ比, 長さを揃えた包絡の相関)"""
+    a = trim_silence(int16_to_float32(assembled))
+    b = trim_silence(int16_to_float32(full))
+    env_a, env_b = envelope(a, rate), envelope(b, rate)
+    if len(env_a) < 2 or len(env_b) < 2:
+        return len(a) / max(len(b), 1), 0.0
+    grid = np.linspace(0, 1, 100)
+    env_a = np.interp(grid, np.linspace(0, 1, len(env_a)), env_a)
+    env_b = np.interp(grid, np.linspace(0, 1, len(env_b)), env_b)
+    return len(a) / len(b), float(np.corrcoef(env_a, env_b)[0, 1])
+
+
+async def collect(stream) -> tuple[np.ndarray, float]:
+    start = time.perf_counter()
+    chunks = [bytes(pcm) async for pcm in stream]
+    return np.frombuffer(b"".join(chunks), dtype=np.int16), time.perf_counter() - start
+
+
+async def run(backend_name: str, config_path: str):
+    config = load_config(config_path)
+    if backend_name == "voicevox":
+        backend = VoicevoxTTS(config.tts)
+        await backend.init_task
+    else:
+        backend = PiperTTS(config.tts)
+    if not backend.is_available():
+        print(f"{backend_name} is not available")
+        return
+
+    segmented = SegmentedTTS(backend, config.tts)
+    print(f"backend: {backend_name} ({backend.sample_rate}Hz)")
+    print(f"{'sentence':<28} {'full ms':>8} {'cold ms':>8} {'warm ms':>8} {'len ratio':>10} {'env corr':>9}")
+    for text in SENTENCES:
+        full, full_s = await collect(backend.stream_audio(text))
+        _, cold_s = await collect(segmented.stream_audio(text))
+        assembled, warm_s = await collect(segmented.stream_audio(text))
+        ratio, corr = similarity(assembled, full, backend.sample_rate)
+        print(f"{text:<28} {full_s * 1000:>8.1f} {cold_s * 1000:>8.1f} {warm_s * 1000:>8.2f} {ratio:>10.2f} {corr:>9.2f}")
+    print(f"segment cache: {segmented.hits} hits / {segmented.misses} misses")
+
+    close = getattr(backend, "close", None)
+    if close is not None and asyncio.iscoroutinefunction(close):
+        await close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["voicevox", "piper"], default="voicevox")
+    parser.add_argument("--config", default="config/config.yaml")
+    args = parser.parse_args()
+    asyncio.run(run(args.backend, args.config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+ベンチマーク用の決定的な代替バックエンド
+モデルやVOICEVOX Engineが無い環境でもパイプラインを計測できるようにする
+"""
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Iterator
+import numpy as np
+
+from src.audio.frame import AudioFrame
+
+FAKE_RESPONSE = "はい、今は十四時五分です。エアコンをつけました。ほかに何かありますか？"
+
+
+class FakeWakeModel:
+    """OpenWakeWord互換。trigger_after回目のpredictでスコア1.0を返す（repeatならtrigger_after回ごと）"""
+
+    def __init__(self, trigger_after: int = 1, keyword: str = "fake_wake", repeat: bool = False):
+        self.trigger_after = trigger_after
+        self.keyword = keyword
+        self.repeat = repeat
+        self.calls = 0
+        self.prediction_buffer = {keyword: []}
+
+    def predict(self, audio_int16: np.ndarray) -> dict[str, float]:
+        self.calls += 1
+        if self.repeat:
+            score = 1.0 if self.calls % self.trigger_after == 0 else 0.0
+        else:
+            score = 1.0 if self.calls == self.trigger_after else 0.0
+        return {self.keyword: score}
+
+    def reset(self):
+        self.calls = 0
+
+
+class FakeLLM:
+    """LocalLLM互換。固定応答を一定のトークンレートで返す"""
+
+    def __init__(self, response: str = FAKE_RESPONSE, tokens_per_s: float = 0.0, prefill_ms: float = 0.0):
+        self.llm = self  # LocalLLM.llm is not None の判定用
+        self.response = response
+        self.tokens_per_s = tokens_per_s
+        self.prefill_ms = prefill_ms
+
+    def _tokens(self) -> list[str]:
+        # 2文字ずつを1トークンとみなす
+        return [self.response[i:i + 2] for i in range(0, len(self.response), 2)]
+
+    async def aprefill(self, prefix: str) -> int:
+        return 0
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        if self.prefill_ms:
+            time.sleep(self.prefill_ms / 1000)
+        for token in self._tokens():
+            if self.tokens_per_s:
+                time.sleep(1.0 / self.tokens_per_s)
+            yield token
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        if self.prefill_ms:
+            await asyncio.sleep(self.prefill_ms / 1000)
+        for token in self._tokens():
+            if self.tokens_per_s:
+                await asyncio.sleep(1.0 / self.tokens_per_s)
+            yield token
+
+    def generate(self, prompt: str) -> str:
+        return "".join(self.stream(prompt))
+
+
+class FakeASR:
+    """ASR互換。音声長に比例した処理時間の後に固定テキストを返す
+
+    バッチデコードは「呼び出しごとの固定コスト + 最長の発話 + 残りの発話×batch_marginal」で近似する。
+    """
+
+    def __init__(
+        self,
+        text: str = "今何時",
+        rtf: float = 0.0,
+        sample_rate: int = 16000,
+        overhead_s: float = 0.0,
+        batch_marginal: float = 0.3
+    ):
+        self.text = text
+        self.rtf = rtf
+        self.sample_rate = sample_rate
+        self.overhead_s = overhead_s
+        self.batch_marginal = batch_marginal
+        self.lock = threading.Lock()  # 1つのモデルを共有している想定
+
+    def warm_up(self):
+        pass
+
+    async def transcribe(self, audio_data: np.ndarray) -> str:
+        return await asyncio.to_thread(self._transcribe, audio_data)
+
+    def _transcribe(self, audio_data: np.ndarray) -> str:
+        return self._transcribe_batch([audio_data])[0]
+
+    def _transcribe_batch(self, audios: list[np.ndarray]) -> list[str]:
+        durations = sorted((len(audio) / self.sample_rate for audio in audios), reverse=True)
+        cost = self.overhead_s + self.rtf * (durations[0] + self.batch_marginal * sum(durations[1:]))
+        with self.lock:
+            if cost:
+                time.sleep(cost)
+        return [self.text if len(audio) else "" for audio in audios]
+
+
+class FakeTTS:
+    """TTSBackend互換。文字数に比例した長さの音声（正弦波）を返す"""
+
+    name = "fake"
+
+    def __init__(
+        self,
+        sample_rate: int = 22050,
+        first_audio_ms: float = 0.0,
+        ms_per_char: float = 0.0,
+        audio_s_per_char: float = 0.12
+    ):
+        self.sample_rate = sample_rate
+        self.first_audio_ms = first_audio_ms
+        self.ms_per_char = ms_per_char
+        self.audio_s_per_char = audio_s_per_char
+
+    def is_available(self) -> bool:
+        return True
+
+    def synthesize(self, text: str) -> bytes:
+        n = int(len(text) * self.audio_s_per_char * self.sample_rate)
+        t = np.arange(n, dtype=np.float32) / self.sample_rate
+        return (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16).tobytes()
+
+    async def stream_audio(self, text: str) -> AsyncIterator[bytes]:
+        delay_ms = self.first_audio_ms + self.ms_per_char * len(text)
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+        yield self.synthesize(text)
+
+    async def speak_sentences(self, sentences: AsyncIterator[str]):
+        async for _ in sentences:
+            pass
+
+
+class NullPlayer:
+    """AudioPlayer互換。再生時間分だけ待つ（speed倍速）"""
+
+    def __init__(self, speed: float = 0.0):
+        self.speed = speed
+        self.played_s = 0.0
+
+    async def play(self, pcm, sample_rate: int, stop=None):
+        duration = memoryview(pcm).nbytes / 2 / sample_rate
+        self.played_s += duration
+        if self.speed:
+            await asyncio.sleep(duration / self.speed)
+
+    def close(self):
+        pass
+
+
+class ReplayCapture:
+    """AudioCapture互換。録音済み音声をチャンク単位のAudioFrameで流す（speed=0は待ち無し、loops<=0で無限）"""
+
+    def __init__(self, audio: np.ndarray, rate: int = 16000, chunk_ms: int = 30, speed: float = 0.0, loops: int = 1):
+        self.audio = audio.astype(np.float32)
+        self.rate = rate
+        self.chunk_size = rate * chunk_ms // 1000
+        self.speed = speed
+        self.loops = loops
+        self.is_recording = False
+
+    async def stream(self) -> AsyncIterator[AudioFrame]:
+        self.is_recording = True
+        interval = self.chunk_size / self.rate / self.speed if self.speed else 0.0
+        loop = 0
+        while self.is_recording and (self.loops <= 0 or loop < self.loops):
+            for start in range(0, len(self.audio) - self.chunk_size + 1, self.chunk_size):
+                if not self.is_recording:
+                    break
+                yield AudioFrame(self.audio[start:start + self.chunk_size])
+                await asyncio.sleep(interval)
+            loop += 1
+
+    def stop(self):
+        self.is_recording = False
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+起動時のimport時間の予算チェック
+新しいインタプリタで `python -X importtime -c "import src.app"` を実行し、
+累積import時間・重いモジュールの上位・バックエンド（faster_whisper等）が読み込まれていないかを表示する。
+予算を超えるか、遅延読み込みのはずのモジュールが起動時に読み込まれていれば終了コード1。
+
+    uv run python -m benchmarks.import_time
+    uv run python -m benchmarks.import_time --budget-ms 300 --module src.app benchmarks.run
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# コンポーネントのファクトリ（モデルのロード時）で読み込むもの。起動時に読み込まれたら違反
+DEFERRED = [
+    "faster_whisper", "ctranslate2", "llama_cpp", "openwakeword", "onnxruntime", "webrtcvad",
+    "sounddevice", "soundfile", "aiohttp", "scipy", "piper", "torch", "transformers", "librosa", "pandas",
+]
+
+
+def measure(module: str) -> tuple[float, dict[str, int], set[str]]:
+    """(moduleの累積import時間[ms], {直接importしたモジュール: 累積[us]}, 読み込まれた全モジュール)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []  # (インデント, 名前, 累積[us])
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative_us)))
+    # 子は親より先に出力されるので、moduleの行の直前のより深いインデントの行がmoduleの読み込んだもの
+    end = next(i for i, (_, name, _) in enumerate(entries) if name == module)
+    depth = entries[end][0]
+    start = end
+    while start > 0 and entries[start - 1][0] > depth:
+        start -= 1
+    direct = {name: cumulative for indent, name, cumulative in entries[start:end] if indent == depth + 2}
+    return entries[end][2] / 1000, direct, {name for _, name, _ in entries[start:end]}
+
+
+def report(module: str, runs: int, top: int, budget_ms: float) -> dict:
+    # .pycの生成やディスクキャッシュの影響を除くため最小値で比較する
+    samples = [measure(module) for _ in range(runs)]
+    total_ms, direct, imported = min(samples, key=lambda sample: sample[0])
+    deferred = sorted({name.split(".")[0] for name in imported} & set(DEFERRED))
+    heaviest = sorted(direct.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "import_ms": round(total_ms, 1),
+        "budget_ms": budget_ms,
+        "runs_ms": [round(sample[0], 1) for sample in samples],
+        "direct_imports_ms": {name: round(cumulative / 1000, 1) for name, cumulative in heaviest[:top]},
+        "deferred_imported": deferred,
+        "ok": total_ms <= budget_ms and not deferred,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", nargs="*", default=["src.app"], help="計測するモジュール")
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="累積import時間の上限")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="表示する直接のimportの数")
+    args = parser.parse_args()
+
+    reports = [report(module, args.runs, args.top, args.budget_ms) for module in args.module]
+    print(json.dumps(reports, ensure_ascii=False, indent=2))
+    failed = [r for r in reports if not r["ok"]]
+    for r in failed:
+        reason = f"{r['import_ms']}ms > {r['budget_ms']}ms" if r["import_ms"] > r["budget_ms"] else ""
+        if r["deferred_imported"]:
+            reason = ", ".join(filter(None, [reason, f"imported at startup: {', '.join(r['deferred_imported'])}"]))
+        print(f"Import budget exceeded for {r['module']}: {reason}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+オフラインのエンドツーエンド・ベンチマーク
+録音済みWAVからWake/VAD・ASR・文分割・Agent・TTSを駆動し、
+リアルタイム係数・ステージ別レイテンシ・ピークRSSをJSONに出力する。
+モデルやVOICEVOX Engineが無い場合は決定的な代替バックエンドを使う。
+
+    uv run python -m benchmarks.run                      # 計測して表示
+    uv run python -m benchmarks.run --save-baseline      # ベースラインを更新
+    uv run python -m benchmarks.run --check              # ベースライン比で劣化したら終了コード1
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+import numpy as np
+
+from src.audio.format import int16_to_float32, parse_wav, resample
+from src.audio.frame import AudioFrame
+from src.audio.wake_vad import SILENCE_FRAMES
+from src.core.archive import iter_archive
+from src.core.config import Config, load_config
+from src.nlp.splitter import sentence_stream
+from benchmarks.fakes import FakeASR, FakeLLM, FakeTTS, FakeWakeModel, NullPlayer
+
+from loguru import logger
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+RATE = 16000
+CHUNK_MS = 30
+# 件数の指標は増減どちらも挙動の変化（発話の切り出し・文分割の回帰）として扱う
+COUNT_METRICS = ("utterances", "sentences")
+
+
+def endpoint_silence_s(chunk_ms: int = CHUNK_MS, margin_s: float = 0.5) -> float:
+    """発話終了の判定（SILENCE_FRAMESフレームの無音）に足りる無音の長さ"""
+    return SILENCE_FRAMES * chunk_ms / 1000 + margin_s
+
+
+def load_fixture(path: str, rate: int = RATE, tail_silence_s: Optional[float] = None) -> np.ndarray:
+    """WAVを16kHz float32で読み込み、発話終了判定用の無音を後ろに足す
+
+    アーカイブ（privacy.save_audio、ディレクトリか.jsonl）を指定した場合は保存された発話を順に連結する。
+    tail_silence_sを省略した場合はCHUNK_MSのフレームで発話終了を判定できる長さにする。
+    """
+    if tail_silence_s is None:
+        tail_silence_s = endpoint_silence_s()
+    if Path(path).is_dir() or path.endswith(".jsonl"):
+        silence = np.zeros(int(rate * tail_silence_s), dtype=np.float32)
+        utterances = [
+            np.concatenate([resample(pcm, record["audio"]["rate"], rate), silence])
+            for record, pcm in iter_archive(path) if pcm is not None and len(pcm)
+        ]
+        if not utterances:
+            raise ValueError(f"No archived audio in {path}")
+        return np.concatenate(utterances)
+    with open(path, "rb") as f:
+        wav = parse_wav(f.read())
+    samples = wav.samples if wav.channels == 1 else wav.samples.mean(axis=1).astype(np.int16)
+    audio = resample(int16_to_float32(samples), wav.sample_rate, rate)
+    return np.concatenate([audio, np.zeros(int(rate * tail_silence_s), dtype=np.float32)])
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def chunks(audio: np.ndarray, chunk_ms: int = CHUNK_MS):
+    size = RATE * chunk_ms // 1000
+    for start in range(0, len(audio) - size + 1, size):
+        yield AudioFrame(audio[start:start + size])
+
+
+async def bench_wake_vad(audio: np.ndarray, config: Config, fake: bool) -> dict:
+    from src.audio.wake_vad import WakeAndVAD
+
+    wake_vad = WakeAndVAD(config.wake, config.vad)
+    backend = "openwakeword"
+    if fake or wake_vad.wake_model is None:
+        wake_vad.wake_model = FakeWakeModel()
+        wake_vad.state = wake_vad.new_state()
+        backend = "fake"
+
+    frames = list(chunks(audio))
+    start = time.perf_counter()
+    for frame in frames:
+        wake_vad._detect_wake_word(frame)
+        wake_vad._is_speech(frame)
+    elapsed = time.perf_counter() - start
+
+    # 発話区間の切り出し（Wakeは先頭フレームで発火させる）
+    wake_vad.wake_model = FakeWakeModel()
+    wake_vad.state = wake_vad.new_state()
+
+    async def stream():
+        for frame in frames:
+            yield frame
+
+    seg_start = time.perf_counter()
+    utterances = [u async for u in wake_vad.iter_utterances(stream())]
+    seg_elapsed = time.perf_counter() - seg_start
+
+    return {
+        "backend": backend,
+        "rtf": elapsed / (len(audio) / RATE),
+        "per_frame_ms": elapsed / len(frames) * 1000,
+        "segment_rtf": seg_elapsed / (len(audio) / RATE),
+        "utterances": len(utterances),
+    }
+
+
+async def bench_asr(audio: np.ndarray, config: Config, fake: bool, runs: int) -> dict:
+    asr = None
+    backend = "fake"
+    if not fake:
+        try:
+            from src.audio.asr import ASR
+            asr = ASR(config.asr)
+            backend = f"faster-whisper:{config.asr.model_size}"
+        except Exception as e:
+            logger.warning(f"ASR unavailable, using fake: {e}")
+    if asr is None:
+        asr = FakeASR(rtf=0.1)
+
+    await asr.transcribe(audio[:RATE])  # ウォームアップ
+    latencies = []
+    text = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = await asr.transcribe(audio)
+        latencies.append(time.perf_counter() - start)
+    latency = float(np.median(latencies))
+    return {
+        "backend": backend,
+        "latency_ms": latency * 1000,
+        "rtf": latency / (len(audio) / RATE),
+        "text": text,
+    }
+
+
+async def bench_splitter(text: str, repeat: int = 200) -> dict:
+    async def tokens():
+        for _ in range(repeat):
+            for i in range(0, len(text), 2):
+                yield text[i:i + 2]
+
+    start = time.perf_counter()
+    sentences = [s async for s in sentence_stream(tokens())]
+    elapsed = time.perf_counter() - start
+    return {
+        "chars_per_s": len(text) * repeat / elapsed,
+        "sentences": len(sentences),
+    }
+
+
+async def bench_agent(config: Config, fake: bool, runs: int) -> dict:
+    from src.nlp.agent import Agent
+    from src.tools.clock import ClockTool
+    from src.tools.iot_mock import IoTMockTool
+
+    llm = None
+    backend = "fake"
+    if not fake:
+        try:
+            from src.nlp.llm import LocalLLM
+            llm = LocalLLM(config.llm)
+            if llm.llm is None:
+                llm = None
+            else:
+                backend = Path(config.llm.gguf_path).name
+        except Exception as e:
+            logger.warning(f"LLM unavailable, using fake: {e}")
+    if llm is None:
+        llm = FakeLLM(tokens_per_s=200, prefill_ms=20)
+
+    agent = Agent(llm=llm, tools={"clock": ClockTool(), "iot_mock": IoTMockTool()}, system_prompt="ベンチマーク")
+    first_tokens, totals, token_counts = [], [], []
+    for _ in range(runs):
+        agent.conversation_history.clear()
+        start = time.perf_counter()
+        first = None
+        count = 0
+        async for _ in agent.handle("今何時？"):
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+        totals.append(time.perf_counter() - start)
+        first_tokens.append(first or 0.0)
+        token_counts.append(count)
+    total = float(np.median(totals))
+    return {
+        "backend": backend,
+        "first_token_ms": float(np.median(first_tokens)) * 1000,
+        "total_ms": total * 1000,
+        "tokens_per_s": float(np.median(token_counts)) / total if total else 0.0,
+    }
+
+
+async def bench_tts(config: Config, fake: bool, sentences: list[str]) -> dict:
+    from src.io.router import TTSRouter
+
+    backends = []
+    if not fake:
+        try:
+            from src.io.voicevox_tts import VoicevoxTTS
+            voicevox = VoicevoxTTS(config.tts)
+            await voicevox.init_task
+            if voicevox.is_available():
+                backends.append(voicevox)
+        except Exception as e:
+            logger.warning(f"VOICEVOX unavailable: {e}")
+        try:
+            from src.io.tts import PiperTTS
+            piper = PiperTTS(config.tts)
+            if piper.is_available():
+                backends.append(piper)
+        except Exception as e:
+            logger.warning(f"Piper unavailable: {e}")
+    if not backends:
+        backends = [FakeTTS(first_audio_ms=30, ms_per_char=5)]
+
+    router = TTSRouter(backends, config.tts)
+    router.player = NullPlayer()
+    first_audio, synth, audio_s = [], 0.0, 0.0
+    for text in sentences:
+        start = time.perf_counter()
+        first = None
+        async for chunk in router.stream_sentence(text):
+            if first is None:
+                first = time.perf_counter() - start
+            audio_s += memoryview(chunk.pcm).nbytes / 2 / chunk.sample_rate
+        synth += time.perf_counter() - start
+        first_audio.append(first or 0.0)
+    for backend in backends:
+        close = getattr(backend, "close", None)
+        if close is not None and asyncio.iscoroutinefunction(close):
+            await close()
+    return {
+        "backend": ",".join(b.name for b in backends),
+        "first_audio_ms": float(np.median(first_audio)) * 1000,
+        "rtf": synth / audio_s if audio_s else 0.0,
+    }
+
+
+async def run_all(args) -> dict:
+    config = load_config(args.config)
+    audio = load_fixture(args.fixture)
+    fake = args.fake
+    response = FakeLLM().response
+    sentences = [s async for s in sentence_stream(_chars(response))]
+
+    results = {"fixture": args.fixture, "audio_s": round(len(audio) / RATE, 3), "stages": {}}
+    stages = {
+        "wake_vad": lambda: bench_wake_vad(audio, config, fake),
+        "asr": lambda: bench_asr(audio, config, fake, args.runs),
+        "splitter": lambda: bench_splitter(response),
+        "agent": lambda: bench_agent(config, fake, args.runs),
+        "tts": lambda: bench_tts(config, fake, sentences),
+    }
+    for name, bench in stages.items():
+        if args.stages and name not in args.stages:
+            continue
+        try:
+            results["stages"][name] = await bench()
+        except (ImportError, OSError) as e:
+            # 依存パッケージ（PortAudio等）自体が無いステージは計測対象外
+            results["stages"][name] = {"skipped": str(e)}
+        logger.info(f"{name}: {results['stages'][name]}")
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+async def _chars(text: str):
+    for char in text:
+        yield char
+
+
+def lower_is_better(metric: str) -> bool:
+    return not metric.endswith("_per_s")
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list[str]:
+    """ベースライン比でthresholdを超えて劣化した指標を列挙"""
+    regressions = []
+    for stage, metrics in results["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or base.get("backend") != metrics.get("backend"):
+            continue  # バックエンドが違う計測同士は比較しない
+        for metric, value in metrics.items():
+            old = base.get(metric)
+            if metric in COUNT_METRICS:
+                if old is not None and value != old:
+                    regressions.append(f"{stage}.{metric}: {old} -> {value} (count changed)")
+                continue
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or old <= 0:
+                continue
+            if metric.endswith("_ms") and abs(value - old) < min_delta_ms:
+                continue
+            ratio = value / old
+            worse = ratio > 1 + threshold if lower_is_better(metric) else ratio < 1 - threshold
+            if worse:
+                regressions.append(f"{stage}.{metric}: {old:.3f} -> {value:.3f} ({(ratio - 1) * 100:+.0f}%)")
+    old_rss = baseline.get("peak_rss_mb")
+    if old_rss and results["peak_rss_mb"] > old_rss * (1 + threshold):
+        regressions.append(f"peak_rss_mb: {old_rss:.1f} -> {results['peak_rss_mb']:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", default="resource/hello.wav")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--fake", action="store_true", help="実モデルがあっても代替バックエンドを使う")
+    parser.add_argument("--stages", nargs="*", help="計測するステージ（既定は全て）")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="結果JSONの出力先")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="ベースライン比で劣化したら失敗")
+    parser.add_argument("--threshold", type=float, default=0.25, help="許容する劣化率")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="これ未満のms差は無視")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    results = asyncio.run(run_all(args))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Baseline saved: {baseline_path}")
+    elif args.check:
+        if not baseline_path.exists():
+            print(f"Baseline not found: {baseline_path}")
+            sys.exit(2)
+        regressions = compare(results, json.loads(baseline_path.read_text(encoding="utf-8")), args.threshold, args.min_delta_ms)
+        if regressions:
+            print("Performance regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+長時間運転（ソーク）試験
+録音済みWAVを繰り返し流してVoiceAgentのパイプライン全体を代替バックエンドで回し、
+RSS・tracemallocの上位確保箇所・開いているファイル記述子・asyncioタスク数を定期的に記録する。
+単調に増え続ける指標を検出し（終了コード1）、目標レイテンシ内で処理できたターン数/分を表示する。
+
+時間はspeed倍に加速する（入力音声・再生・代替バックエンドの待ち時間を1/speedにする）。
+レイテンシ・ターン数/分は加速前の時間に換算して表示する。
+
+    uv run python -m benchmarks.soak --hours 2 --speed 30
+    uv run python -m benchmarks.soak --hours 0.5 --real tts     # TTSだけ実バックエンド（VOICEVOX等）
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from src.app import VoiceAgent
+from src.audio.asr import ASR
+from src.audio.wake_vad import WakeAndVAD
+from src.core.bus import Bus
+from src.core.config import Config, load_config
+from src.core.loader import ComponentLoader
+from src.nlp.llm import LocalLLM
+from src.pipeline import Pipeline
+from benchmarks.fakes import FakeASR, FakeLLM, FakeTTS, FakeWakeModel, NullPlayer, ReplayCapture
+from benchmarks.run import load_fixture, peak_rss_mb
+
+from loguru import logger
+
+# 単調増加とみなす最小の増分（計測開始後のウォームアップ区間を除く）
+GROWTH_THRESHOLDS = {
+    "rss_mb": 8.0,
+    "traced_mb": 2.0,
+    "open_fds": 4,
+    "tasks": 4,
+}
+
+
+class SoakAgent(VoiceAgent):
+    """VoiceAgentを代替バックエンドで組み立てる（ログ設定は呼び出し側、realに含めたものは実物を使う）"""
+
+    def __init__(self, config: Config, audio: np.ndarray, speed: float, real: set[str]):
+        self.config = config
+        self.running = False
+        self.audio = audio
+        self.speed = speed
+        self.real = real
+
+    async def initialize(self):
+        self.filler = None
+        self.loader = ComponentLoader()
+        self.audio_capture = ReplayCapture(
+            self.audio, self.config.audio.rate, self.config.audio.chunk_ms, speed=self.speed, loops=0
+        )
+        self.loader.register("wake_vad", self._create_wake_vad)
+        if "asr" in self.real:
+            self.loader.register("asr", lambda: ASR(self.config.asr), warmup=ASR.warm_up)
+        else:
+            self.loader.register("asr", lambda: FakeASR(rtf=0.1 / self.speed))
+        if "llm" in self.real:
+            self.loader.register("llm", lambda: LocalLLM(self.config.llm), warmup=LocalLLM.warm_up)
+        else:
+            self.loader.register("llm", lambda: FakeLLM(tokens_per_s=20 * self.speed, prefill_ms=300 / self.speed))
+        self.loader.register("agent", self._create_agent)
+        self.loader.register("tts", self._create_soak_tts)
+        self.wake_vad = await self.loader.get("wake_vad")
+
+    def _create_wake_vad(self) -> WakeAndVAD:
+        # 再開直後のフレームで毎回Wakeさせる（Wake Wordモデルは使わない）
+        wake_vad = WakeAndVAD(self.config.wake.model_copy(update={"enabled": False}), self.config.vad)
+        wake_vad.wake_model = FakeWakeModel(repeat=True)
+        wake_vad.state = wake_vad.new_state()
+        return wake_vad
+
+    async def _create_soak_tts(self):
+        if "tts" in self.real:
+            tts = await self._create_tts()
+        else:
+            from src.io.router import TTSRouter
+            tts = TTSRouter([FakeTTS(first_audio_ms=150 / self.speed, ms_per_char=2 / self.speed)], self.config.tts)
+        tts.player = NullPlayer(speed=self.speed)
+        return tts
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return peak_rss_mb()  # /procが無い環境はピーク値で代用
+
+
+def open_fds() -> int:
+    for path in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(path):
+            return len(os.listdir(path))
+    return -1
+
+
+def traced_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+
+
+def top_growth(baseline: tracemalloc.Snapshot, snapshot: tracemalloc.Snapshot, limit: int) -> list[dict]:
+    return [
+        {"where": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+        for stat in snapshot.compare_to(baseline, "lineno")[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+def detect_growth(times_h: list[float], values: list[float], min_growth: float, warmup_share: float) -> dict:
+    """ウォームアップ後の区間で「ほぼ単調に増え続けている」かを判定"""
+    start = int(len(values) * warmup_share)
+    t, v = np.array(times_h[start:]), np.array(values[start:], dtype=float)
+    if len(v) < 4:
+        return {"flagged": False, "reason": "too few samples"}
+    steps = np.diff(v)
+    tolerance = min_growth / 20  # 計測の揺らぎ
+    nondecreasing = float((steps >= -tolerance).mean())
+    slope = float(np.polyfit(t, v, 1)[0]) if t[-1] > t[0] else 0.0
+    growth = float(v[-1] - v[0])
+    return {
+        "start": round(float(v[0]), 2),
+        "end": round(float(v[-1]), 2),
+        "slope_per_hour": round(slope, 3),
+        "nondecreasing_share": round(nondecreasing, 2),
+        "flagged": bool(growth >= min_growth and slope > 0 and nondecreasing >= 0.9),
+    }
+
+
+async def soak(args) -> dict:
+    config = load_config(args.config)
+    audio = load_fixture(args.fixture, config.audio.rate, tail_silence_s=args.tail_s)
+    va = SoakAgent(config, audio, args.speed, set(args.real))
+    await va.initialize()
+    await va.loader.wait_started()
+
+    bus = Bus()
+    pipeline = Pipeline(va, bus)
+    turns: list[tuple[float, str, float | None]] = []  # (経過時間[s], 終了理由, 発話終了→再生開始[ms])
+    started = time.monotonic()
+
+    def on_turn(trace):
+        latency = trace.spans().get("endpoint_to_audio")
+        turns.append((time.monotonic() - started, trace.info.get("end_reason"), latency))
+
+    pipeline.tracer.emit = on_turn
+    run_task = asyncio.create_task(pipeline.run())
+
+    if args.tracemalloc:
+        tracemalloc.start(args.tracemalloc_frames)
+    baseline = None
+    samples = []
+    duration_s = args.hours * 3600 / args.speed
+    try:
+        while time.monotonic() - started < duration_s and not run_task.done():
+            await asyncio.sleep(args.sample_s)
+            gc.collect()
+            elapsed = time.monotonic() - started
+            sample = {
+                "sim_hours": round(elapsed * args.speed / 3600, 4),
+                "turns": len(turns),
+                "rss_mb": round(current_rss_mb(), 2),
+                "open_fds": open_fds(),
+                "tasks": len(asyncio.all_tasks()),
+            }
+            if args.tracemalloc:
+                snapshot = traced_snapshot()
+                sample["traced_mb"] = round(sum(s.size for s in snapshot.statistics("filename")) / 1024 / 1024, 2)
+                if baseline is None and elapsed >= duration_s * args.warmup_share:
+                    baseline = snapshot  # ウォームアップ後を基準にする
+            samples.append(sample)
+            logger.info(f"Soak: {sample}")
+    finally:
+        final_snapshot = traced_snapshot() if args.tracemalloc else None
+        await pipeline.stop()
+        run_task.cancel()
+        await asyncio.gather(run_task, return_exceptions=True)
+        va.audio_capture.stop()
+        await va.loader.close()
+        if args.tracemalloc:
+            tracemalloc.stop()
+
+    elapsed = time.monotonic() - started
+    sim_minutes = elapsed * args.speed / 60
+    # 加速前の時間に換算したレイテンシ（wall時間 × speed）
+    latencies = [latency * args.speed for _, reason, latency in turns if reason == "done" and latency is not None]
+    within = [latency for latency in latencies if latency <= args.target_ms]
+    times_h = [s["sim_hours"] for s in samples]
+    growth = {
+        metric: detect_growth(times_h, [s[metric] for s in samples], threshold, args.warmup_share)
+        for metric, threshold in GROWTH_THRESHOLDS.items()
+        if samples and metric in samples[0]
+    }
+    return {
+        "sim_hours": round(elapsed * args.speed / 3600, 3),
+        "wall_s": round(elapsed, 1),
+        "speed": args.speed,
+        "real_backends": args.real,
+        "turns": len(turns),
+        "turn_end_reasons": {reason: sum(1 for _, r, _ in turns if r == reason) for reason in {r for _, r, _ in turns}},
+        "turns_per_min": round(len(turns) / sim_minutes, 2) if sim_minutes else 0.0,
+        "target_ms": args.target_ms,
+        "turns_within_target_per_min": round(len(within) / sim_minutes, 2) if sim_minutes else 0.0,
+        "within_target_share": round(len(within) / len(latencies), 3) if latencies else 0.0,
+        "endpoint_to_audio_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 1) if latencies else None,
+            "p95": round(float(np.percentile(latencies, 95)), 1) if latencies else None,
+        },
+        "growth": growth,
+        "top_allocations": top_growth(baseline, final_snapshot, args.top) if baseline and final_snapshot else [],
+        "bus": bus.stats(),
+        "samples": samples if args.samples else len(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--fixture", default="resource/hello.wav")
+    parser.add_argument("--hours", type=float, default=1.0, help="加速前の時間で何時間回すか")
+    parser.add_argument("--speed", type=float, default=20.0, help="時間の加速倍率")
+    parser.add_argument("--tail-s", type=float, default=3.0, help="発話の後に付ける無音（ターン間隔）")
+    parser.add_argument("--sample-s", type=float, default=5.0, help="計測間隔（wall時間）")
+    parser.add_argument("--warmup-share", type=float, default=0.2, help="増加判定から除く先頭の割合")
+    parser.add_argument("--target-ms", type=float, default=1500, help="発話終了→再生開始の目標（加速前）")
+    parser.add_argument("--real", nargs="*", choices=["asr", "llm", "tts"], default=[], help="実バックエンドを使うコンポーネント")
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false")
+    parser.add_argument("--tracemalloc-frames", type=int, default=1)
+    parser.add_argument("--top", type=int, default=10, help="表示する確保箇所の数")
+    parser.add_argument("--samples", action="store_true", help="計測値の時系列も出力")
+    parser.add_argument("--output", help="結果JSONの出力先")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", filter=lambda record: record["message"].startswith("Soak"))
+    logger.add(sys.stderr, level="WARNING")
+
+    # エージェントの応答トークンの表示（標準出力）は捨てる
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report = asyncio.run(soak(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    flagged = [metric for metric, result in report["growth"].items() if result["flagged"]]
+    if flagged:
+        print(f"Monotonic growth detected: {', '.join(flagged)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+WebSocket音声サーバの負荷試験クライアント
+N本の接続から録音済みWAVを実時間で同時に送り、発話終了→最初の応答音声までの時間を集計する。
+Wakeはクライアント側で送る（{"type": "wake"}）のでサーバのWake Wordモデルには依存しない。
+
+    uv run python -m src.app                                   # config.yamlで server.enabled: true
+    uv run python -m benchmarks.ws_load --clients 8 --turns 3
+"""
+import argparse
+import asyncio
+import json
+import time
+import aiohttp
+import numpy as np
+
+from src.audio.format import float32_to_int16
+from benchmarks.run import load_fixture
+
+RATE = 16000
+
+
+async def run_client(client_id: int, args, pcm: np.ndarray, results: list[dict]):
+    chunk = RATE * args.chunk_ms // 1000
+    interval = args.chunk_ms / 1000 / args.speed if args.speed else 0.0
+    async with aiohttp.ClientSession() as http:
+        try:
+            ws = await http.ws_connect(args.url)
+        except aiohttp.WSServerHandshakeError as e:
+            results.append({"client": client_id, "error": f"handshake: {e.status}"})
+            return
+        await ws.send_json({"type": "hello", "sample_rate": RATE, "output_rate": RATE})
+        ready = await ws.receive_json(timeout=args.timeout)
+        if ready.get("type") != "ready":
+            results.append({"client": client_id, "error": f"unexpected: {ready}"})
+            return
+
+        for turn in range(args.turns):
+            await ws.send_json({"type": "wake"})
+            for start in range(0, len(pcm) - chunk + 1, chunk):
+                await ws.send_bytes(pcm[start:start + chunk].tobytes())
+                await asyncio.sleep(interval)
+            # 末尾の無音を除いた発話終了時刻（待ち無し送信では送信完了時刻）
+            speech_end = time.perf_counter() - (args.tail_s / args.speed if args.speed else 0.0)
+
+            first_audio = None
+            audio_bytes = 0
+            reason = None
+            deadline = time.perf_counter() + args.timeout
+            while reason is None:
+                try:
+                    msg = await ws.receive(timeout=max(0.0, deadline - time.perf_counter()))
+                except asyncio.TimeoutError:
+                    reason = "timeout"
+                    break
+                if msg.type == aiohttp.WSMsgType.BINARY:
+                    if first_audio is None:
+                        first_audio = time.perf_counter() - speech_end
+                    audio_bytes += len(msg.data)
+                elif msg.type == aiohttp.WSMsgType.TEXT:
+                    event = json.loads(msg.data)
+                    if event["type"] == "turn.end":
+                        reason = event["reason"]
+                else:
+                    reason = "closed"
+            results.append({
+                "client": client_id,
+                "turn": turn,
+                "reason": reason,
+                "first_audio_ms": first_audio * 1000 if first_audio is not None else None,
+                "audio_s": audio_bytes / 2 / RATE,
+            })
+            if reason == "closed":
+                return
+        await ws.close()
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q * 100)) if values else 0.0
+
+
+async def main_async(args):
+    audio = load_fixture(args.fixture, RATE, tail_silence_s=args.tail_s)
+    pcm = float32_to_int16(audio)
+    results: list[dict] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(i, args, pcm, results) for i in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [r["first_audio_ms"] for r in results if r.get("first_audio_ms") is not None]
+    errors = [r for r in results if "error" in r or r.get("reason") not in ("done", "empty")]
+    print(json.dumps({
+        "clients": args.clients,
+        "turns": len(results),
+        "elapsed_s": round(elapsed, 2),
+        "first_audio_ms": {
+            "p50": round(percentile(latencies, 0.5), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "max": round(max(latencies, default=0.0), 1),
+        },
+        "failed": len(errors),
+        "errors": errors[:10],
+    }, ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://127.0.0.1:8765/ws")
+    parser.add_argument("--fixture", default="resource/hello.wav")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=1)
+    parser.add_argument("--chunk-ms", type=int, default=20)
+    parser.add_argument("--speed", type=float, default=1.0, help="送信速度（実時間比、0で待ち無し）")
+    parser.add_argument("--tail-s", type=float, default=2.0, help="発話終了判定用に付ける無音")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+ターントレース（JSONL）の集計スクリプト
+ステージごとのレイテンシ p50/p95 を表示する
+
+    uv run python scripts/trace_summary.py [logs/turn_traces.jsonl] [--last N]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.core.trace import SPANS
+
+
+def percentile(values: list[float], q: float) -> float:
+    """線形補間のパーセンタイル"""
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def load_traces(path: Path) -> list[dict]:
+    """ローテーション済みファイルも含めて古い順に読み込む"""
+    files = sorted(path.parent.glob(f"{path.stem}*{path.suffix}*"), key=lambda p: p.stat().st_mtime)
+    traces = []
+    for file in files:
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        traces.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    return traces
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="logs/turn_traces.jsonl")
+    parser.add_argument("--last", type=int, default=0, help="直近Nターンのみ集計")
+    args = parser.parse_args()
+
+    traces = load_traces(Path(args.path))
+    if args.last:
+        traces = traces[-args.last:]
+    if not traces:
+        print(f"No traces found: {args.path}")
+        sys.exit(1)
+
+    print(f"{len(traces)} turns")
+    print(f"{'span':<20} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name in SPANS:
+        values = [t["spans_ms"][name] for t in traces if name in t.get("spans_ms", {})]
+        if not values:
+            continue
+        print(f"{name:<20} {len(values):>5} {percentile(values, 0.5):>9.1f} {percentile(values, 0.95):>9.1f} {max(values):>9.1f}")
+
+    reasons = {}
+    for t in traces:
+        reason = t.get("end_reason") or "unknown"
+        reasons[reason] = reasons.get(reason, 0) + 1
+    print(f"end reasons: {reasons}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,29 @@
+import argparse
 import asyncio
 import sys
 import signal
 from pathlib import Path
 
-from .core.config import load_config
+from .core.config import load_config, machine_override_path
 from .core.logging import setup_logging
+from .core.bus import Bus
+from .core.archive import Archiver
+from .core.loader import ComponentLoader
+from .core.profiler import StageProfiler
+from .core.watchdog import LoopWatchdog
 from .audio.capture import AudioCapture
 from .audio.wake_vad import WakeAndVAD
-from .audio.asr import ASR
-from .nlp.llm import LocalLLM
+from .audio.asr import ASR, BatchedASR, RemoteASR
+from .nlp.llm import LocalLLM, RemoteLLM
 from .nlp.agent import Agent
-from .nlp.splitter import sentence_stream
+from .io.tts import PiperTTS
 from .io.voicevox_tts import VoicevoxTTS
+from .io.router import TTSRouter
+from .io.filler import FillerPlayer
+from .io.segment_tts import SegmentedTTS, clock_segments
 from .tools.clock import ClockTool
 from .tools.iot_mock import IoTMockTool
+from .pipeline import Pipeline
 
 from loguru import logger
 
@@ -26,109 +36,168 @@ class VoiceAgent:
         # ログ設定
         setup_logging(
             level=self.config.logging.level,
-            json_format=self.config.logging.json_format
+            json_format=self.config.logging.json_format,
+            trace_path=self.config.logging.trace_path,
+            trace_rotation=self.config.logging.trace_rotation,
+            trace_retention=self.config.logging.trace_retention,
+            enqueue=self.config.logging.enqueue,
+            queue_size=self.config.logging.queue_size
         )
         
         logger.info("Voice Agent initializing...")
+        override_path = machine_override_path(config_path)
+        if override_path.exists():
+            logger.info(f"Machine-specific config applied: {override_path}")
 
     async def initialize(self):
-        """各コンポーネントの初期化"""
+        """各コンポーネントの初期化
+
+        モデルはワーカースレッドで並列にロードし、Wake/VADの準備ができた時点で
+        戻る（聞き取りを先に始める）。ASR・Agent・TTSはパイプライン側で準備完了を待つ。
+        """
         try:
-            # 音声キャプチャ
-            self.audio_capture = AudioCapture(self.config.audio)
-            
-            # Wake Word + VAD
-            self.wake_vad = WakeAndVAD(self.config.wake, self.config.vad)
-            
-            # ASR
-            self.asr = ASR(self.config.asr)
+            self.filler = None
+            self.loader = ComponentLoader()
             
-            # LLM
-            self.llm = LocalLLM(self.config.llm)
-            if self.llm.llm is None:
-                logger.warning("LLM is not available - continuing without LLM functionality")
+            # イベントループの停止検知
+            if self.config.watchdog.enabled:
+                self.watchdog = LoopWatchdog(self.config.watchdog)
+                self.watchdog.start()
             
-            # TTS (VOICEVOX)
-            self.tts = VoicevoxTTS(self.config.tts)
+            # 発話・認識結果・応答のアーカイブ（privacy設定）
+            privacy = self.config.privacy
+            self.archiver = Archiver(privacy) if privacy.save_audio or privacy.save_text else None
             
-            # ツール初期化
-            available_tools = {
-                "clock": ClockTool(),
-                "iot_mock": IoTMockTool()
-            }
+            # メトリクス公開
+            if self.config.metrics.enabled:
+                from .server.metrics import MetricsServer  # aiohttpは使う場合だけ読み込む
+                self.metrics_server = MetricsServer(self.config.metrics)
+                await self.metrics_server.start()
             
-            enabled_tools = {
-                name: tool for name, tool in available_tools.items()
-                if name in self.config.agent.tools_enabled
-            }
-            
-            # Agent
-            try:
-                with open(self.config.agent.system_prompt_path, 'r', encoding='utf-8') as f:
-                    system_prompt = f.read()
-            except FileNotFoundError:
-                system_prompt = "あなたは親しみやすい音声アシスタントです。"
-                logger.warning("System prompt file not found, using default")
+            # 音声キャプチャ
+            self.audio_capture = AudioCapture(self.config.audio)
             
-            self.agent = Agent(
-                llm=self.llm,
-                tools=enabled_tools,
-                system_prompt=system_prompt
+            # モデル類の並列ロード
+            self.loader.register(
+                "wake_vad",
+                lambda: WakeAndVAD(self.config.wake, self.config.vad),
+                warmup=WakeAndVAD.warm_up
             )
+            workers = self.config.workers
+            if workers.asr:
+                # 子プロセスでロード・ウォームアップ
+                self.loader.register(
+                    "asr",
+                    RemoteASR(self.config.asr, workers.max_utterance_s, workers.restart_delay_s).start
+                )
+            elif self.config.asr.batch_window_ms > 0:
+                self.loader.register(
+                    "asr",
+                    lambda: BatchedASR(ASR(self.config.asr), self.config.asr.batch_window_ms, self.config.asr.max_batch),
+                    warmup=BatchedASR.warm_up
+                )
+            else:
+                self.loader.register("asr", lambda: ASR(self.config.asr), warmup=ASR.warm_up)
+            # lazy_load時はWake Word検知時にロード開始
+            if workers.llm:
+                self.loader.register(
+                    "llm",
+                    RemoteLLM(self.config.llm, workers.restart_delay_s).start,
+                    lazy=self.config.llm.lazy_load
+                )
+            else:
+                self.loader.register(
+                    "llm",
+                    lambda: LocalLLM(self.config.llm),
+                    warmup=LocalLLM.warm_up,
+                    lazy=self.config.llm.lazy_load
+                )
+            self.loader.register("agent", self._create_agent, lazy=self.config.llm.lazy_load)
+            self.loader.register("tts", self._create_tts)
             
-            logger.info("Voice Agent initialized successfully")
+            # Wake Word + VAD（これだけ待って聞き取りを開始）
+            self.wake_vad = await self.loader.get("wake_vad")
+            self.startup_task = asyncio.create_task(self.loader.wait_started(), name="startup")
+            
+            logger.info("Voice Agent listening (other components loading in background)")
             
         except Exception as e:
             logger.error(f"Initialization failed: {e}")
             raise
 
+    async def _create_agent(self) -> Agent:
+        self.llm = await self.loader.get("llm")
+        if self.llm.llm is None:
+            logger.warning("LLM is not available - continuing without LLM functionality")
+        
+        # ツール初期化
+        available_tools = {
+            "clock": ClockTool(),
+            "iot_mock": IoTMockTool()
+        }
+        
+        enabled_tools = {
+            name: tool for name, tool in available_tools.items()
+            if name in self.config.agent.tools_enabled
+        }
+        
+        # Agent
+        try:
+            with open(self.config.agent.system_prompt_path, 'r', encoding='utf-8') as f:
+                system_prompt = f.read()
+        except FileNotFoundError:
+            system_prompt = "あなたは親しみやすい音声アシスタントです。"
+            logger.warning("System prompt file not found, using default")
+        
+        self.agent = Agent(
+            llm=self.llm,
+            tools=enabled_tools,
+            system_prompt=system_prompt
+        )
+        return self.agent
+
+    async def _create_tts(self) -> TTSRouter:
+        # TTS（設定順のバックエンドをルーター経由で利用）
+        backends = []
+        for name in self.config.tts.backends:
+            if name == "voicevox":
+                backends.append(VoicevoxTTS(self.config.tts))
+            elif name == "piper":
+                # ONNXロードとウォームアップはスレッドで
+                backends.append(await asyncio.to_thread(PiperTTS, self.config.tts))
+        if self.config.tts.segment_assembly:
+            backends = [SegmentedTTS(backend, self.config.tts) for backend in backends]
+        self.tts = TTSRouter(backends, self.config.tts)
+        await self.tts.wait_ready()
+        if self.config.tts.segment_assembly and self.config.tts.segment_prewarm:
+            asyncio.create_task(self._prewarm_segments(backends))
+        
+        # 相槌（応答待ちのマスキング）
+        if self.config.filler.enabled:
+            filler = FillerPlayer(self.tts, self.config.filler)
+            await filler.prepare()
+            self.filler = filler
+        return self.tts
+
+    async def _prewarm_segments(self, backends: list[SegmentedTTS]):
+        """バックエンドの準備完了後にセグメントキャッシュを温める"""
+        await self.tts.wait_ready()
+        for backend in backends:
+            if backend.is_available():
+                await backend.prewarm(clock_segments())
+
     async def run(self):
-        """メインループ"""
+        """パイプラインを起動して終了まで待つ"""
         self.running = True
-        logger.info("Voice Agent starting main loop")
+        if self.config.server.enabled:
+            await self.serve()
+            return
+        logger.info("Voice Agent starting pipeline")
         
+        self.bus = Bus()
+        self.pipeline = Pipeline(self, self.bus)
         try:
-            async for utterance_pcm in self.wake_vad.iter_utterances(self.audio_capture.stream()):
-                if not self.running:
-                    break
-                    
-                # ASRで文字起こし
-                text = await self.asr.transcribe(utterance_pcm)
-                if not text.strip():
-                    continue
-                
-                logger.info(f"User said: '{text}'")
-                
-                # Agentで処理
-                logger.info("Processing with Agent...")
-                token_iter = self.agent.handle(text)
-                
-                # レスポンスをコンソールにも出力
-                response_text = ""
-                async for token in token_iter:
-                    response_text += token
-                    print(token, end='', flush=True)
-                
-                print()  # 改行
-                logger.info(f"Agent response: {response_text}")
-                
-                # TTS再生中は音声入力を一時停止
-                self.wake_vad.pause()
-                logger.debug("Audio input paused for TTS playback")
-                
-                try:
-                    # 文単位に分割してTTS（テキストから再生成）
-                    async def text_to_tokens():
-                        for char in response_text:
-                            yield char
-                    
-                    sent_iter = sentence_stream(text_to_tokens())
-                    await self.tts.speak_sentences(sent_iter)
-                finally:
-                    # TTS終了後に音声入力を再開
-                    self.wake_vad.resume()
-                    logger.debug("Audio input resumed after TTS playback")
-                
+            await self.pipeline.run()
         except KeyboardInterrupt:
             logger.info("Keyboard interrupt received")
         except Exception as e:
@@ -136,6 +205,19 @@ class VoiceAgent:
         finally:
             await self.shutdown()
 
+    async def serve(self):
+        """WebSocketサーバとして複数クライアントを受け付ける（ローカルマイクは使わない）"""
+        logger.info("Voice Agent starting in server mode")
+        from .server.voice_ws import VoiceServer
+        self.server = VoiceServer(self, self.config.server)
+        try:
+            await self.server.start()
+            await asyncio.Event().wait()
+        except Exception as e:
+            logger.error(f"Server error: {e}")
+        finally:
+            await self.shutdown()
+
     async def shutdown(self):
         """終了処理"""
         logger.info("Shutting down Voice Agent")
@@ -143,10 +225,61 @@ class VoiceAgent:
         
         if hasattr(self, 'audio_capture'):
             self.audio_capture.stop()
+        
+        if hasattr(self, 'server'):
+            await self.server.stop()
+        
+        if hasattr(self, 'bus'):
+            logger.info(f"Bus queues: {self.bus.stats()}")
+        
+        if hasattr(self, 'tts'):
+            logger.info(f"TTS backend stats: {self.tts.stats_summary()}")
+        
+        if getattr(self, 'startup_task', None) is not None and not self.startup_task.done():
+            self.startup_task.cancel()
+        
+        if hasattr(self, 'loader'):
+            await self.loader.close()
+        
+        if getattr(self, 'archiver', None) is not None:
+            await self.archiver.close()
+        
+        if hasattr(self, 'metrics_server'):
+            await self.metrics_server.stop()
+        
+        if hasattr(self, 'watchdog'):
+            await self.watchdog.stop()
+        
+        if hasattr(self, 'profiler'):
+            await asyncio.to_thread(self.profiler.stop)
+
+    def start_profiler(self, interval_ms: float, output_dir: str, seconds: float = 0.0):
+        """ステージ別のサンプリングプロファイラを開始（secondsが正ならその時間で止めて書き出す）"""
+        self.profiler = StageProfiler(interval_ms, output_dir)
+        self.profiler.start()
+        if seconds > 0:
+            asyncio.create_task(self._stop_profiler_after(seconds))
+
+    async def _stop_profiler_after(self, seconds: float):
+        await asyncio.sleep(seconds)
+        await asyncio.to_thread(self.profiler.stop)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Voice Agent")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--profile", action="store_true", help="ステージ別のサンプリングプロファイルを取る")
+    parser.add_argument("--profile-seconds", type=float, default=0.0, help="この時間で計測を止めて書き出す（0なら終了時）")
+    parser.add_argument("--profile-interval-ms", type=float, default=10.0, help="サンプリング間隔")
+    parser.add_argument("--profile-dir", default="logs/profile", help="折り畳みスタックとステージ別CPU時間の出力先")
+    return parser.parse_args(argv)
 
 
 async def main():
-    agent = VoiceAgent()
+    args = parse_args()
+    agent = VoiceAgent(args.config)
+    if args.profile:
+        agent.start_profiler(args.profile_interval_ms, args.profile_dir, args.profile_seconds)
     
     try:
         await agent.initialize()
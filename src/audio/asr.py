@@ -1,44 +1,390 @@
+import asyncio
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, NamedTuple, Optional
 import numpy as np
-from faster_whisper import WhisperModel
 from ..core.config import ASRConfig
+from ..core.metrics import REGISTRY
+from ..core.worker import ProcessWorker, WorkerCrashed
 from loguru import logger
 
+if TYPE_CHECKING:
+    from faster_whisper import WhisperModel
+
+ASR_DECODE_SECONDS = REGISTRY.histogram("asr_decode_seconds", "Whisper decode time per utterance")
+ASR_RTF = REGISTRY.histogram(
+    "asr_realtime_factor", "Decode time divided by utterance length",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0)
+)
+ASR_ROUTES = REGISTRY.counter("asr_route_total", "Utterances per model routing decision", ("route",))
+ASR_ROUTE_SECONDS = REGISTRY.histogram("asr_route_seconds", "Decode time per routing decision", ("route",))
+ASR_BATCH_SIZE = REGISTRY.histogram("asr_batch_size", "Utterances decoded per batch", buckets=(1, 2, 3, 4, 6, 8, 12, 16))
+
+MAX_BATCH_SAMPLES = 16000 * 30  # Whisperの1窓（30秒）
+COMPRESSION_RATIO_THRESHOLD = 2.4  # faster-whisperの既定。超えたら繰り返しの幻覚として再デコード
+
+
+class Decoded(NamedTuple):
+    text: str
+    avg_logprob: float  # セグメントの平均（文字数で重み付け）
+    no_speech_prob: float  # セグメントの最大
+    language_probability: float
+
 
 class ASR:
     def __init__(self, config: ASRConfig):
         self.config = config
+        from faster_whisper import WhisperModel  # ctranslate2等の読み込みはモデルのロード時に
         logger.info(f"Loading Whisper model: {config.model_size}")
         
         self.model = WhisperModel(
             config.model_size,
             device="cpu",
-            compute_type=config.compute_type
+            compute_type=config.compute_type,
+            cpu_threads=config.cpu_threads
         )
         
+        # 短い発話・高負荷時に先に試す小さいモデル
+        self.fast_model = None
+        if config.fast_model_size:
+            logger.info(f"Loading fast Whisper model: {config.fast_model_size}")
+            self.fast_model = WhisperModel(
+                config.fast_model_size,
+                device="cpu",
+                compute_type=config.compute_type,
+                cpu_threads=config.cpu_threads
+            )
+        self.pending = 0  # デコード待ち・実行中の発話数
+        
         logger.info("Whisper model loaded successfully")
 
-    async def transcribe(self, audio_data: np.ndarray) -> str:
-        try:
-            # faster-whisperは音声データを直接受け取れる
-            segments, info = self.model.transcribe(
-                audio_data,
+    def warm_up(self):
+        """初回デコードのコストをロード時に払っておく（無音1秒）"""
+        for model in (self.model, self.fast_model):
+            if model is None:
+                continue
+            segments, _ = model.transcribe(
+                np.zeros(16000, dtype=np.float32),
                 beam_size=self.config.beam_size,
-                vad_filter=self.config.vad_filter,
-                language="ja"  # 日本語に固定（設定可能にしても良い）
+                language="ja"
             )
-            
-            # 全セグメントを結合
-            text_parts = []
-            for segment in segments:
-                text_parts.append(segment.text.strip())
-            
-            full_text = " ".join(text_parts).strip()
+            for _ in segments:
+                pass
+
+    async def transcribe(self, audio_data: np.ndarray) -> str:
+        # デコード中もイベントループ（相槌再生など）を止めない
+        self.pending += 1
+        try:
+            return await asyncio.to_thread(self._transcribe, audio_data)
+        finally:
+            self.pending -= 1
+
+    def _decode(self, model: "WhisperModel", audio_data: np.ndarray) -> Decoded:
+        # faster-whisperは音声データを直接受け取れる
+        segments, info = model.transcribe(
+            audio_data,
+            beam_size=self.config.beam_size,
+            vad_filter=self.config.vad_filter,
+            no_speech_threshold=self.config.no_speech_threshold,
+            log_prob_threshold=self.config.log_prob_threshold,
+            language="ja"  # 日本語に固定（設定可能にしても良い）
+        )
+        
+        # 全セグメントを結合
+        text_parts = []
+        logprob_sum = 0.0
+        weight = 0
+        no_speech_prob = 0.0
+        for segment in segments:
+            text = segment.text.strip()
+            text_parts.append(text)
+            logprob_sum += segment.avg_logprob * max(len(text), 1)
+            weight += max(len(text), 1)
+            no_speech_prob = max(no_speech_prob, segment.no_speech_prob)
+        
+        return Decoded(
+            text=" ".join(text_parts).strip(),
+            avg_logprob=logprob_sum / weight if weight else float("-inf"),
+            no_speech_prob=no_speech_prob if weight else 1.0,
+            language_probability=info.language_probability
+        )
+
+    def route(self, audio_data: np.ndarray) -> str:
+        """最初に使うモデル（"fast" / "main"）を発話長と負荷で選ぶ"""
+        if self.fast_model is None:
+            return "main"
+        if len(audio_data) / 16000 <= self.config.fast_max_duration_s:
+            return "fast"
+        # 待ちが溜まっている時は長い発話も小さいモデルで先に試す
+        return "fast" if self.pending > self.config.fast_queue_depth else "main"
+
+    def is_confident(self, decoded: Decoded) -> bool:
+        return (
+            decoded.avg_logprob >= self.config.fast_min_avg_logprob
+            and decoded.no_speech_prob <= self.config.fast_max_no_speech_prob
+        )
+
+    def _decode_routed(self, audio_data: np.ndarray) -> tuple[Decoded, str]:
+        """ルーティングしてデコード。経路は "main" / "fast" / "fast_fallback"（小さいモデル→再デコード）"""
+        route = self.route(audio_data)
+        if route == "main":
+            return self._decode(self.model, audio_data), route
+        decoded = self._decode(self.fast_model, audio_data)
+        if self.is_confident(decoded):
+            return decoded, route
+        logger.debug(
+            f"Fast ASR not confident (avg_logprob {decoded.avg_logprob:.2f}, "
+            f"no_speech {decoded.no_speech_prob:.2f}): '{decoded.text}' - re-decoding"
+        )
+        return self._decode(self.model, audio_data), "fast_fallback"
+
+    def _transcribe(self, audio_data: np.ndarray) -> str:
+        return self._transcribe_routed(audio_data)[0]
+
+    def _transcribe_routed(self, audio_data: np.ndarray) -> tuple[str, Optional[str]]:
+        """(テキスト, 経路)。失敗時の経路はNone"""
+        start = time.perf_counter()
+        try:
+            decoded, route = self._decode_routed(audio_data)
+            full_text = decoded.text
+            elapsed = time.perf_counter() - start
+            ASR_DECODE_SECONDS.observe(elapsed)
+            ASR_ROUTES.labels(route).inc()
+            ASR_ROUTE_SECONDS.labels(route).observe(elapsed)
+            if len(audio_data):
+                ASR_RTF.observe(elapsed / (len(audio_data) / 16000))
             
             if full_text:
-                logger.info(f"Transcribed: '{full_text}' (confidence: {info.language_probability:.2f})")
+                logger.info(
+                    f"Transcribed: '{full_text}' (confidence: {decoded.language_probability:.2f}, "
+                    f"route: {route}, {elapsed * 1000:.0f}ms)"
+                )
             
-            return full_text
+            return full_text, route
             
         except Exception as e:
             logger.error(f"ASR transcription failed: {e}")
-            return ""
\ No newline at end of file
+            return "", None
+
+    def _generate(self, model: "WhisperModel", audios: list[np.ndarray]) -> list[Decoded]:
+        """複数の発話（各30秒以内）を1回のエンコード・デコードで認識（温度フォールバックなし）"""
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+
+        tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language="ja")
+        features = np.stack([pad_or_trim(model.feature_extractor(audio)) for audio in audios])
+        prompt = list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+        results = model.model.generate(
+            model.encode(features),
+            [prompt] * len(audios),
+            beam_size=self.config.beam_size,
+            return_scores=True,
+            return_no_speech_prob=True
+        )
+        decoded = []
+        for result in results:
+            tokens = result.sequences_ids[0]
+            # scoresは長さで正規化された対数確率（faster-whisperと同じ換算で平均にする）
+            avg_logprob = result.scores[0] * len(tokens) / (len(tokens) + 1)
+            decoded.append(Decoded(tokenizer.decode(tokens).strip(), avg_logprob, result.no_speech_prob, 1.0))
+        return decoded
+
+    def _is_silent(self, decoded: Decoded) -> bool:
+        """faster-whisperのtranscribeが無音として捨てる条件と同じ"""
+        return (
+            decoded.no_speech_prob > self.config.no_speech_threshold
+            and decoded.avg_logprob < self.config.log_prob_threshold
+        )
+
+    def _needs_fallback(self, decoded: Decoded) -> bool:
+        """transcribeなら温度を上げて再デコードする結果（低い対数確率・繰り返し）"""
+        if decoded.avg_logprob < self.config.log_prob_threshold:
+            return True
+        data = decoded.text.encode("utf-8")
+        return bool(data) and len(data) / len(zlib.compress(data)) > COMPRESSION_RATIO_THRESHOLD
+
+    def _has_speech(self, audio: np.ndarray) -> bool:
+        from faster_whisper.vad import get_speech_timestamps
+        return bool(get_speech_timestamps(audio))
+
+    def _transcribe_batch(self, audios: list[np.ndarray]) -> list[str]:
+        """複数の発話をまとめて認識
+
+        経路の選択（fast / main / fast_fallback）は_decode_routedと同じで、経路ごとに1バッチにする。
+        無音判定は_decodeと同じ条件で空にし、温度フォールバックが要る結果だけ1件ずつ_decodeし直す。
+        """
+        start = time.perf_counter()
+        results: list[Optional[Decoded]] = [None] * len(audios)
+        routes = [self.route(audio) for audio in audios]
+        if self.config.vad_filter:
+            for i, audio in enumerate(audios):
+                if not self._has_speech(audio):
+                    results[i] = Decoded("", float("-inf"), 1.0, 1.0)
+
+        fast = [i for i, route in enumerate(routes) if route == "fast" and results[i] is None]
+        if fast:
+            for i, decoded in zip(fast, self._generate(self.fast_model, [audios[i] for i in fast])):
+                if self.is_confident(decoded):
+                    results[i] = decoded
+                else:
+                    routes[i] = "fast_fallback"
+        main = [i for i in range(len(audios)) if results[i] is None]
+        if main:
+            for i, decoded in zip(main, self._generate(self.model, [audios[i] for i in main])):
+                results[i] = decoded
+
+        texts = []
+        for i, decoded in enumerate(results):
+            if self._is_silent(decoded):
+                texts.append("")
+                continue
+            if self._needs_fallback(decoded):
+                model = self.fast_model if routes[i] == "fast" else self.model
+                decoded = self._decode(model, audios[i])
+            texts.append(decoded.text)
+
+        # バッチ全体の時間を発話数で割った1件あたりの時間を記録（単発のデコードと比べられるように）
+        elapsed = (time.perf_counter() - start) / len(audios)
+        for audio, route in zip(audios, routes):
+            ASR_DECODE_SECONDS.observe(elapsed)
+            ASR_ROUTES.labels(route).inc()
+            ASR_ROUTE_SECONDS.labels(route).observe(elapsed)
+            if len(audio):
+                ASR_RTF.observe(elapsed / (len(audio) / 16000))
+        logger.info(f"Transcribed batch of {len(audios)} ({elapsed * 1000:.0f}ms per utterance): {texts}")
+        return texts
+
+
+class BatchedASR:
+    """ASR互換。window_ms以内に届いた発話をまとめて1回のバッチでデコードする
+
+    複数ストリームの発話終了が重なったときのスループットを上げる。
+    結果は要求ごとに返し、バッチは到着順に1つずつ処理する。
+    """
+
+    def __init__(self, asr: ASR, window_ms: int, max_batch: int = 8):
+        self.asr = asr
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self.pending: list[tuple[np.ndarray, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.lock = asyncio.Lock()  # FIFOなのでバッチの処理順 = 到着順
+        self.tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.utterances = 0
+
+    def warm_up(self):
+        self.asr.warm_up()
+
+    async def transcribe(self, audio_data: np.ndarray) -> str:
+        if len(audio_data) > MAX_BATCH_SAMPLES:
+            return await self.asr.transcribe(audio_data)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((audio_data, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window_s, self._flush)
+        self.asr.pending += 1  # 経路選択（fast_queue_depth）の待ち数
+        try:
+            return await future
+        finally:
+            self.asr.pending -= 1
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self._decode(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _decode(self, batch: list[tuple[np.ndarray, asyncio.Future]]):
+        self.batches += 1
+        self.utterances += len(batch)
+        ASR_BATCH_SIZE.observe(len(batch))
+        async with self.lock:
+            try:
+                texts = await asyncio.to_thread(self.asr._transcribe_batch, [audio for audio, _ in batch])
+            except Exception as e:
+                logger.error(f"ASR batch transcription failed: {e}")
+                texts = [""] * len(batch)
+        for (_, future), text in zip(batch, texts):
+            if not future.done():
+                future.set_result(text)
+
+
+def _asr_worker(conn, config: ASRConfig, shm_name: str):
+    """子プロセス側: 共有メモリ上の音声をデコードしてテキストを返す"""
+    shm = shared_memory.SharedMemory(name=shm_name, track=False)  # 解放は親プロセスが行う
+    asr = ASR(config)
+    asr.warm_up()
+    conn.send(("ready", {}))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == "stop":
+            break
+        if message[0] == "transcribe":
+            audio = np.ndarray((message[1],), dtype=np.float32, buffer=shm.buf)
+            asr.pending = message[2]  # 子プロセスは1件ずつなので待ち数は親から受け取る
+            text, route = asr._transcribe_routed(audio)
+            del audio
+            # 子プロセスのメトリクスは公開されないので、経路は親で記録する
+            conn.send(("done", text, route))
+    shm.close()
+
+
+class RemoteASR:
+    """ASR互換。Whisperを子プロセスで動かし、発話音声は共有メモリで渡す（pickleしない）"""
+
+    def __init__(self, config: ASRConfig, max_utterance_s: float = 30.0, restart_delay_s: float = 1.0):
+        self.config = config
+        self.capacity = int(16000 * max_utterance_s)
+        self.shm = shared_memory.SharedMemory(create=True, size=self.capacity * 4)
+        self.buffer = np.ndarray((self.capacity,), dtype=np.float32, buffer=self.shm.buf)
+        self.lock = asyncio.Lock()  # 共有メモリは1要求ずつ使う
+        self.pending = 0
+        self.worker = ProcessWorker("asr", _asr_worker, (config, self.shm.name), restart_delay_s)
+
+    async def start(self) -> "RemoteASR":
+        await self.worker.start()
+        return self
+
+    async def transcribe(self, audio_data: np.ndarray) -> str:
+        if len(audio_data) > self.capacity:
+            logger.warning(f"Utterance longer than {self.capacity / 16000:.0f}s - using the last part")
+            audio_data = audio_data[-self.capacity:]
+        self.pending += 1
+        try:
+            async with self.lock:
+                start = time.perf_counter()
+                self.buffer[:len(audio_data)] = audio_data
+                try:
+                    async for message in self.worker.call(("transcribe", len(audio_data), self.pending)):
+                        text, route = message[1], message[2]
+                except WorkerCrashed as e:
+                    logger.error(f"ASR transcription failed: {e}")
+                    return ""
+        finally:
+            self.pending -= 1
+        elapsed = time.perf_counter() - start
+        ASR_DECODE_SECONDS.observe(elapsed)
+        if route is not None:
+            ASR_ROUTES.labels(route).inc()
+            ASR_ROUTE_SECONDS.labels(route).observe(elapsed)
+        if len(audio_data):
+            ASR_RTF.observe(elapsed / (len(audio_data) / 16000))
+        return text
+
+    async def close(self):
+        await self.worker.close()
+        del self.buffer
+        self.shm.close()
+        self.shm.unlink()
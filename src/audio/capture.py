@@ -1,37 +1,54 @@
-import sounddevice as sd
 import numpy as np
 import asyncio
+import time
 from typing import AsyncIterator
 from collections import deque
+from .frame import AudioFrame
 from ..core.config import AudioConfig
+from ..core.logging import Throttle
+from ..core.metrics import REGISTRY
 from loguru import logger
 
+CAPTURE_OVERFLOWS = REGISTRY.counter("audio_capture_overflows_total", "Input overflows reported by the capture callback")
+OVERFLOW_LOG = Throttle(interval_s=1.0)  # 音声コールバック内なので間引く
+
 
 class AudioCapture:
     def __init__(self, config: AudioConfig):
         self.config = config
-        self.ring_buffer = deque(maxlen=config.rate * 10)  # 10秒分のリングバッファ
+        self.chunk_size = int(config.rate * config.chunk_ms / 1000)
+        # 10秒分のリングバッファ（チャンク単位、溢れたら古い方から捨てる）
+        self.ring_buffer: deque[AudioFrame] = deque(maxlen=max(1, config.rate * 10 // self.chunk_size))
+        self.pending = np.zeros(0, dtype=np.float32)  # チャンクに満たない端数
         self.is_recording = False
 
-    def _audio_callback(self, indata, frames, time, status):
+    def _audio_callback(self, indata, frames, time_info, status):
         if status:
-            logger.warning(f"Audio input overflow: {status}")
+            if status.input_overflow:
+                CAPTURE_OVERFLOWS.inc()
+            OVERFLOW_LOG.warning("Audio input overflow: {}", status)
         
-        # モノラル16kHzに変換
+        # モノラル16kHz（InputStreamがfloat32で渡すので変換はしない。indataは再利用されるのでコピー）
+        timestamp = time.monotonic()
         audio_data = indata[:, 0] if indata.ndim > 1 else indata
-        audio_data = audio_data.astype(np.float32)
+        if frames == self.chunk_size and len(self.pending) == 0:
+            self.ring_buffer.append(AudioFrame(audio_data.copy(), timestamp))
+            return
         
-        # リングバッファに追加
-        self.ring_buffer.extend(audio_data)
+        # ブロック長がチャンク長と違う場合は揃え直す
+        self.pending = np.concatenate([self.pending, audio_data])
+        usable = len(self.pending) // self.chunk_size * self.chunk_size
+        for start in range(0, usable, self.chunk_size):
+            self.ring_buffer.append(AudioFrame(self.pending[start:start + self.chunk_size], timestamp))
+        self.pending = self.pending[usable:].copy()
 
-    async def stream(self) -> AsyncIterator[np.ndarray]:
-        chunk_size = int(self.config.rate * self.config.chunk_ms / 1000)
-        
+    async def stream(self) -> AsyncIterator[AudioFrame]:
+        import sounddevice as sd  # PortAudioの初期化はキャプチャ開始時に
         with sd.InputStream(
             samplerate=self.config.rate,
             channels=1,
             dtype=np.float32,
-            blocksize=chunk_size,
+            blocksize=self.chunk_size,
             device=self.config.device,
             callback=self._audio_callback
         ):
@@ -39,10 +56,8 @@ class AudioCapture:
             logger.info(f"Audio capture started (device: {self.config.device}, rate: {self.config.rate}Hz)")
             
             while self.is_recording:
-                if len(self.ring_buffer) >= chunk_size:
-                    # チャンクサイズ分のデータを取り出し
-                    chunk = np.array([self.ring_buffer.popleft() for _ in range(chunk_size)])
-                    yield chunk
+                if self.ring_buffer:
+                    yield self.ring_buffer.popleft()
                 else:
                     await asyncio.sleep(0.001)  # 短時間待機
 
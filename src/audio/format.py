@@ -0,0 +1,206 @@
+import struct
+from functools import lru_cache
+from math import gcd
+from typing import NamedTuple, Optional
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+INT16_SCALE = 32768.0
+
+
+class WavData(NamedTuple):
+    samples: np.ndarray  # 元バッファを参照するビュー（モノラルは1次元、それ以外は(n, ch)）
+    sample_rate: int
+    channels: int
+
+
+def parse_wav(data) -> WavData:
+    """WAVヘッダをmemoryviewで解析し、データ部をコピーせずNumPy配列として返す"""
+    view = memoryview(data)
+    if len(view) < 12 or view[0:4] != b"RIFF" or view[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE buffer")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", view, offset)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", view, body)
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # SubFormat GUIDの先頭2バイトが実フォーマット
+                audio_format = struct.unpack_from("<H", view, body + 24)[0]
+            fmt = (audio_format, channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            audio_format, channels, sample_rate, bits = fmt
+            dtype = _sample_dtype(audio_format, bits)
+            # ストリーミング出力ではサイズが不正な場合があるので実データ長で丸める
+            end = min(body + chunk_size, len(view))
+            end -= (end - body) % (dtype.itemsize * channels)
+            samples = np.frombuffer(view[body:end], dtype=dtype)
+            if channels > 1:
+                samples = samples.reshape(-1, channels)
+            return WavData(samples, sample_rate, channels)
+        # チャンクは2バイト境界に揃えられる
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError("WAV data chunk not found")
+
+
+def _sample_dtype(audio_format: int, bits: int) -> np.dtype:
+    if audio_format == WAVE_FORMAT_PCM and bits == 16:
+        return np.dtype("<i2")
+    if audio_format == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        return np.dtype("<f4")
+    raise ValueError(f"Unsupported WAV format: format={audio_format}, bits={bits}")
+
+
+def int16_to_float32(samples: np.ndarray) -> np.ndarray:
+    """int16 → [-1, 1)のfloat32"""
+    out = samples.astype(np.float32)
+    out *= 1.0 / INT16_SCALE
+    return out
+
+
+def float32_to_int16(samples: np.ndarray) -> np.ndarray:
+    """float32 → int16（範囲外はクリップ）"""
+    scaled = np.multiply(samples, INT16_SCALE, dtype=np.float32)
+    np.clip(scaled, -INT16_SCALE, INT16_SCALE - 1, out=scaled)
+    return scaled.astype(np.int16)
+
+
+@lru_cache(maxsize=32)
+def _polyphase_filter(src_rate: int, dst_rate: int) -> tuple[int, int, np.ndarray]:
+    """(元レート, 出力レート)ごとのポリフェーズFIR設計をキャッシュ"""
+    from scipy.signal import firwin  # scipyは読み込みが重いので初回のリサンプリング時に
+    g = gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    max_rate = max(up, down)
+    half_len = 10 * max_rate  # scipy.signal.resample_polyの既定と同じ
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)).astype(np.float32)
+    taps.setflags(write=False)
+    return up, down, taps
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """ポリフェーズフィルタでfloat32信号をリサンプリング"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    up, down, taps = _polyphase_filter(src_rate, dst_rate)
+    from scipy.signal import resample_poly
+    # resample_polyは渡したwindowを内部でコピーして使う
+    return resample_poly(samples, up, down, window=taps).astype(np.float32, copy=False)
+
+
+@lru_cache(maxsize=32)
+def _polyphase_bank(src_rate: int, dst_rate: int) -> tuple[int, int, int, np.ndarray]:
+    """_polyphase_filterのタップを位相ごとに分けたもの: (up, down, half_len, [位相, タップ])"""
+    up, down, taps = _polyphase_filter(src_rate, dst_rate)
+    per_phase = -(-len(taps) // up)
+    padded = np.zeros(per_phase * up, dtype=np.float32)
+    padded[:len(taps)] = taps * up  # resample_polyと同じくゲインをupで補う
+    bank = np.ascontiguousarray(padded.reshape(per_phase, up).T)
+    bank.setflags(write=False)
+    return up, down, (len(taps) - 1) // 2, bank
+
+
+class StreamResampler:
+    """チャンクに分かれて届く信号のリサンプリング
+
+    フィルタの履歴と出力の位相をチャンク間で引き継ぐので、境界で無音詰めによる段差や
+    丸めによる長さのずれが出ない。全チャンクのprocess()とflush()の出力を連結すると、
+    全体を一度にresample()した結果と一致する。出力はフィルタ長の半分（数サンプル）遅れる。
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.reset()
+
+    def reset(self):
+        if self.src_rate == self.dst_rate:
+            return
+        self.up, self.down, self.half_len, self.bank = _polyphase_bank(self.src_rate, self.dst_rate)
+        taps = self.bank.shape[1]
+        self.history = np.zeros(taps - 1, dtype=np.float32)  # 先頭より前は無音
+        self.base = -(taps - 1)  # history[0]の入力上の位置
+        self.received = 0
+        self.produced = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """float32のチャンクを渡し、現時点で確定した出力を返す"""
+        if self.src_rate == self.dst_rate or len(samples) == 0:
+            return samples
+        self.history = np.concatenate([self.history, samples.astype(np.float32, copy=False)])
+        self.received += len(samples)
+        # 出力mは入力 (m*down + half_len) // up までが揃えば計算できる
+        return self._emit(max(self.produced, -(-(self.received * self.up - self.half_len) // self.down)))
+
+    def flush(self) -> np.ndarray:
+        """入力の終わり（以降は無音）として残りを出力し、状態を初期化する"""
+        if self.src_rate == self.dst_rate:
+            return np.zeros(0, dtype=np.float32)
+        total = -(-self.received * self.up // self.down)
+        if total > self.produced:
+            last = ((total - 1) * self.down + self.half_len) // self.up
+            pad = last - self.base + 1 - len(self.history)
+            if pad > 0:
+                self.history = np.concatenate([self.history, np.zeros(pad, dtype=np.float32)])
+        out = self._emit(total)
+        self.reset()
+        return out
+
+    def _emit(self, count: int) -> np.ndarray:
+        taps = self.bank.shape[1]
+        if count <= self.produced:
+            return np.zeros(0, dtype=np.float32)
+        position = np.arange(self.produced, count) * self.down + self.half_len
+        newest = position // self.up - self.base
+        windows = self.history[newest[:, None] - np.arange(taps)]
+        out = np.einsum("ij,ij->i", windows, self.bank[position % self.up]).astype(np.float32, copy=False)
+        self.produced = count
+        # 次の出力に要る分だけ履歴を残す
+        drop = (count * self.down + self.half_len) // self.up - (taps - 1) - self.base
+        if drop > 0:
+            self.history = self.history[drop:]
+            self.base += drop
+        return out
+
+
+class PCMResampler:
+    """int16 PCMのチャンクを出力レートへ続けて変換する（入力レートが変わったら前の残りを出し切る）"""
+
+    def __init__(self, dst_rate: int):
+        self.dst_rate = dst_rate
+        self.resampler: Optional[StreamResampler] = None
+
+    def convert(self, pcm, src_rate: int) -> np.ndarray:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        if src_rate == self.dst_rate:
+            if self.resampler is None:
+                return samples
+            tail = float32_to_int16(self.resampler.flush())
+            self.resampler = None
+            return np.concatenate([tail, samples])
+        tail = None
+        if self.resampler is None or self.resampler.src_rate != src_rate:
+            if self.resampler is not None:
+                tail = self.resampler.flush()
+            self.resampler = StreamResampler(src_rate, self.dst_rate)
+        out = self.resampler.process(int16_to_float32(samples))
+        if tail is not None:
+            out = np.concatenate([tail, out])
+        return float32_to_int16(out)
+
+
+def convert_pcm(pcm, src_rate: int, dst_rate: int) -> np.ndarray:
+    """int16 PCMバッファを出力レートのint16配列に変換"""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    if src_rate == dst_rate:
+        return samples
+    return float32_to_int16(resample(int16_to_float32(samples), src_rate, dst_rate))
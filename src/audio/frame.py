@@ -0,0 +1,48 @@
+import time
+from typing import Optional
+import numpy as np
+from .format import float32_to_int16, int16_to_float32
+
+
+class AudioFrame:
+    """入力音声のチャンク1つ分
+
+    float32の波形を持ち、int16・バイト列・RMSは最初に使われた時に1回だけ計算してキャッシュする。
+    Wake Word（int16）とVAD（PCMバイト列）が同じフレームを使っても変換は1回で済む。
+    """
+
+    __slots__ = ("samples", "timestamp", "_int16", "_bytes", "_rms")
+
+    def __init__(self, samples: np.ndarray, timestamp: Optional[float] = None, int16: Optional[np.ndarray] = None):
+        self.samples = samples  # float32 [-1, 1)
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self._int16 = int16
+        self._bytes = None
+        self._rms = None
+
+    @classmethod
+    def from_int16(cls, pcm: np.ndarray, timestamp: Optional[float] = None) -> "AudioFrame":
+        """int16 PCMから作る（int16はそのままキャッシュとして使う）"""
+        return cls(int16_to_float32(pcm), timestamp, int16=pcm)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    @property
+    def int16(self) -> np.ndarray:
+        if self._int16 is None:
+            self._int16 = float32_to_int16(self.samples)
+        return self._int16
+
+    @property
+    def bytes(self) -> memoryview:
+        """int16 PCMのバイト列ビュー（コピーしない）"""
+        if self._bytes is None:
+            self._bytes = memoryview(np.ascontiguousarray(self.int16)).cast("B")
+        return self._bytes
+
+    @property
+    def rms(self) -> float:
+        if self._rms is None:
+            self._rms = float(np.sqrt(np.mean(np.square(self.samples, dtype=np.float32))))
+        return self._rms
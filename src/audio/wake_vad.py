@@ -1,27 +1,89 @@
-import webrtcvad
 import numpy as np
 import asyncio
+import copy
 import time
-from typing import AsyncIterator
-from collections import deque
-from openwakeword import Model as WakeWordModel
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Optional
+from collections import defaultdict, deque
+from .frame import AudioFrame
 from ..core.config import WakeConfig, VADConfig
+from ..core.logging import Throttle
+from ..core.metrics import REGISTRY
 from loguru import logger
 
+if TYPE_CHECKING:
+    import webrtcvad
+
+WAKE_SCORE = REGISTRY.histogram(
+    "wake_score", "Highest wake word score per prediction",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+)
+VAD_FRAMES = REGISTRY.counter("vad_frames_total", "VAD decisions per frame", ("decision",))
+VAD_SPEECH = VAD_FRAMES.labels("speech")
+VAD_SILENCE = VAD_FRAMES.labels("silence")
+
+# フレームごとに呼ばれる箇所のログは間引く（遅いコンソールへの書き込みで取りこぼさないように）
+WAKE_PREDICTION_LOG = Throttle(interval_s=0.5)
+WAKE_ERROR_LOG = Throttle(interval_s=5.0)
+VAD_ERROR_LOG = Throttle(interval_s=5.0)
+
+MAX_SPEECH_SAMPLES = 16000 * 5  # 発話バッファは直近5秒分
+SILENCE_FRAMES = 75  # この数のフレームが無音なら発話終了（20msチャンクで1.5秒）
+
+
+@dataclass(slots=True)
+class StreamState:
+    """音声ストリーム1本分のWake/VAD状態（モデルは持たない）"""
+    speech: np.ndarray = field(default_factory=lambda: np.zeros(MAX_SPEECH_SAMPLES, dtype=np.float32))
+    speech_len: int = 0
+    is_awake: bool = False
+    speech_detected: bool = False  # 音声検知フラグ
+    paused: bool = False  # 音声処理一時停止フラグ
+    silence_counter: int = 0
+    status_counter: int = 0  # ステータス表示用カウンタ
+    cooldown_until: float = 0.0  # クールダウン終了時刻（時間ベース）
+    vad: Optional["webrtcvad.Vad"] = None  # WebRTC VADは雑音推定を内部に持つためストリームごとに作る
+    wake_buffers: Optional[tuple] = None  # OpenWakeWordの前処理バッファと予測履歴
+    # "wake" / "speech.start" を通知するフック（パイプラインがバスへ流す）
+    on_event: Optional[Callable[[str], Awaitable[None]]] = None
+
+    def append_speech(self, chunk: np.ndarray):
+        """発話バッファに追加（溢れた分は古い方から捨てる）"""
+        capacity = len(self.speech)
+        if len(chunk) >= capacity:
+            self.speech[:] = chunk[-capacity:]
+            self.speech_len = capacity
+            return
+        overflow = self.speech_len + len(chunk) - capacity
+        if overflow > 0:
+            self.speech[:self.speech_len - overflow] = self.speech[overflow:self.speech_len]
+            self.speech_len -= overflow
+        self.speech[self.speech_len:self.speech_len + len(chunk)] = chunk
+        self.speech_len += len(chunk)
+
+    def take_speech(self) -> np.ndarray:
+        utterance = self.speech[:self.speech_len].copy()
+        self.speech_len = 0
+        return utterance
+
 
 class WakeAndVAD:
+    """Wake Word・VADのエンジン（モデルを持ち、ストリームの状態はStreamStateに分離）
+
+    複数ストリームで1つのインスタンスを共有できる。stateを省略した場合は既定のself.stateを使う。
+    """
+
     def __init__(self, wake_config: WakeConfig, vad_config: VADConfig):
         self.wake_config = wake_config
         self.vad_config = vad_config
         
-        # VAD初期化
-        self.vad = webrtcvad.Vad(vad_config.aggressiveness)
-        
         # Wake Word初期化
         if wake_config.enabled and not wake_config.use_simple_detection:
             try:
                 # パッケージ内の主要wake wordモデルを指定
                 import os
+                from openwakeword import Model as WakeWordModel  # onnxruntime等を読み込むのでここで
                 model_dir = "/Users/yuya/dev/poc-voice-agent/.venv/lib/python3.13/site-packages/openwakeword/resources/models"
                 wake_models = [
                     os.path.join(model_dir, "alexa_v0.1.onnx"),
@@ -50,20 +112,49 @@ class WakeAndVAD:
                 logger.info("Wake word detection disabled")
             self.wake_model = None
         
-        self.is_awake = False
-        self.speech_buffer = deque(maxlen=16000 * 5)  # 5秒分のバッファ
-        self.silence_counter = 0
-        self.silence_threshold = 75  # 75フレーム（約1.5秒）の無音で区間終了
-        self.status_counter = 0  # ステータス表示用カウンタ
-        self.speech_detected = False  # 音声検知フラグ
-        self.paused = False  # 音声処理一時停止フラグ
-        self.cooldown_until = 0  # クールダウン終了時刻（時間ベース）
-
-    def _detect_wake_word(self, audio_chunk: np.ndarray) -> bool:
+        self.silence_threshold = SILENCE_FRAMES
+        # 単一ストリームで使う場合の既定の状態
+        self.state = self.new_state()
+
+    def new_state(self) -> StreamState:
+        """ストリームごとの状態を作る（モデルは共有）"""
+        import webrtcvad
+        return StreamState(
+            vad=webrtcvad.Vad(self.vad_config.aggressiveness),
+            wake_buffers=self._new_wake_buffers()
+        )
+
+    def _new_wake_buffers(self) -> Optional[tuple]:
+        """OpenWakeWordのストリーム状態（前処理の音声・特徴量バッファと予測履歴）を複製
+
+        ONNXセッションは共有し、バッファだけをストリームごとに持たせる。
+        """
+        preprocessor = getattr(self.wake_model, "preprocessor", None)
+        if preprocessor is None or not hasattr(preprocessor, "reset"):
+            return None
+        buffers = copy.copy(preprocessor)
+        if hasattr(preprocessor, "raw_data_buffer"):
+            # reset()はdequeをclearするだけなので、共有しないよう作り直す
+            buffers.raw_data_buffer = deque(maxlen=preprocessor.raw_data_buffer.maxlen)
+        buffers.reset()
+        return buffers, defaultdict(partial(deque, maxlen=30))
+
+    def warm_up(self):
+        """無音で推論を数回回してONNXセッションを温め、状態を戻す"""
+        if self.wake_model is None:
+            return
+        silence = np.zeros(1280, dtype=np.int16)  # 80ms
+        for _ in range(3):
+            self.wake_model.predict(silence)
+        if hasattr(self.wake_model, 'reset'):
+            self.wake_model.reset()
+        self.state = self.new_state()
+
+    def _detect_wake_word(self, frame: AudioFrame, state: Optional[StreamState] = None) -> bool:
+        state = state or self.state
         # 簡易検出モードの場合
         if self.wake_config.enabled and self.wake_config.use_simple_detection:
-            rms = np.sqrt(np.mean(audio_chunk ** 2))
-            if rms > 0.01:  # 閾値は調整可能
+            if frame.rms > 0.01:  # 閾値は調整可能
                 return True
             return False
         
@@ -73,105 +164,121 @@ class WakeAndVAD:
         
         try:
             # OpenWakeWordの最小サンプル数をチェック（400サンプル = 25ms @ 16kHz）
-            if len(audio_chunk) < 400:
+            if len(frame) < 400:
                 return False
                 
-            # audio_chunkをint16に変換（openwakewordの要求形式）
-            audio_int16 = (audio_chunk * 32767).astype(np.int16)
-            prediction = self.wake_model.predict(audio_int16)
+            if state.wake_buffers is not None:
+                self.wake_model.preprocessor, self.wake_model.prediction_buffer = state.wake_buffers
+            # openwakewordはint16を要求する（フレーム側でキャッシュ）
+            prediction = self.wake_model.predict(frame.int16)
+            if prediction:
+                WAKE_SCORE.observe(max(prediction.values()))
             
             # クールダウン中は閾値を高くする
             current_time = time.time()
-            threshold = 0.5 if current_time < self.cooldown_until else 0.3
+            threshold = 0.5 if current_time < state.cooldown_until else 0.3
             
             # デバッグ用：全ての予測結果をログ出力（高スコアのみ）
             for keyword, score in prediction.items():
                 if score > 0.05:  # 0.05以上の場合のみログ
-                    cooldown_status = " (cooldown)" if current_time < self.cooldown_until else ""
-                    logger.debug(f"Wake word prediction: {keyword} (score: {score:.3f}, threshold: {threshold:.1f}){cooldown_status}")
+                    WAKE_PREDICTION_LOG.debug(
+                        "Wake word prediction: {} (score: {:.3f}, threshold: {:.1f}){}",
+                        keyword, score, threshold, " (cooldown)" if current_time < state.cooldown_until else ""
+                    )
                 
                 if score > threshold:
                     logger.info(f"Wake word detected: {keyword} (score: {score:.2f})")
                     return True
             return False
         except Exception as e:
-            logger.error(f"Wake word detection error: {e}")
+            WAKE_ERROR_LOG.error("Wake word detection error: {}", e)
             return False
 
-    def _is_speech(self, audio_chunk: np.ndarray, sample_rate: int = 16000) -> bool:
+    def _is_speech(self, frame: AudioFrame, sample_rate: int = 16000, state: Optional[StreamState] = None) -> bool:
         # WebRTC VADは特定のフレームサイズが必要（10/20/30ms）
         frame_duration = 20  # 20ms
         frame_size = int(sample_rate * frame_duration / 1000)
         
-        if len(audio_chunk) < frame_size:
+        if len(frame) < frame_size:
             return False
         
-        # PCM16に変換
-        pcm_data = (audio_chunk[:frame_size] * 32767).astype(np.int16).tobytes()
+        # PCM16のバイト列（フレーム側でキャッシュ、スライスはコピーしない）
+        pcm_data = frame.bytes[:frame_size * 2]
         
         try:
-            return self.vad.is_speech(pcm_data, sample_rate)
+            is_speech = (state or self.state).vad.is_speech(pcm_data, sample_rate)
+            (VAD_SPEECH if is_speech else VAD_SILENCE).inc()
+            return is_speech
         except Exception as e:
-            logger.debug(f"VAD processing error: {e}")
+            VAD_ERROR_LOG.debug("VAD processing error: {}", e)
             return False
 
-    def pause(self):
+    def pause(self, state: Optional[StreamState] = None):
         """音声処理を一時停止"""
-        self.paused = True
+        (state or self.state).paused = True
         logger.debug("Audio processing paused")
     
-    def resume(self):
+    def resume(self, state: Optional[StreamState] = None):
         """音声処理を再開"""
-        self.paused = False
+        state = state or self.state
+        state.paused = False
         # TTS再生後は必ずwake word待機状態にリセット
-        self.is_awake = False
-        self.speech_detected = False
-        self.speech_buffer.clear()
-        self.silence_counter = 0
+        state.is_awake = False
+        state.speech_detected = False
+        state.speech_len = 0
+        state.silence_counter = 0
         # TTS終了後2秒間はクールダウン（高い閾値を適用）
-        self.cooldown_until = time.time() + 2.0
+        state.cooldown_until = time.time() + 2.0
         logger.debug("Audio processing resumed - reset to wake word waiting state with 2s cooldown")
 
-    async def iter_utterances(self, audio_stream: AsyncIterator[np.ndarray]) -> AsyncIterator[np.ndarray]:
+    async def iter_utterances(
+        self,
+        audio_stream: AsyncIterator[AudioFrame],
+        state: Optional[StreamState] = None
+    ) -> AsyncIterator[np.ndarray]:
+        state = state or self.state
         logger.info("Starting wake word + VAD processing")
         
-        async for chunk in audio_stream:
+        async for frame in audio_stream:
             # 一時停止中はスキップ
-            if self.paused:
+            if state.paused:
                 continue
                 
             # Wake word検出（未起動時のみ）
-            if not self.is_awake:
-                self.status_counter += 1
+            if not state.is_awake:
+                state.status_counter += 1
                 # 10秒ごとに待機状態を表示（50チャンク * 20ms = 1秒, 500チャンク = 10秒）
-                if self.status_counter % 500 == 0:
-                    logger.debug(f"Waiting for wake word... ({self.status_counter} chunks processed)")
+                if state.status_counter % 500 == 0:
+                    logger.debug("Waiting for wake word... ({} chunks processed)", state.status_counter)
                 
-                if self._detect_wake_word(chunk):
-                    self.is_awake = True
+                if self._detect_wake_word(frame, state):
+                    state.is_awake = True
                     logger.info("Wake word triggered - listening for speech")
+                    if state.on_event is not None:
+                        await state.on_event("wake")
                 continue
             
             # VADで音声区間検出
-            is_speech = self._is_speech(chunk)
+            is_speech = self._is_speech(frame, state=state)
             
             if is_speech:
-                if not self.speech_detected:
-                    self.speech_detected = True
+                if not state.speech_detected:
+                    state.speech_detected = True
                     logger.info("Speech detection started")
-                self.speech_buffer.extend(chunk)
-                self.silence_counter = 0
+                    if state.on_event is not None:
+                        await state.on_event("speech.start")
+                state.append_speech(frame.samples)
+                state.silence_counter = 0
             else:
-                if self.speech_detected:
-                    self.silence_counter += 1
+                if state.speech_detected:
+                    state.silence_counter += 1
             
             # 無音が閾値を超えたら発話終了
-            if self.speech_detected and self.silence_counter >= self.silence_threshold and len(self.speech_buffer) > 0:
-                utterance = np.array(list(self.speech_buffer))
-                self.speech_buffer.clear()
-                self.silence_counter = 0
-                self.speech_detected = False
-                self.is_awake = False  # 一度処理したら再度wake wordを待つ
+            if state.speech_detected and state.silence_counter >= self.silence_threshold and state.speech_len > 0:
+                utterance = state.take_speech()
+                state.silence_counter = 0
+                state.speech_detected = False
+                state.is_awake = False  # 一度処理したら再度wake wordを待つ
                 
                 logger.info(f"Utterance completed: {len(utterance)/16000:.2f}s - returning to wake word detection")
-                yield utterance
\ No newline at end of file
+                yield utterance
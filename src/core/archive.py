@@ -0,0 +1,175 @@
+import asyncio
+import json
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional
+import numpy as np
+
+from .config import PrivacyConfig
+from .metrics import REGISTRY
+from loguru import logger
+
+if TYPE_CHECKING:
+    import soundfile as sf
+
+RATE = 16000
+
+ARCHIVE_TURNS = REGISTRY.counter("archive_turns_total", "Turns written to the archive")
+ARCHIVE_SHED = REGISTRY.counter(
+    "archive_shed_total", "Archive data dropped under pressure (audio only or the whole turn)", ("what",)
+)
+SHED_AUDIO = ARCHIVE_SHED.labels("audio")
+SHED_TURN = ARCHIVE_SHED.labels("turn")
+
+
+class Archiver:
+    """ターンごとの発話音声・認識結果・応答・タイミングを別スレッドでまとめて書き出す
+
+    PrivacyConfig.save_audio / save_textに従い、保存しないものは受け取った時点で捨てる。
+    書き込み待ちは有界のキューで、半分以上溜まったら音声を捨ててテキストだけ、満杯ならターンごと捨てる。
+    書き出し先: <archive_dir>/<起動時刻>/seg-NNNN.jsonl（1行1ターン）と seg-NNNN.flac（発話を連結）
+    """
+
+    def __init__(self, config: PrivacyConfig):
+        self.config = config
+        self.queue: queue.Queue = queue.Queue(config.queue_size)
+        self.session_dir = Path(config.archive_dir) / f"{datetime.now():%Y%m%d-%H%M%S}"
+        self.segment = 0
+        self.segment_turns = 0
+        self.index_file = None
+        self.audio_file: Optional["sf.SoundFile"] = None
+        self.audio_offset = 0
+        self.thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self.thread.start()
+        logger.info(
+            f"Archiving to {self.session_dir} (audio: {config.save_audio}, text: {config.save_text})"
+        )
+
+    def submit(self, record: dict, pcm: Optional[np.ndarray]) -> bool:
+        """イベントループから呼ぶ（待たない）。捨てた場合はFalse"""
+        if not self.config.save_text:
+            record = {k: v for k, v in record.items() if k not in ("transcript", "response")}
+        if not self.config.save_audio:
+            pcm = None
+        elif pcm is not None and self.queue.qsize() >= self.config.queue_size // 2:
+            pcm = None
+            SHED_AUDIO.inc()
+        try:
+            self.queue.put_nowait((record, pcm))
+            return True
+        except queue.Full:
+            SHED_TURN.inc()
+            return False
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            batch = [item]
+            # 溜まっている分はまとめて書いてからflushする
+            while item is not None:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            try:
+                for entry in batch:
+                    if entry is not None:
+                        self._write(*entry)
+                self._flush()
+            except Exception as e:
+                logger.error(f"Archive write failed: {e}")
+            if batch[-1] is None:
+                self._close_segment()
+                return
+
+    def _open_segment(self):
+        self.segment += 1
+        self.segment_turns = 0
+        self.audio_offset = 0
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.session_dir / f"seg-{self.segment:04d}"
+        self.index_file = open(stem.with_suffix(".jsonl"), "a", encoding="utf-8")
+        if self.config.save_audio:
+            import soundfile as sf
+            self.audio_file = sf.SoundFile(
+                stem.with_suffix(".flac"), "w", samplerate=RATE, channels=1, format="FLAC", subtype="PCM_16"
+            )
+        self._apply_retention()
+
+    def _close_segment(self):
+        if self.index_file is not None:
+            self.index_file.close()
+            self.index_file = None
+        if self.audio_file is not None:
+            self.audio_file.close()
+            self.audio_file = None
+
+    def _apply_retention(self):
+        """全セッションで新しい順にmax_segmentsだけ残す"""
+        segments = sorted(Path(self.config.archive_dir).glob("*/seg-*.jsonl"), key=lambda p: p.stat().st_mtime)
+        for index in segments[:max(0, len(segments) - self.config.max_segments)]:
+            index.unlink(missing_ok=True)
+            index.with_suffix(".flac").unlink(missing_ok=True)
+
+    def _write(self, record: dict, pcm: Optional[np.ndarray]):
+        if self.index_file is None or self.segment_turns >= self.config.segment_turns:
+            self._close_segment()
+            self._open_segment()
+        if pcm is not None and self.audio_file is not None:
+            self.audio_file.write(pcm)
+            record = record | {"audio": {
+                "file": Path(self.audio_file.name).name,
+                "offset": self.audio_offset,
+                "samples": len(pcm),
+                "rate": RATE,
+            }}
+            self.audio_offset += len(pcm)
+        self.index_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.segment_turns += 1
+        ARCHIVE_TURNS.inc()
+
+    def _flush(self):
+        if self.index_file is not None:
+            self.index_file.flush()
+        if self.audio_file is not None:
+            self.audio_file.flush()
+
+    async def close(self):
+        """書き込み待ちを書き出してセグメントを閉じる"""
+        await asyncio.to_thread(self.queue.put, None)
+        await asyncio.to_thread(self.thread.join)
+
+
+def iter_archive(path: str) -> Iterator[tuple[dict, Optional[np.ndarray]]]:
+    """アーカイブ（ルート・セッションのディレクトリ・セグメントの.jsonl）を古い順に読む
+
+    音声が保存されていないターンはNoneを返す。
+    """
+    import soundfile as sf
+    path = Path(path)
+    if path.is_file():
+        segments = [path]
+    else:
+        segments = sorted(path.glob("seg-*.jsonl")) or sorted(path.glob("*/seg-*.jsonl"))
+    for index in segments:
+        audio_file = None
+        try:
+            with open(index, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    audio = record.get("audio")
+                    if audio is None:
+                        yield record, None
+                        continue
+                    if audio_file is None:
+                        audio_file = sf.SoundFile(index.parent / audio["file"])
+                    audio_file.seek(audio["offset"])
+                    yield record, audio_file.read(audio["samples"], dtype="float32")
+        finally:
+            if audio_file is not None:
+                audio_file.close()
@@ -1,19 +1,115 @@
 import asyncio
-from typing import NamedTuple, Any
+import time
+from enum import Enum
+from typing import NamedTuple, Any, Optional
 
 
 class Event(NamedTuple):
     type: str
     payload: dict[str, Any]
+    ts: float = 0.0  # publish時のtime.monotonic()
+
+
+class Policy(str, Enum):
+    BLOCK = "block"  # キューが空くまでpublish側を待たせる
+    DROP_OLDEST = "drop_oldest"  # 古いイベントを捨てて新しいものを入れる
+    DROP_NEWEST = "drop_newest"  # 新しいイベントを捨てる
+
+
+class Subscription:
+    """購読者ごとの有界キュー"""
+
+    def __init__(self, bus: "Bus", types: Optional[frozenset[str]], name: str, maxsize: int, policy: Policy):
+        self.bus = bus
+        self.types = types
+        self.name = name
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.delivered = 0
+
+    def accepts(self, event_type: str) -> bool:
+        return self.types is None or event_type in self.types
+
+    async def deliver(self, event: Event):
+        if self.policy is Policy.BLOCK:
+            await self.queue.put(event)
+            self.delivered += 1
+        else:
+            self.deliver_nowait(event)
+
+    def deliver_nowait(self, event: Event):
+        if self.queue.full():
+            self.dropped += 1
+            if self.policy is Policy.DROP_OLDEST:
+                self.queue.get_nowait()
+            else:
+                return
+        self.queue.put_nowait(event)
+        self.delivered += 1
+
+    async def get(self) -> Event:
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Event:
+        return await self.queue.get()
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def close(self):
+        self.bus.unsubscribe(self)
 
 
 class Bus:
+    """イベント種別ごとに複数購読者へ配送するpub/subバス"""
+
     def __init__(self):
-        self.q = asyncio.Queue()
+        self.subscriptions: list[Subscription] = []
+
+    def subscribe(
+        self,
+        *types: str,
+        name: str = "",
+        maxsize: int = 0,
+        policy: Policy = Policy.BLOCK
+    ) -> Subscription:
+        """typesを省略すると全イベントを受け取る"""
+        subscription = Subscription(self, frozenset(types) if types else None, name, maxsize, policy)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
 
     async def publish(self, event: Event):
-        await self.q.put(event)
+        if not event.ts:
+            event = event._replace(ts=time.monotonic())
+        for subscription in self.subscriptions:
+            if subscription.accepts(event.type):
+                await subscription.deliver(event)
+
+    def publish_nowait(self, event: Event):
+        """待てない文脈用。BLOCK購読者でも満杯なら捨てる"""
+        if not event.ts:
+            event = event._replace(ts=time.monotonic())
+        for subscription in self.subscriptions:
+            if subscription.accepts(event.type):
+                subscription.deliver_nowait(event)
 
-    async def subscribe(self):
-        while True:
-            yield await self.q.get()
\ No newline at end of file
+    def stats(self) -> dict[str, dict[str, int]]:
+        """購読者ごとのキュー深さ・配送数・破棄数"""
+        return {
+            subscription.name or f"sub{i}": {
+                "depth": subscription.depth,
+                "maxsize": subscription.queue.maxsize,
+                "delivered": subscription.delivered,
+                "dropped": subscription.dropped,
+            }
+            for i, subscription in enumerate(self.subscriptions)
+        }
@@ -1,6 +1,8 @@
+import socket
 import yaml
+from pathlib import Path
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 
 class AudioConfig(BaseModel):
@@ -24,8 +26,18 @@ class VADConfig(BaseModel):
 class ASRConfig(BaseModel):
     model_size: str = "small"
     compute_type: str = "int8"
+    cpu_threads: int = 0  # 0ならfaster-whisperの既定
     beam_size: int = 1
     vad_filter: bool = True
+    no_speech_threshold: float = 0.6  # これを超え、かつ平均対数確率がlog_prob_threshold未満なら無音として捨てる
+    log_prob_threshold: float = -1.0  # 下回ったら温度を上げて再デコード
+    fast_model_size: Optional[str] = None  # 例: "tiny"。指定すると短い発話はこちらで先にデコード
+    fast_max_duration_s: float = 2.5  # これ以下の発話は小さいモデルへ
+    fast_queue_depth: int = 2  # デコード待ちがこれを超えたら長い発話も小さいモデルへ
+    fast_min_avg_logprob: float = -0.8  # 下回ったら大きいモデルで再デコード
+    fast_max_no_speech_prob: float = 0.6  # 上回ったら大きいモデルで再デコード
+    batch_window_ms: int = 0  # >0なら、この時間内に届いた発話をまとめてデコード（複数ストリーム向け）
+    max_batch: int = 8
 
 
 class LLMConfig(BaseModel):
@@ -37,6 +49,12 @@ class LLMConfig(BaseModel):
     top_k: int = 40
     temp: float = 0.7
     max_tokens: int = 256
+    lazy_load: bool = False  # Trueなら最初のWake Word検知までロードしない
+    speculative_prefill: bool = True  # Wake Word検知時にプロンプトの既知部分（システム・履歴）を先に評価
+    speculative: Literal["off", "prompt_lookup", "draft"] = "off"  # 投機的デコーディング
+    draft_tokens: int = 10  # 1回に提案するトークン数
+    lookup_ngram: int = 2  # prompt_lookupで照合するn-gramの最大長
+    draft_gguf_path: Optional[str] = None  # draft用の小さいモデル（本体と同じ語彙）
 
 
 class AgentConfig(BaseModel):
@@ -48,16 +66,90 @@ class TTSConfig(BaseModel):
     piper_bin: str = "piper"
     voice_dir: str = "models/piper/ja-JP-voice"
     sentence_pause_ms: int = 120
+    output_device: Optional[str] = None
+    output_rate: Optional[int] = None  # Noneの場合はデバイスの既定レート
+    backends: list[str] = ["voicevox", "piper"]  # 優先順
+    voicevox_url: str = "http://127.0.0.1:50021"
+    voicevox_speaker: int = 3
+    first_audio_timeout_ms: int = 1500  # 超えたら次のバックエンドへ切り替え
+    stream_stall_timeout_ms: int = 3000  # 音声の途中でチャンクがこれ以上途切れたら残りを次のバックエンドでも合成し、先に返した方を使う
+    stats_window: int = 20
+    unhealthy_error_rate: float = 0.5
+    retry_after_s: float = 30.0
+    segment_assembly: bool = False  # 定型応答をセグメント単位のキャッシュから組み立てる
+    segment_variables: list[str] = ["電気", "エアコン", "テレビ"]  # 可変部分として扱う語
+    segment_max_chars: int = 32  # これより長い文は全文合成
+    segment_crossfade_ms: int = 10
+    segment_cache_size: int = 512
+    segment_prewarm: bool = False  # 起動時に時・分のセグメントを合成しておく
+
+
+class FillerClipConfig(BaseModel):
+    text: str
+    min_expected_ms: int  # 予想待ち時間がこれ以上の場合に使う
+
+
+class FillerConfig(BaseModel):
+    enabled: bool = False
+    clips: list[FillerClipConfig] = [
+        FillerClipConfig(text="はい", min_expected_ms=1500),
+        FillerClipConfig(text="少々お待ちください", min_expected_ms=4000),
+    ]
+    initial_expected_ms: int = 3000  # 実測が溜まるまでの予想待ち時間
+    ewma_alpha: float = 0.3
 
 
 class LoggingConfig(BaseModel):
     level: str = "DEBUG"
     json_format: bool = False
+    trace_path: Optional[str] = "logs/turn_traces.jsonl"  # ターントレースのJSONL（Noneで無効）
+    trace_rotation: str = "10 MB"
+    trace_retention: int = 5
+    enqueue: bool = True  # コンソールへの書き込みを専用スレッドで行う（呼び出し側を待たせない）
+    queue_size: int = 10000  # 書き込み待ちの上限（溢れた分は捨てる）
+
+
+class WorkersConfig(BaseModel):
+    asr: bool = False  # Whisperを別プロセスで動かす（GILを実時間処理と取り合わない）
+    llm: bool = False  # llama.cppを別プロセスで動かす
+    max_utterance_s: float = 30.0  # 音声受け渡し用の共有メモリのサイズ
+    restart_delay_s: float = 1.0  # 落ちたワーカーを再起動するまでの待ち
+
+
+class MetricsConfig(BaseModel):
+    enabled: bool = False
+    host: str = "127.0.0.1"  # 外部から収集する場合は0.0.0.0
+    port: int = 9464
+    path: str = "/metrics"
+
+
+class WatchdogConfig(BaseModel):
+    enabled: bool = True  # イベントループの遅れを計測し、止めている処理をログ・メトリクスに出す
+    interval_ms: int = 50  # ハートビートの間隔
+    stall_threshold_ms: int = 100  # これ以上遅れたらループスレッドのスタックを取る
+    stack_depth: int = 12  # ログに出すスタックの深さ
+
+
+class ServerConfig(BaseModel):
+    enabled: bool = False  # Trueならローカルマイクの代わりにWebSocketで複数クライアントを受け付ける
+    host: str = "0.0.0.0"
+    port: int = 8765
+    path: str = "/ws"
+    max_clients: int = 16
+    output_rate: int = 16000  # helloで指定が無い場合の返送音声レート
+    send_timeout_s: float = 5.0  # 応答音声の送信がこれ以上詰まったら切断
+    hello_timeout_s: float = 5.0
+    heartbeat_s: float = 20.0
+    max_message_bytes: int = 1 << 20
 
 
 class PrivacyConfig(BaseModel):
-    save_audio: bool = False
-    save_text: bool = True
+    save_audio: bool = False  # 発話音声をアーカイブに保存（FLAC）
+    save_text: bool = True  # 認識結果・応答をアーカイブに保存（どちらも無効ならアーカイブしない）
+    archive_dir: str = "logs/archive"
+    segment_turns: int = 100  # 1セグメント（.jsonl / .flac）あたりのターン数
+    max_segments: int = 50  # 全セッションでこれを超えたら古いセグメントから削除
+    queue_size: int = 32  # 書き込み待ちのターン数（半分を超えたら音声を、満杯ならターンを捨てる）
 
 
 class Config(BaseModel):
@@ -68,14 +160,41 @@ class Config(BaseModel):
     llm: LLMConfig = LLMConfig()
     agent: AgentConfig = AgentConfig()
     tts: TTSConfig = TTSConfig()
+    filler: FillerConfig = FillerConfig()
     logging: LoggingConfig = LoggingConfig()
+    workers: WorkersConfig = WorkersConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    watchdog: WatchdogConfig = WatchdogConfig()
+    server: ServerConfig = ServerConfig()
     privacy: PrivacyConfig = PrivacyConfig()
 
 
+def machine_override_path(config_path: str) -> Path:
+    """マシン固有の上書き設定（benchmarks.autotuneが書き出す）: <設定ディレクトリ>/machine/<ホスト名>.yaml"""
+    return Path(config_path).parent / "machine" / f"{socket.gethostname()}.yaml"
+
+
+def merge_config(base: dict, override: dict) -> dict:
+    """セクションごとに再帰的にマージ（overrideの値が優先）"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
 def load_config(config_path: str) -> Config:
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-        return Config(**data)
+            data = yaml.safe_load(f) or {}
     except FileNotFoundError:
-        return Config()  # デフォルト設定を使用
\ No newline at end of file
+        data = {}  # デフォルト設定を使用
+    
+    # このマシン用の上書き（スレッド数・量子化など）があればマージ
+    override_path = machine_override_path(config_path)
+    if override_path.exists():
+        with open(override_path, 'r', encoding='utf-8') as f:
+            data = merge_config(data, yaml.safe_load(f) or {})
+    return Config(**data)
\ No newline at end of file
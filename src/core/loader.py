@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import Any, Callable, Optional
+from loguru import logger
+
+
+class ComponentLoader:
+    """モデル類をワーカースレッドで並列にロード・ウォームアップする
+
+    同期ファクトリはスレッドで、asyncファクトリはイベントループ上で実行する。
+    lazy=Trueで登録したものは最初のstart()/get()までロードしない。
+    """
+
+    def __init__(self):
+        self.factories: dict[str, tuple[Callable[[], Any], Optional[Callable[[Any], Any]]]] = {}
+        self.tasks: dict[str, asyncio.Task] = {}
+        self.timings: dict[str, dict[str, float]] = {}
+        self.started_at = time.perf_counter()
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        warmup: Optional[Callable[[Any], Any]] = None,
+        lazy: bool = False
+    ):
+        self.factories[name] = (factory, warmup)
+        if not lazy:
+            self.start(name)
+
+    def start(self, name: str) -> asyncio.Task:
+        """ロードを開始（開始済みなら既存のタスクを返す）"""
+        if name not in self.tasks:
+            self.tasks[name] = asyncio.create_task(self._load(name), name=f"load:{name}")
+        return self.tasks[name]
+
+    async def get(self, name: str) -> Any:
+        """ロード完了を待ってコンポーネントを返す"""
+        return await self.start(name)
+
+    def is_ready(self, name: str) -> bool:
+        task = self.tasks.get(name)
+        return task is not None and task.done() and task.exception() is None
+
+    async def _load(self, name: str) -> Any:
+        factory, warmup = self.factories[name]
+        start = time.perf_counter()
+        if asyncio.iscoroutinefunction(factory):
+            component = await factory()
+        else:
+            component = await asyncio.to_thread(factory)
+        loaded = time.perf_counter()
+        if warmup is not None:
+            try:
+                await asyncio.to_thread(warmup, component)
+            except Exception as e:
+                logger.warning(f"Warm-up failed for '{name}': {e}")
+        ready = time.perf_counter()
+        self.timings[name] = {
+            "load_ms": (loaded - start) * 1000,
+            "warmup_ms": (ready - loaded) * 1000,
+            "ready_at_ms": (ready - self.started_at) * 1000,
+        }
+        logger.info(
+            f"Component '{name}' ready: load {self.timings[name]['load_ms']:.0f}ms, "
+            f"warm-up {self.timings[name]['warmup_ms']:.0f}ms"
+        )
+        return component
+
+    async def wait_started(self):
+        """開始済みのロードが全て終わるのを待ち、失敗と起動時間の内訳をログ出力"""
+        names = list(self.tasks)
+        results = await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"Component '{name}' failed to load: {result}")
+        logger.info(f"Startup timing: {self.summary()}")
+
+    async def close(self):
+        """ロード済みでasyncのclose()を持つコンポーネント（TTS・ワーカープロセス等）を閉じる"""
+        for name, task in self.tasks.items():
+            if not task.done():
+                task.cancel()
+                continue
+            if task.cancelled() or task.exception() is not None:
+                continue
+            close = getattr(task.result(), "close", None)
+            if close is not None and asyncio.iscoroutinefunction(close):
+                try:
+                    await close()
+                except Exception as e:
+                    logger.warning(f"Failed to close '{name}': {e}")
+
+    def summary(self) -> str:
+        parts = [
+            f"{name} (load {t['load_ms']:.0f}ms + warm-up {t['warmup_ms']:.0f}ms, ready at {t['ready_at_ms']:.0f}ms)"
+            for name, t in sorted(self.timings.items(), key=lambda item: item[1]["ready_at_ms"])
+        ]
+        pending = [name for name in self.factories if name not in self.timings]
+        if pending:
+            parts.append(f"not loaded: {pending}")
+        return ", ".join(parts)
@@ -1,22 +1,158 @@
 from loguru import logger
+from pathlib import Path
+from typing import Optional, TextIO
+import queue
 import sys
+import threading
+import time
 
+from .metrics import REGISTRY
 
-def setup_logging(level: str = "INFO", json_format: bool = False):
+LOG_DROPPED = REGISTRY.counter("log_messages_dropped_total", "Log lines dropped because the console queue was full")
+
+
+class QueueSink:
+    """コンソール出力を専用スレッドで行うストリーム
+
+    write()はキューに積むだけで、遅いコンソールでも呼び出し側（音声コールバック・イベントループ）を
+    待たせない。キューが溢れたら捨てて件数を数える。
+    """
+
+    def __init__(self, stream: TextIO, maxsize: int = 10000):
+        self.stream = stream
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+            LOG_DROPPED.inc()
+
+    def flush(self):
+        pass  # 書き出しスレッドがまとめてflushする
+
+    def isatty(self) -> bool:
+        return self.stream.isatty()
+
+    def _run(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+            self.stream.write(message)
+            # 溜まっている分を書いてからflush
+            while True:
+                try:
+                    message = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if message is None:
+                    self.stream.flush()
+                    return
+                self.stream.write(message)
+            self.stream.flush()
+
+    def stop(self):
+        """残りを書き出して終了（logger.remove()から呼ばれる）"""
+        self.queue.put(None)
+        self.thread.join(timeout=5.0)
+        if self.dropped:
+            self.stream.write(f"{self.dropped} log messages were dropped (console too slow)\n")
+            self.stream.flush()
+
+
+class Throttle:
+    """ホットパスのログを呼び出し箇所ごとに間引く（呼び出し箇所ごとにモジュール定数として持つ）
+
+    interval_sに1件、かつevery件に1件だけ出し、間引いた件数をメッセージに添える。
+    メッセージはloguruの{}形式で渡し、出さない場合は整形もしない。
+    """
+    __slots__ = ("interval_s", "every", "next_at", "calls", "suppressed")
+
+    def __init__(self, interval_s: float = 1.0, every: int = 1):
+        self.interval_s = interval_s
+        self.every = every
+        self.next_at = 0.0
+        self.calls = 0
+        self.suppressed = 0
+
+    def _allow(self) -> bool:
+        self.calls += 1
+        if self.calls % self.every == 0:
+            now = time.monotonic()
+            if now >= self.next_at:
+                self.next_at = now + self.interval_s
+                return True
+        self.suppressed += 1
+        return False
+
+    def log(self, level: str, message: str, *args, **kwargs):
+        if not self._allow():
+            return
+        suppressed, self.suppressed = self.suppressed, 0
+        if suppressed:
+            message += f" (+{suppressed} suppressed)"
+        logger.opt(depth=2).log(level, message, *args, **kwargs)
+
+    def debug(self, message: str, *args, **kwargs):
+        self.log("DEBUG", message, *args, **kwargs)
+
+    def info(self, message: str, *args, **kwargs):
+        self.log("INFO", message, *args, **kwargs)
+
+    def warning(self, message: str, *args, **kwargs):
+        self.log("WARNING", message, *args, **kwargs)
+
+    def error(self, message: str, *args, **kwargs):
+        self.log("ERROR", message, *args, **kwargs)
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_format: bool = False,
+    trace_path: Optional[str] = None,
+    trace_rotation: str = "10 MB",
+    trace_retention: int = 5,
+    enqueue: bool = True,
+    queue_size: int = 10000,
+    stream: Optional[TextIO] = None
+):
     logger.remove()  # デフォルトハンドラを削除
-    
+
+    # コンソールへの書き込みは専用スレッドで（遅い端末で音声処理が止まらないように）
+    stream = stream or sys.stderr
+    sink = QueueSink(stream, queue_size) if enqueue else stream
+
     if json_format:
         logger.add(
-            sys.stderr,
+            sink,
             level=level,
             serialize=True,
             format="{time} | {level} | {name}:{function}:{line} | {message}"
         )
     else:
         logger.add(
-            sys.stderr,
+            sink,
             level=level,
             format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
         )
-    
-    return logger
\ No newline at end of file
+
+    if trace_path:
+        # ターントレースだけを1行1JSONでローテーション付きファイルへ
+        Path(trace_path).parent.mkdir(parents=True, exist_ok=True)
+        logger.add(
+            trace_path,
+            level="INFO",
+            format="{extra[turn_trace_json]}",
+            filter=lambda record: "turn_trace_json" in record["extra"],
+            rotation=trace_rotation,
+            retention=trace_retention,
+            encoding="utf-8",
+            enqueue=enqueue
+        )
+
+    return logger
@@ -0,0 +1,170 @@
+import math
+from bisect import bisect_left
+from typing import Callable, Optional
+
+# 既定のヒストグラム境界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """単調増加カウンタ
+
+    ホットパスからはロック無しで加算する（GIL下での取りこぼしは許容）。
+    """
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """出力時に値を取得する（ホットパスでの更新が不要になる）"""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class Histogram:
+    """固定バケットのヒストグラム。observeは配列の1要素を加算するだけ"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最後は+Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricFamily:
+    """同名メトリクスのラベル値ごとの子を保持"""
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: tuple[str, ...], factory: Callable):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self.factory = factory
+        self.children: dict[tuple[str, ...], object] = {}
+        if not labelnames:
+            self.children[()] = factory()
+
+    def labels(self, *values: str):
+        """ラベル値に対応する子を返す（ホットパスでは結果を保持して使う）"""
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self.children[key] = self.factory()
+        return child
+
+    # ラベル無しメトリクスはファミリーをそのまま使えるようにする
+    def inc(self, amount: float = 1.0):
+        self.children[()].inc(amount)
+
+    def set(self, value: float):
+        self.children[()].set(value)
+
+    def observe(self, value: float):
+        self.children[()].observe(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self.children[()].set_function(function)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families: dict[str, MetricFamily] = {}
+
+    def _get_or_create(self, name: str, help: str, kind: str, labelnames: tuple[str, ...], factory: Callable) -> MetricFamily:
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = MetricFamily(name, help, kind, labelnames, factory)
+        elif family.kind != kind:
+            raise ValueError(f"Metric {name} already registered as {family.kind}")
+        return family
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> MetricFamily:
+        """名前は *_total で登録する"""
+        return self._get_or_create(name, help, "counter", labelnames, Counter)
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> MetricFamily:
+        return self._get_or_create(name, help, "gauge", labelnames, Gauge)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> MetricFamily:
+        return self._get_or_create(name, help, "histogram", labelnames, lambda: Histogram(tuple(sorted(buckets))))
+
+    def render(self) -> str:
+        """Prometheusテキスト形式（0.0.4）で出力"""
+        lines = []
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for key, child in list(family.children.items()):
+                labels = list(zip(family.labelnames, key))
+                if family.kind == "histogram":
+                    cumulative = 0
+                    bounds = [_value(b) for b in child.buckets] + ["+Inf"]
+                    for bound, count in zip(bounds, child.counts):
+                        cumulative += count
+                        lines.append(f"{family.name}_bucket{_labels(labels + [('le', bound)])} {cumulative}")
+                    lines.append(f"{family.name}_sum{_labels(labels)} {_value(child.sum)}")
+                    lines.append(f"{family.name}_count{_labels(labels)} {child.count}")
+                elif family.kind == "gauge":
+                    lines.append(f"{family.name}{_labels(labels)} {_value(child.get())}")
+                else:
+                    lines.append(f"{family.name}{_labels(labels)} {_value(child.value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# プロセス全体で共有する既定のレジストリ
+REGISTRY = MetricsRegistry()
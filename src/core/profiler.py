@@ -0,0 +1,230 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Optional
+
+from loguru import logger
+
+SRC_DIR = str(Path(__file__).resolve().parents[1]) + os.sep
+
+# スタックに現れるモジュール → ステージ（イベントループ外のスレッド用、先頭一致で判定）
+MODULE_STAGES = [
+    ("audio/capture.py", "capture"),
+    ("audio/wake_vad.py", "wake_vad"),
+    ("audio/asr.py", "asr"),
+    ("nlp/", "agent"),
+    ("io/playback.py", "playback"),
+    ("io/", "tts"),
+]
+
+# 待ち状態とみなす最内フレーム（ファイル名, 関数名）: イベントループのselect、スレッドプールの待機など
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("connection.py", "_poll"),
+}
+
+
+def _stage_of_code(code) -> Optional[str]:
+    """パイプラインのステージタスク（_xxx_stage）と、そこから起動される処理の判定"""
+    if not code.co_filename.startswith(SRC_DIR):
+        return None
+    name = code.co_name
+    if name.startswith("_") and name.endswith("_stage"):
+        return name[1:-len("_stage")]
+    if name == "_prefill":
+        return "agent"
+    if code.co_qualname == "Tracer.run":
+        return "tracer"
+    return None
+
+
+def _stage_of_module(code) -> Optional[str]:
+    if not code.co_filename.startswith(SRC_DIR):
+        return None
+    module = code.co_filename[len(SRC_DIR):].replace(os.sep, "/")
+    for prefix, stage in MODULE_STAGES:
+        if module.startswith(prefix):
+            return stage
+    return None
+
+
+class StageProfiler:
+    """全スレッドのPythonスタックを一定間隔でサンプリングし、パイプラインのステージごとに集計する
+
+    イベントループのスレッドは実行中のステージタスク（Pipeline._xxx_stage）、
+    ワーカースレッド（Whisper・llama.cpp・TTS等）はスタック上のモジュールでステージを判定する。
+    スレッドごとのCPU時間の増分を直近のスタックのステージに割り当てる（Linux）。
+    子プロセスのワーカー（workers.asr / workers.llm）は対象外。
+    """
+
+    def __init__(self, interval_ms: float = 10.0, output_dir: str = "logs/profile", include_idle: bool = False):
+        self.interval_s = interval_ms / 1000.0
+        self.output_dir = Path(output_dir)
+        self.include_idle = include_idle
+        self.stacks: Counter[str] = Counter()
+        self.stage_samples: Counter[str] = Counter()
+        self.stage_cpu_s: Counter[str] = Counter()
+        self.labels: dict = {}  # コードオブジェクト → フレーム表記
+        self.cpu_clocks: dict[int, Optional[int]] = {}
+        self.last_cpu: dict[int, float] = {}
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.elapsed_s = 0.0
+        self.overhead_s = 0.0
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="stage-profiler", daemon=True)
+        self.thread.start()
+        logger.info(f"Profiler started (interval {self.interval_s * 1000:.0f}ms, output {self.output_dir})")
+
+    def stop(self) -> Optional[dict]:
+        """サンプリングを止めて結果を書き出す（2回目以降は何もしない）"""
+        if self.thread is None:
+            return None
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self.elapsed_s = time.monotonic() - self.started_at
+        return self.write()
+
+    def _thread_cpu(self, ident: int) -> Optional[float]:
+        if ident not in self.cpu_clocks:
+            try:
+                self.cpu_clocks[ident] = time.pthread_getcpuclockid(ident)
+            except (AttributeError, OSError):
+                self.cpu_clocks[ident] = None
+        clock = self.cpu_clocks[ident]
+        if clock is None:
+            return None
+        try:
+            return time.clock_gettime(clock)
+        except OSError:
+            return None  # 終了したスレッド
+
+    def _label(self, code) -> str:
+        label = self.labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(SRC_DIR):
+                filename = "src/" + filename[len(SRC_DIR):]
+            else:
+                filename = os.path.basename(filename)
+            label = self.labels[code] = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+        return label
+
+    @staticmethod
+    def _codes(frame: FrameType) -> list:
+        """外側から順のコードオブジェクト"""
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        return codes
+
+    @staticmethod
+    def _stage_of(codes: list) -> str:
+        stage = next((s for s in map(_stage_of_code, codes) if s), None)
+        if stage is None:
+            stage = next((s for s in map(_stage_of_module, codes) if s), "other")
+        return stage
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            cpu = self._thread_cpu(ident)
+            previous = self.last_cpu.get(ident)
+            if cpu is not None:
+                self.last_cpu[ident] = cpu
+            cpu_delta = cpu - previous if cpu is not None and previous is not None else None
+            idle = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+            if idle:
+                # 待ち状態で見つかったスレッドのCPU時間は、直前に何を実行していたか分からないのでidleに計上
+                if cpu_delta:
+                    self.stage_cpu_s["idle"] += cpu_delta
+                if not self.include_idle:
+                    continue
+            elif cpu_delta == 0 and not self.include_idle:
+                continue
+            codes = self._codes(frame)
+            stage = "idle" if idle else self._stage_of(codes)
+            if cpu_delta and not idle:
+                self.stage_cpu_s[stage] += cpu_delta
+            self.stage_samples[stage] += 1
+            thread_name = names.get(ident, f"thread-{ident}")
+            self.stacks[";".join([stage, thread_name, *map(self._label, codes)])] += 1
+        self.samples += 1
+
+    def _run(self):
+        cpu_start = time.thread_time()
+        next_at = time.monotonic()
+        while not self.stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"Profiler sample failed: {e}")
+            next_at += self.interval_s
+            self.stop_event.wait(max(0.0, next_at - time.monotonic()))
+        self.overhead_s = time.thread_time() - cpu_start
+
+    def stage_table(self) -> list[dict]:
+        total_cpu = sum(self.stage_cpu_s.values())
+        total_samples = sum(self.stage_samples.values())
+        stages = set(self.stage_samples) | set(self.stage_cpu_s)
+        rows = [
+            {
+                "stage": stage,
+                "cpu_s": round(self.stage_cpu_s[stage], 3),
+                "cpu_share": round(self.stage_cpu_s[stage] / total_cpu, 3) if total_cpu else None,
+                "samples": self.stage_samples[stage],
+                "sample_share": round(self.stage_samples[stage] / total_samples, 3) if total_samples else None,
+            }
+            for stage in stages
+        ]
+        return sorted(rows, key=lambda row: (row["cpu_s"], row["samples"]), reverse=True)
+
+    def write(self) -> dict:
+        """折り畳みスタック（flamegraph.pl / speedscope形式）とステージ別CPU時間の表を書き出す"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.output_dir / f"profile-{datetime.now():%Y%m%d-%H%M%S}"
+        folded_path = stem.with_suffix(".folded")
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        table = self.stage_table()
+        summary = {
+            "duration_s": round(self.elapsed_s, 2),
+            "interval_ms": self.interval_s * 1000,
+            "samples": self.samples,
+            "profiler_cpu_s": round(self.overhead_s, 3),
+            "overhead_share": round(self.overhead_s / self.elapsed_s, 4) if self.elapsed_s else None,
+            "stages": table,
+            "folded": str(folded_path),
+        }
+        with open(stem.with_suffix(".json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        lines = [f"{'stage':<12} {'cpu_s':>8} {'cpu%':>6} {'samples':>8}"] + [
+            f"{row['stage']:<12} {row['cpu_s']:>8.3f} {(row['cpu_share'] or 0) * 100:>5.1f}% {row['samples']:>8}"
+            for row in table
+        ]
+        logger.info(
+            f"Profile written to {folded_path} ({self.samples} samples over {self.elapsed_s:.1f}s, "
+            f"profiler overhead {self.overhead_s:.2f}s CPU)\n" + "\n".join(lines)
+        )
+        return summary
@@ -0,0 +1,125 @@
+import json
+import time
+from datetime import datetime
+from typing import Callable, Optional
+from .bus import Bus, Event, Policy
+from loguru import logger
+
+# ターン内のマーク（発生順）
+MARKS = [
+    "wake",
+    "speech_start",
+    "endpoint",
+    "asr_done",
+    "first_token",
+    "first_sentence",
+    "first_audio",
+    "playback_start",
+    "playback_end",
+]
+
+# スパン名: (開始マーク, 終了マーク)
+SPANS = {
+    "wait_speech": ("wake", "speech_start"),
+    "speech": ("speech_start", "endpoint"),
+    "asr": ("endpoint", "asr_done"),
+    "llm_first_token": ("asr_done", "first_token"),
+    "first_sentence": ("first_token", "first_sentence"),
+    "tts_first_audio": ("first_sentence", "first_audio"),
+    "playback_wait": ("first_audio", "playback_start"),
+    "playback": ("playback_start", "playback_end"),
+    "endpoint_to_audio": ("endpoint", "playback_start"),
+}
+
+# バスのイベント種別 → マーク（各ターン最初の1回だけ記録）
+EVENT_MARKS = {
+    "wake": "wake",
+    "speech.start": "speech_start",
+    "utterance": "endpoint",
+    "transcript": "asr_done",
+    "agent.token": "first_token",
+    "sentence": "first_sentence",
+    "tts.audio": "first_audio",
+    "playback.start": "playback_start",
+    "playback.end": "playback_end",
+}
+
+
+class TurnTrace:
+    """1ターン分のマーク時刻（time.monotonic）"""
+
+    def __init__(self, turn_id: int):
+        self.turn_id = turn_id
+        self.started_at = datetime.now().astimezone()
+        self.marks: dict[str, float] = {}
+        self.info: dict[str, object] = {}
+
+    def mark(self, name: str, ts: Optional[float] = None):
+        if name not in self.marks:
+            self.marks[name] = ts if ts is not None else time.monotonic()
+
+    def spans(self) -> dict[str, float]:
+        """両端のマークが揃っているスパンの所要時間（ms）"""
+        spans = {}
+        for name, (start, end) in SPANS.items():
+            if start in self.marks and end in self.marks:
+                spans[name] = round((self.marks[end] - self.marks[start]) * 1000, 1)
+        return spans
+
+    def to_dict(self) -> dict:
+        origin = min(self.marks.values()) if self.marks else 0.0
+        return {
+            "turn_id": self.turn_id,
+            "started_at": self.started_at.isoformat(),
+            "marks_ms": {
+                name: round((self.marks[name] - origin) * 1000, 1)
+                for name in MARKS if name in self.marks
+            },
+            "spans_ms": self.spans(),
+            **self.info,
+        }
+
+
+class Tracer:
+    """バスを購読してターンごとのトレースを組み立て、ターン終了時に出力"""
+
+    def __init__(self, bus: Bus):
+        self.sub = bus.subscribe(
+            *EVENT_MARKS.keys(), "turn.end",
+            name="tracer", maxsize=1024, policy=Policy.DROP_NEWEST
+        )
+        self.turns: dict[int, TurnTrace] = {}
+        self.listeners: list[Callable[[TurnTrace], None]] = []  # ターン終了時に呼ぶ（アーカイブ等）
+
+    def _trace(self, turn_id: int) -> TurnTrace:
+        if turn_id not in self.turns:
+            self.turns[turn_id] = TurnTrace(turn_id)
+        return self.turns[turn_id]
+
+    def record(self, event: Event):
+        turn_id = event.payload.get("turn_id")
+        if turn_id is None:
+            return
+        trace = self._trace(turn_id)
+        if event.type == "turn.end":
+            trace.info["end_reason"] = event.payload.get("reason")
+            trace = self.turns.pop(turn_id)
+            self.emit(trace)
+            for listener in self.listeners:
+                listener(trace)
+            return
+        trace.mark(EVENT_MARKS[event.type], event.ts)
+        if event.type == "transcript":
+            trace.info["asr_chars"] = len(event.payload["text"])
+        elif event.type == "utterance":
+            trace.info["utterance_s"] = round(len(event.payload["pcm"]) / 16000, 2)
+
+    def emit(self, trace: TurnTrace):
+        data = trace.to_dict()
+        logger.bind(turn_trace=data, turn_trace_json=json.dumps(data, ensure_ascii=False)).info(
+            f"Turn {trace.turn_id} trace: {data['spans_ms']}"
+        )
+
+    async def run(self):
+        async for event in self.sub:
+            self.record(event)
@@ -0,0 +1,102 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from .config import WatchdogConfig
+from .metrics import REGISTRY
+from .profiler import SRC_DIR
+
+from loguru import logger
+
+LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds", "Delay of the event-loop heartbeat beyond its sleep interval",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+LOOP_STALLS = REGISTRY.counter(
+    "event_loop_stalls_total", "Event-loop stalls over the threshold by the blocking function", ("function",)
+)
+LOOP_STALL_SECONDS = REGISTRY.histogram(
+    "event_loop_stall_seconds", "Duration of event-loop stalls over the threshold",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+
+def blocking_function(frame) -> str:
+    """スタック上で最も内側の自前コード（src/以下）のフレーム。無ければ最内フレーム"""
+    innermost = frame
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(SRC_DIR):
+            return frame.f_code.co_qualname
+        frame = frame.f_back
+    return innermost.f_code.co_qualname
+
+
+class LoopWatchdog:
+    """イベントループの遅れを常時計測し、止まっている間にループスレッドのスタックを取って原因を報告する
+
+    ループ上のハートビートがinterval_msごとに起きて遅れをヒストグラムに記録する。
+    監視スレッドはハートビートがstall_threshold_ms以上遅れたらスタックを取り、
+    ブロックしている関数をログ・メトリクス（event_loop_stalls_total{function}）に出す。
+    """
+
+    def __init__(self, config: WatchdogConfig):
+        self.config = config
+        self.interval_s = config.interval_ms / 1000.0
+        self.threshold_s = config.stall_threshold_ms / 1000.0
+        self.loop_thread_id: Optional[int] = None
+        self.last_beat = time.monotonic()
+        self.stall: Optional[str] = None  # 検出中の停止の原因（監視スレッドが設定、ハートビートが消費）
+        self.stop_event = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.task = asyncio.create_task(self._heartbeat(), name="watchdog")
+        self.thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+        logger.info(f"Event-loop watchdog started (stall threshold {self.config.stall_threshold_ms}ms)")
+
+    async def stop(self):
+        self.stop_event.set()
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        if self.thread is not None:
+            await asyncio.to_thread(self.thread.join)
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            LOOP_LAG.observe(lag)
+            self.last_beat = now
+            if self.stall is not None:
+                function, self.stall = self.stall, None
+                LOOP_STALL_SECONDS.observe(lag)
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f}ms by {function}")
+
+    def _watch(self):
+        check_s = min(self.interval_s, self.threshold_s) / 2
+        reported_beat = None
+        while not self.stop_event.wait(check_s):
+            beat = self.last_beat
+            overdue = time.monotonic() - beat - self.interval_s
+            if overdue < self.threshold_s or beat == reported_beat:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            # 同じ停止は1回だけ報告する（次のハートビートで解除）
+            reported_beat = beat
+            function = blocking_function(frame)
+            self.stall = function
+            LOOP_STALLS.labels(function).inc()
+            stack = "".join(traceback.format_stack(frame, limit=self.config.stack_depth))
+            logger.warning(f"Event loop stalled for {overdue * 1000:.0f}ms in {function}\n{stack}")
@@ -0,0 +1,140 @@
+import asyncio
+import multiprocessing
+import signal
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Any, AsyncIterator, Callable, Optional
+from .metrics import REGISTRY
+from loguru import logger
+
+WORKER_RESTARTS = REGISTRY.counter("worker_restarts_total", "Worker process restarts after a crash", ("worker",))
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+def _bootstrap(target: Callable, conn: Connection, args: tuple):
+    # Ctrl+Cは親プロセスが処理する（子が先に落ちて再起動されないように）
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    target(conn, *args)
+
+
+class ProcessWorker:
+    """モデルを子プロセスで動かし、Pipe経由で要求・応答をやり取りする
+
+    子プロセスは target(conn, *args) を実行し、準備ができたら ("ready", info) を送る。
+    要求は同時に1つだけで、応答は ("done", ...) か ("error", ...) で終わる。
+    子プロセスが落ちた場合は処理中の要求をWorkerCrashedで失敗させ、自動で再起動する。
+    """
+
+    def __init__(self, name: str, target: Callable, args: tuple = (), restart_delay_s: float = 1.0):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.restart_delay_s = restart_delay_s
+        self.context = multiprocessing.get_context("spawn")  # 親のスレッド・モデルを引き継がない
+        self.process = None
+        self.conn: Optional[Connection] = None
+        self.lock = asyncio.Lock()
+        self.ready = asyncio.Event()
+        self.responses: asyncio.Queue = asyncio.Queue()
+        self.info: dict[str, Any] = {}
+        self.closing = False
+        self.restart_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> dict[str, Any]:
+        """子プロセスを起動し、モデルのロード完了を待つ"""
+        loop = asyncio.get_running_loop()
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_bootstrap,
+            args=(self.target, child_conn, self.args),
+            name=f"{self.name}-worker",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.responses = asyncio.Queue()
+        loop.add_reader(self.conn.fileno(), self._on_readable)
+
+        message = await self.responses.get()
+        if message[0] != "ready":
+            raise WorkerCrashed(f"{self.name} worker failed to start (exit code {self.process.exitcode})")
+        self.info = message[1]
+        self.ready.set()
+        logger.info(f"{self.name} worker ready (pid {self.process.pid})")
+        return self.info
+
+    def _on_readable(self):
+        try:
+            while self.conn.poll():
+                self.responses.put_nowait(self.conn.recv())
+        except (EOFError, OSError):
+            self._on_exit()
+
+    def _on_exit(self):
+        """パイプが閉じた（イベントループのコールバックなので待たない）"""
+        was_running = self.ready.is_set()
+        asyncio.get_running_loop().remove_reader(self.conn.fileno())
+        self.conn.close()
+        self.ready.clear()
+        # 終了コードはまだ確定していないことがある（joinは再起動タスクでスレッドから待つ）
+        self.responses.put_nowait(("exit", self.process.exitcode))
+        if self.closing or not was_running:
+            return  # 起動中の失敗はstart()の呼び出し側で扱う
+        WORKER_RESTARTS.labels(self.name).inc()
+        self.restart_task = asyncio.create_task(self._restart(self.process))
+
+    async def _restart(self, exited: BaseProcess):
+        await asyncio.to_thread(exited.join, 1.0)
+        logger.error(f"{self.name} worker exited (code {exited.exitcode}) - restarting")
+        while not self.closing:
+            await asyncio.sleep(self.restart_delay_s)
+            try:
+                await self.start()
+                return
+            except Exception as e:
+                logger.error(f"{self.name} worker restart failed: {e}")
+
+    def send(self, message: tuple):
+        self.conn.send(message)
+
+    async def call(self, message: tuple) -> AsyncIterator[tuple]:
+        """要求を送り、終端メッセージまでの応答を順にyield"""
+        async with self.lock:
+            await self.ready.wait()
+            self.send(message)
+            finished = False
+            try:
+                while True:
+                    response = await self.responses.get()
+                    if response[0] == "exit":
+                        finished = True
+                        raise WorkerCrashed(f"{self.name} worker exited (code {response[1]})")
+                    if response[0] in ("done", "error"):
+                        finished = True
+                    yield response
+                    if finished:
+                        return
+            finally:
+                if not finished and self.ready.is_set():
+                    # 消費側が途中で抜けた → 中断を伝えて終端まで読み捨てる
+                    self.send(("cancel",))
+                    while (await self.responses.get())[0] not in ("done", "error", "exit"):
+                        pass
+
+    async def close(self):
+        self.closing = True
+        if self.restart_task is not None:
+            self.restart_task.cancel()
+        if self.process is None or not self.process.is_alive():
+            return
+        try:
+            self.send(("stop",))
+        except OSError:
+            pass
+        await asyncio.to_thread(self.process.join, 5.0)
+        if self.process.is_alive():
+            self.process.terminate()
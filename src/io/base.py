@@ -0,0 +1,20 @@
+from typing import AsyncIterator, NamedTuple, Protocol
+
+
+class AudioChunk(NamedTuple):
+    pcm: bytes  # int16モノラル
+    sample_rate: int
+
+
+class TTSBackend(Protocol):
+    name: str
+    sample_rate: int
+
+    def is_available(self) -> bool:
+        ...
+
+    def stream_audio(self, text: str) -> AsyncIterator[bytes]:
+        ...
+
+    async def speak_sentences(self, sentences: AsyncIterator[str]):
+        ...
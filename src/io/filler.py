@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from typing import Optional
+from ..core.config import FillerConfig
+from .base import AudioChunk
+from .router import TTSRouter
+from loguru import logger
+
+
+class FillerPlayer:
+    """応答待ちを埋める相槌を事前合成しておき、メモリから即再生"""
+
+    def __init__(self, tts: TTSRouter, config: FillerConfig):
+        self.tts = tts
+        self.config = config
+        self.clips: dict[str, AudioChunk] = {}
+        self.expected_ms = float(config.initial_expected_ms)
+        self.task: Optional[asyncio.Task] = None
+        self.stop_event = threading.Event()
+
+    async def prepare(self):
+        """相槌をTTSで合成してPCMのまま保持"""
+        for clip in self.config.clips:
+            chunks = [chunk async for chunk in self.tts.stream_sentence(clip.text)]
+            if not chunks:
+                logger.warning(f"Filler clip synthesis failed: {clip.text}")
+                continue
+            pcm = b"".join(bytes(chunk.pcm) for chunk in chunks)
+            self.clips[clip.text] = AudioChunk(pcm, chunks[0].sample_rate)
+        logger.info(f"Filler clips ready: {list(self.clips.keys())}")
+
+    def choose(self, expected_ms: float) -> Optional[str]:
+        """予想待ち時間に見合う最長の相槌を選ぶ（短い待ちなら無し）"""
+        chosen = None
+        for clip in sorted(self.config.clips, key=lambda c: c.min_expected_ms):
+            if clip.min_expected_ms <= expected_ms and clip.text in self.clips:
+                chosen = clip.text
+        return chosen
+
+    def start(self):
+        """発話終了直後に呼ぶ。予想待ち時間に応じて相槌を再生開始"""
+        text = self.choose(self.expected_ms)
+        if text is None:
+            logger.debug(f"No filler (expected latency: {self.expected_ms:.0f}ms)")
+            return
+        self.stop_event = threading.Event()
+        self.task = asyncio.create_task(self._play(text, self.stop_event))
+
+    async def _play(self, text: str, stop: threading.Event):
+        clip = self.clips[text]
+        logger.debug(f"Playing filler: {text} (expected latency: {self.expected_ms:.0f}ms)")
+        try:
+            await self.tts.player.play(clip.pcm, clip.sample_rate, stop=stop)
+        except Exception as e:
+            logger.error(f"Filler playback error: {e}")
+
+    async def cancel(self):
+        """再生中の相槌を止めて書き込み完了を待つ"""
+        if self.task is None:
+            return
+        self.stop_event.set()
+        await self.task
+        self.task = None
+
+    def observe(self, latency_ms: float):
+        """発話終了から応答音声までの実測で予想待ち時間を更新"""
+        alpha = self.config.ewma_alpha
+        self.expected_ms = alpha * latency_ms + (1 - alpha) * self.expected_ms
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+import numpy as np
+from ..audio.format import PCMResampler
+from ..core.logging import Throttle
+from ..core.metrics import REGISTRY
+from loguru import logger
+
+if TYPE_CHECKING:
+    import sounddevice as sd
+
+PLAYBACK_UNDERFLOWS = REGISTRY.counter("audio_playback_underflows_total", "Output underflows reported by the playback stream")
+UNDERFLOW_LOG = Throttle(interval_s=1.0)
+
+
+class AudioPlayer:
+    """PCM(int16モノラル)を出力デバイスのレートへ変換して逐次再生
+
+    play()はチャンク単位で呼ばれるので、リサンプラの状態は呼び出しをまたいで引き継ぐ。
+    """
+
+    def __init__(self, device: Optional[str] = None, rate: Optional[int] = None):
+        self.device = device
+        self.rate = rate  # Noneの場合はデバイスの既定レート
+        self.stream: Optional["sd.RawOutputStream"] = None
+        self.resampler: Optional[PCMResampler] = None
+
+    def _ensure_stream(self):
+        """出力ストリームを一度だけデバイスレートで開く"""
+        if self.stream is not None:
+            return
+        import sounddevice as sd  # PortAudioの初期化は最初の再生時に
+        if self.rate is None:
+            self.rate = int(sd.query_devices(self.device, "output")["default_samplerate"])
+        self.stream = sd.RawOutputStream(
+            samplerate=self.rate,
+            channels=1,
+            dtype=np.int16,
+            device=self.device
+        )
+        self.stream.start()
+        logger.debug(f"Audio output opened (device: {self.device}, rate: {self.rate}Hz)")
+
+    def _convert(self, pcm, sample_rate: int) -> np.ndarray:
+        """int16 PCMを出力レートへ（前のチャンクの続きとして変換する）"""
+        if self.resampler is None:
+            self.resampler = PCMResampler(self.rate)
+        return self.resampler.convert(pcm, sample_rate)
+
+    def _write(self, pcm, sample_rate: int):
+        """レート変換してブロッキング書き込み（executorから呼ぶ）"""
+        samples = self._convert(pcm, sample_rate)
+        underflowed = self.stream.write(samples)
+        if underflowed:
+            PLAYBACK_UNDERFLOWS.inc()
+            UNDERFLOW_LOG.warning("Audio output underflow")
+
+    async def play_stream(self, chunks: AsyncIterator[bytes], sample_rate: int):
+        """チャンクが届き次第デバイスへ書き込む"""
+        loop = asyncio.get_running_loop()
+        self._ensure_stream()
+        async for pcm in chunks:
+            if len(pcm):
+                await loop.run_in_executor(None, self._write, pcm, sample_rate)
+
+    async def play(self, pcm, sample_rate: int, stop: Optional[threading.Event] = None):
+        """単一のPCMバッファを再生
+
+        stopを渡すと短いブロック単位で書き込み、セットされた時点で打ち切る。
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_stream()
+        if stop is None:
+            await loop.run_in_executor(None, self._write, pcm, sample_rate)
+        else:
+            await loop.run_in_executor(None, self._write_interruptible, pcm, sample_rate, stop)
+
+    def _write_interruptible(self, pcm, sample_rate: int, stop: threading.Event, block_ms: int = 50):
+        samples = self._convert(pcm, sample_rate)
+        block = self.rate * block_ms // 1000
+        for start in range(0, len(samples), block):
+            if stop.is_set():
+                break
+            self.stream.write(samples[start:start + block])
+
+    def close(self):
+        """出力ストリームを閉じる"""
+        if self.stream is not None:
+            try:
+                self.stream.stop()
+                self.stream.close()
+            except Exception as e:
+                logger.debug(f"Audio output close error: {e}")
+            self.stream = None
+        self.resampler = None
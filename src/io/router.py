@@ -0,0 +1,361 @@
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from ..core.config import TTSConfig
+from .base import AudioChunk, TTSBackend
+from .playback import AudioPlayer
+from loguru import logger
+
+# 途中で失敗した文はこの文字の直後から合成し直す（句の途中から読み始めないように）
+RESUME_CHARS = "、。，．,.!！?？ "
+
+
+class BackendStats:
+    """バックエンドごとの直近レイテンシ・エラー統計"""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)  # (文字数, 初回音声までの秒数)
+        self.outcomes = deque(maxlen=window)  # True=成功
+        self.durations = deque(maxlen=window)  # (文字数, 音声の秒数)
+        self.unhealthy_until = 0.0
+
+    def record_success(self, chars: int, latency: float):
+        self.latencies.append((chars, latency))
+        self.outcomes.append(True)
+
+    def record_failure(self):
+        self.outcomes.append(False)
+
+    def record_duration(self, chars: int, audio_s: float):
+        self.durations.append((chars, audio_s))
+
+    @property
+    def seconds_per_char(self) -> Optional[float]:
+        """最後まで合成できた文から求めた1文字あたりの音声の長さ"""
+        chars = sum(c for c, _ in self.durations)
+        if chars == 0:
+            return None
+        return sum(s for _, s in self.durations) / chars
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def estimate(self, chars: int) -> Optional[float]:
+        """latency = a + b * chars を最小二乗で当てはめて推定"""
+        n = len(self.latencies)
+        if n == 0:
+            return None
+        mean_x = sum(x for x, _ in self.latencies) / n
+        mean_y = sum(y for _, y in self.latencies) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in self.latencies)
+        if var_x == 0:
+            return mean_y
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in self.latencies) / var_x
+        return max(0.0, mean_y + slope * (chars - mean_x))
+
+
+class _Attempt:
+    """1バックエンドでの1文合成。チャンクをキューに溜める"""
+
+    def __init__(self, backend: TTSBackend, text: str):
+        self.backend = backend
+        self.started = time.monotonic()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.error: Optional[Exception] = None
+        self.task = asyncio.create_task(self._run(text))
+
+    async def _run(self, text: str):
+        try:
+            async for pcm in self.backend.stream_audio(text):
+                if pcm:
+                    await self.queue.put(pcm)
+        except Exception as e:
+            self.error = e
+            logger.error(f"TTS backend '{self.backend.name}' failed: {e}")
+        finally:
+            await self.queue.put(None)
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class TTSRouter:
+    """文ごとに最速の健全なバックエンドへ振り分け、遅延時は別バックエンドへ切り替える"""
+
+    name = "router"
+
+    def __init__(self, backends: list[TTSBackend], config: TTSConfig):
+        self.backends = backends
+        self.config = config
+        self.stats = {backend.name: BackendStats(config.stats_window) for backend in backends}
+        self.player = AudioPlayer(config.output_device, config.output_rate)
+
+    def is_available(self) -> bool:
+        return any(backend.is_available() for backend in self.backends)
+
+    def _rank(self, chars: int, exclude: frozenset[str] = frozenset()) -> list[TTSBackend]:
+        """推定レイテンシ順に並べる（未計測は設定順で優先的に試す）"""
+        now = time.monotonic()
+        usable = [
+            (i, backend) for i, backend in enumerate(self.backends)
+            if backend.is_available() and backend.name not in exclude
+        ]
+        candidates = [(i, b) for i, b in usable if self.stats[b.name].unhealthy_until <= now]
+        if not candidates:
+            # 全て不健全な場合は利用可能なものを設定順で試す
+            candidates = usable
+
+        def key(item):
+            i, backend = item
+            estimate = self.stats[backend.name].estimate(chars)
+            return (estimate is not None, estimate or 0.0, i)
+
+        return [backend for _, backend in sorted(candidates, key=key)]
+
+    def _record_failure(self, backend: TTSBackend):
+        stats = self.stats[backend.name]
+        stats.record_failure()
+        if len(stats.outcomes) >= 3 and stats.error_rate >= self.config.unhealthy_error_rate:
+            stats.unhealthy_until = time.monotonic() + self.config.retry_after_s
+            logger.warning(
+                f"TTS backend '{backend.name}' marked unhealthy for {self.config.retry_after_s:.0f}s "
+                f"(error rate: {stats.error_rate:.2f})"
+            )
+
+    async def _select(self, text: str, exclude: frozenset[str] = frozenset()) -> Optional[tuple[_Attempt, bytes]]:
+        """最初の音声チャンクを返したバックエンドを採用する
+
+        初回チャンクがタイムアウトした場合は次のバックエンドを並行して起動し、
+        先に音声を返した方を使う。
+        """
+        ranked = self._rank(len(text), exclude)
+        if not ranked:
+            return None
+
+        timeout = self.config.first_audio_timeout_ms / 1000.0
+        getters: dict[asyncio.Task, _Attempt] = {}
+        timed_out: set[str] = set()
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            attempt = _Attempt(ranked[launched], text)
+            getters[asyncio.create_task(attempt.queue.get())] = attempt
+            launched += 1
+
+        launch()
+        try:
+            while getters:
+                has_fallback = launched < len(ranked)
+                done, _ = await asyncio.wait(
+                    getters,
+                    timeout=timeout if has_fallback else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # 初回音声が間に合わない → 次のバックエンドを並行起動
+                    for attempt in getters.values():
+                        if attempt.backend.name not in timed_out:
+                            timed_out.add(attempt.backend.name)
+                            logger.warning(f"TTS backend '{attempt.backend.name}' timed out, failing over")
+                    launch()
+                    continue
+
+                for getter in done:
+                    attempt = getters.pop(getter)
+                    first = getter.result()
+                    if first is None:
+                        # 音声なしで終了 = 失敗
+                        self._record_failure(attempt.backend)
+                        if not getters and launched < len(ranked):
+                            launch()
+                        continue
+
+                    latency = time.monotonic() - attempt.started
+                    self.stats[attempt.backend.name].record_success(len(text), latency)
+                    for loser_getter, loser in getters.items():
+                        loser_getter.cancel()
+                        loser.cancel()
+                        if loser.backend.name in timed_out:
+                            self._record_failure(loser.backend)
+                    getters.clear()
+                    logger.debug(f"TTS routed to '{attempt.backend.name}' ({latency * 1000:.0f}ms to first audio)")
+                    return attempt, first
+            return None
+        except asyncio.CancelledError:
+            for getter, attempt in getters.items():
+                getter.cancel()
+                attempt.cancel()
+            raise
+
+    async def stream_sentence(self, text: str, exclude: frozenset[str] = frozenset()) -> AsyncIterator[AudioChunk]:
+        """1文を合成し、採用されたバックエンドの音声チャンクをyield
+
+        音声の途中でバックエンドが失敗・停止した場合は、残りを次のバックエンドで合成して続ける。
+        """
+        selected = await self._select(text, exclude)
+        if selected is None:
+            logger.error(f"No TTS backend produced audio for: {text}")
+            return
+        async for chunk in self._stream_attempt(text, *selected, exclude):
+            yield chunk
+
+    async def _stream_attempt(
+        self, text: str, attempt: _Attempt, pcm: Optional[bytes], exclude: frozenset[str]
+    ) -> AsyncIterator[AudioChunk]:
+        """採用したバックエンドの音声を最後まで流す
+
+        チャンクがstream_stall_timeout_ms途切れたら、他に使えるバックエンドがあれば残りの合成を並行して始め、
+        先に音声を返した方を使う（_selectと同じ競争）。無ければ遅れても待つ。
+        """
+        backend = attempt.backend
+        sample_rate = backend.sample_rate
+        stall_timeout = self.config.stream_stall_timeout_ms / 1000.0
+        exclude = exclude | {backend.name}
+        played_s = 0.0
+        getter: Optional[asyncio.Future] = None
+        fallback: Optional[_Attempt] = None
+        fallback_getter: Optional[asyncio.Future] = None
+        try:
+            while pcm is not None:
+                yield AudioChunk(pcm, sample_rate)
+                played_s += len(pcm) / 2 / sample_rate
+                getter = asyncio.ensure_future(attempt.queue.get())
+                done, _ = await asyncio.wait({getter}, timeout=stall_timeout)
+                if not done:
+                    remainder = self._remainder(text, played_s, backend)
+                    candidates = self._rank(len(remainder), exclude) if remainder else []
+                    if candidates:
+                        logger.warning(f"TTS backend '{backend.name}' stalled mid-sentence, racing '{candidates[0].name}'")
+                        fallback = _Attempt(candidates[0], remainder)
+                        fallback_getter = asyncio.ensure_future(fallback.queue.get())
+                        await asyncio.wait({getter, fallback_getter}, return_when=asyncio.FIRST_COMPLETED)
+                        # 停止していた方が先に返した（終わりを含む）なら、エラーでない限りそのまま続ける
+                        if not getter.done() or (getter.result() is None and attempt.error is not None):
+                            first = await fallback_getter
+                            if first is not None:
+                                self._record_failure(backend)
+                                self.stats[fallback.backend.name].record_success(
+                                    len(remainder), time.monotonic() - fallback.started
+                                )
+                                handover, fallback = fallback, None
+                                async for chunk in self._stream_attempt(remainder, handover, first, exclude):
+                                    yield chunk
+                                return
+                            self._record_failure(fallback.backend)
+                            exclude = exclude | {fallback.backend.name}
+                        fallback.cancel()
+                        fallback = None
+                pcm = await getter
+        finally:
+            attempt.cancel()
+            for pending in (getter, fallback_getter):
+                if pending is not None:
+                    pending.cancel()
+            if fallback is not None:
+                fallback.cancel()
+
+        if attempt.error is None:
+            self.stats[backend.name].record_duration(len(text), played_s)
+            return
+        self._record_failure(backend)
+        remainder = self._remainder(text, played_s, backend)
+        if remainder:
+            async for chunk in self.stream_sentence(remainder, exclude):
+                yield chunk
+
+    def _remainder(self, text: str, played_s: float, backend: TTSBackend) -> str:
+        """再生済みの音声の長さから未発話の部分を推定し、その直前の句読点から返す
+
+        1文字あたりの長さが未計測の場合は文全体を返す（途切れるよりは重複を選ぶ）。
+        """
+        seconds_per_char = self.stats[backend.name].seconds_per_char
+        if seconds_per_char is None:
+            return text
+        spoken = int(played_s / seconds_per_char)
+        resume = max((i + 1 for i, c in enumerate(text[:spoken]) if c in RESUME_CHARS), default=0)
+        return text[resume:].strip()
+
+    async def wait_ready(self):
+        """非同期初期化中のバックエンドを待つ"""
+        for backend in self.backends:
+            init_task = getattr(backend, "init_task", None)
+            if init_task is not None:
+                await init_task
+
+    async def speak_sentences(
+        self,
+        sentences: AsyncIterator[str],
+        on_first_audio: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        """次の文を先行合成しながら順に再生
+
+        on_first_audioは最初の音声を出力する直前に呼ばれる（相槌の停止など）。
+        """
+        if not self.is_available():
+            logger.warning("No TTS backend available, showing text output")
+            async for sentence in sentences:
+                if sentence.strip():
+                    print(f"[TTS] {sentence.strip()}")
+            return
+
+        jobs: asyncio.Queue = asyncio.Queue()
+
+        async def produce():
+            try:
+                async for sentence in sentences:
+                    text = sentence.strip()
+                    if not text:
+                        continue
+                    job: asyncio.Queue = asyncio.Queue()
+                    await jobs.put(job)
+                    try:
+                        async for chunk in self.stream_sentence(text):
+                            await job.put(chunk)
+                    finally:
+                        await job.put(None)
+            finally:
+                await jobs.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            first = True
+            while (job := await jobs.get()) is not None:
+                if not first:
+                    await asyncio.sleep(self.config.sentence_pause_ms / 1000.0)
+                first = False
+                while (chunk := await job.get()) is not None:
+                    if on_first_audio is not None:
+                        await on_first_audio()
+                        on_first_audio = None
+                    await self.player.play(chunk.pcm, chunk.sample_rate)
+            await producer
+        finally:
+            producer.cancel()
+
+    def stats_summary(self) -> dict[str, dict]:
+        """バックエンドごとの統計（ログ・デバッグ用）"""
+        return {
+            name: {
+                "samples": len(stats.latencies),
+                "error_rate": round(stats.error_rate, 3),
+                "est_latency_ms_20chars": None if stats.estimate(20) is None else round(stats.estimate(20) * 1000),
+                "healthy": stats.unhealthy_until <= time.monotonic(),
+            }
+            for name, stats in self.stats.items()
+        }
+
+    async def close(self):
+        """各バックエンドと出力デバイスを解放"""
+        for backend in self.backends:
+            close = getattr(backend, "close", None)
+            if close is None:
+                continue
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+        self.player.close()
@@ -0,0 +1,161 @@
+import re
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+import numpy as np
+from ..core.config import TTSConfig
+from ..audio.format import float32_to_int16, int16_to_float32
+from ..core.metrics import REGISTRY
+from .base import TTSBackend
+from loguru import logger
+
+# 数値＋助数詞（時刻・日付・温度など）
+NUMBER_PATTERN = r"\d+(?:年|月|日|時|分|秒|度|%|個|回|つ|人)?"
+PAUSE_CHARS = "、。，．,.!！?？"
+SILENCE_THRESHOLD = 0.01  # 前後の無音除去の閾値（float振幅）
+
+TTS_CACHE = REGISTRY.counter("tts_cache_requests_total", "TTS audio cache lookups", ("cache", "result"))
+CACHE_HITS = TTS_CACHE.labels("segment", "hit")
+CACHE_MISSES = TTS_CACHE.labels("segment", "miss")
+
+
+class SegmentedTTS:
+    """定型応答を固定部分と可変部分に分けて合成し、セグメントキャッシュから組み立てる
+
+    「14時05分」「エアコンをつけました」のように毎回変わる文でも、
+    数値・助数詞・デバイス名と残りの定型部分を個別にキャッシュすることで
+    大半のツール応答はTTSエンジンを呼ばずに済む。
+    """
+
+    def __init__(self, backend: TTSBackend, config: TTSConfig):
+        self.backend = backend
+        self.config = config
+        self.name = backend.name
+        self.sample_rate = backend.sample_rate
+        self.cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        names = sorted(config.segment_variables, key=len, reverse=True)
+        alternatives = [NUMBER_PATTERN] + [re.escape(name) for name in names]
+        self.variable_pattern = re.compile("|".join(alternatives))
+
+    @property
+    def init_task(self):
+        return getattr(self.backend, "init_task", None)
+
+    def is_available(self) -> bool:
+        return self.backend.is_available()
+
+    def split(self, text: str) -> Optional[list[str]]:
+        """可変部分で分割。定型文として扱わない場合はNone"""
+        if len(text) > self.config.segment_max_chars:
+            return None
+        segments = []
+        pos = 0
+        for match in self.variable_pattern.finditer(text):
+            if match.start() > pos:
+                segments.append(text[pos:match.start()])
+            segments.append(self._normalize(match.group()))
+            pos = match.end()
+        if pos < len(text):
+            segments.append(text[pos:])
+        if len(segments) < 2:
+            return None
+        return segments
+
+    @staticmethod
+    def _normalize(segment: str) -> str:
+        """「05分」→「5分」のように先頭ゼロを除いてキャッシュを共有"""
+        digits = re.match(r"\d+", segment)
+        if digits:
+            return str(int(digits.group())) + segment[digits.end():]
+        return segment
+
+    async def stream_audio(self, text: str) -> AsyncIterator[bytes]:
+        segments = self.split(text)
+        if segments is None:
+            async for pcm in self.backend.stream_audio(text):
+                yield pcm
+            return
+
+        parts = []
+        for segment in segments:
+            part = await self._segment_audio(segment)
+            if part is None:
+                # 一部でも失敗したら全文合成にフォールバック
+                logger.debug(f"Segment assembly failed, synthesizing full text: {text}")
+                async for pcm in self.backend.stream_audio(text):
+                    yield pcm
+                return
+            parts.append(part)
+        yield self.assemble(parts).tobytes()
+
+    async def _segment_audio(self, segment: str) -> Optional[np.ndarray]:
+        """セグメントの音声（前後の無音除去済みfloat32）をキャッシュ付きで取得"""
+        stripped = segment.strip()
+        if not stripped.strip(PAUSE_CHARS):
+            # 句読点・空白のみ → 短い間
+            pause_ms = self.config.sentence_pause_ms if stripped else 0
+            return np.zeros(self.sample_rate * pause_ms // 1000, dtype=np.float32)
+
+        cached = self.cache.get(stripped)
+        if cached is not None:
+            self.cache.move_to_end(stripped)
+            self.hits += 1
+            CACHE_HITS.inc()
+            return cached
+
+        self.misses += 1
+        CACHE_MISSES.inc()
+        chunks = [bytes(pcm) async for pcm in self.backend.stream_audio(stripped)]
+        if not chunks:
+            return None
+        audio = trim_silence(int16_to_float32(np.frombuffer(b"".join(chunks), dtype=np.int16)))
+        self.cache[stripped] = audio
+        if len(self.cache) > self.config.segment_cache_size:
+            self.cache.popitem(last=False)
+        return audio
+
+    def assemble(self, parts: list[np.ndarray]) -> np.ndarray:
+        """セグメントを短いクロスフェードで連結してint16で返す"""
+        fade = self.sample_rate * self.config.segment_crossfade_ms // 1000
+        out = parts[0]
+        for part in parts[1:]:
+            n = min(fade, len(out), len(part))
+            if n == 0:
+                out = np.concatenate([out, part])
+                continue
+            ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)
+            overlap = out[-n:] * (1.0 - ramp) + part[:n] * ramp
+            out = np.concatenate([out[:-n], overlap, part[n:]])
+        return float32_to_int16(out)
+
+    async def prewarm(self, segments: list[str]):
+        """よく使うセグメント（時・分など）を事前に合成しておく"""
+        for segment in segments:
+            await self._segment_audio(segment)
+        logger.info(f"Segment cache prewarmed ({len(self.cache)} segments, backend: {self.name})")
+
+    async def speak_sentences(self, sentences: AsyncIterator[str]):
+        await self.backend.speak_sentences(sentences)
+
+    async def close(self):
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            result = close()
+            if hasattr(result, "__await__"):
+                await result
+
+
+def trim_silence(audio: np.ndarray, margin: int = 160) -> np.ndarray:
+    """前後の無音を除去（marginサンプルは残す）"""
+    voiced = np.flatnonzero(np.abs(audio) > SILENCE_THRESHOLD)
+    if len(voiced) == 0:
+        return audio
+    start = max(0, voiced[0] - margin)
+    end = min(len(audio), voiced[-1] + margin + 1)
+    return audio[start:end]
+
+
+def clock_segments() -> list[str]:
+    """時計ツール応答用のプリウォーム対象"""
+    return [f"{h}時" for h in range(24)] + [f"{m}分" for m in range(60)]
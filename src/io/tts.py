@@ -1,25 +1,46 @@
 import asyncio
-import tempfile
+import json
 import os
-import wave
+import threading
+import time
 from typing import AsyncIterator
 from ..core.config import TTSConfig
+from .playback import AudioPlayer
 from loguru import logger
 
-try:
-    from piper import PiperVoice
-    PIPER_AVAILABLE = True
-except ImportError:
-    PIPER_AVAILABLE = False
-    logger.warning("piper-tts not available, install with: uv add piper-tts")
+
+DEFAULT_SAMPLE_RATE = 22050
+WARMUP_TEXT = "こんにちは"
+
+
+def _read_sample_rate(config_path: str) -> int:
+    """model.jsonからサンプリングレートを取得"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            model_config = json.load(f)
+        return int(model_config["audio"]["sample_rate"])
+    except Exception as e:
+        logger.warning(f"Failed to read sample rate from {config_path}, using {DEFAULT_SAMPLE_RATE}Hz: {e}")
+        return DEFAULT_SAMPLE_RATE
 
 
 class PiperTTS:
+    name = "piper"
+
     def __init__(self, config: TTSConfig):
         self.config = config
         self.voice = None
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+        self.player = AudioPlayer(config.output_device, config.output_rate)
         
-        if PIPER_AVAILABLE:
+        # onnxruntimeを含むので使う場合だけ読み込む
+        try:
+            from piper import PiperVoice
+        except ImportError:
+            PiperVoice = None
+            logger.warning("piper-tts not available, install with: uv add piper-tts")
+        
+        if PiperVoice is not None:
             try:
                 # Python版Piperを初期化
                 model_path = os.path.join(config.voice_dir, "model.onnx")
@@ -27,15 +48,31 @@ class PiperTTS:
                 
                 if os.path.exists(model_path) and os.path.exists(config_path):
                     self.voice = PiperVoice.load(model_path, config_path)
-                    logger.info(f"Piper TTS (Python) initialized: {config.voice_dir}")
+                    self.sample_rate = _read_sample_rate(config_path)
+                    logger.info(f"Piper TTS (Python) initialized: {config.voice_dir} ({self.sample_rate}Hz)")
+                    self._warm_up()
                 else:
                     logger.warning(f"Piper model files not found in: {config.voice_dir}")
                     logger.info("Download models first. See README.md for instructions.")
             except Exception as e:
                 logger.error(f"Failed to initialize Piper TTS: {e}")
+                self.voice = None
         else:
             logger.warning("Piper TTS not available")
 
+    def _warm_up(self):
+        """ONNXセッションの初回実行コストをロード時に払っておく"""
+        start = time.perf_counter()
+        try:
+            for _ in self.voice.synthesize(WARMUP_TEXT):
+                pass
+            logger.info(f"Piper TTS warm-up done in {(time.perf_counter() - start) * 1000:.0f}ms")
+        except Exception as e:
+            logger.warning(f"Piper TTS warm-up failed: {e}")
+
+    def is_available(self) -> bool:
+        return self.voice is not None
+
     async def speak_sentences(self, sentences: AsyncIterator[str]):
         """文ごとにTTS合成して再生"""
         if self.voice is None:
@@ -58,64 +95,54 @@ class PiperTTS:
                 logger.error(f"TTS failed for sentence '{sentence}': {e}")
 
     async def _speak_text(self, text: str):
-        """単一テキストをTTS合成して再生"""
+        """単一テキストを合成しながら逐次再生"""
         if self.voice is None:
             print(f"[TTS] {text}")
             return
             
         try:
-            # 音声合成（非同期実行）
-            audio_data = await asyncio.get_event_loop().run_in_executor(
-                None, self._synthesize_audio, text
-            )
-            
-            if audio_data:
-                # 一時WAVファイルに保存して再生
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-                    wav_path = tmp_file.name
-                
-                # WAVファイルに書き込み
-                with wave.open(wav_path, 'wb') as wav_file:
-                    wav_file.setnchannels(1)  # モノラル
-                    wav_file.setsampwidth(2)  # 16bit
-                    wav_file.setframerate(22050)  # サンプリングレート
-                    wav_file.writeframes(audio_data)
-                
-                # 再生
-                await self._play_audio(wav_path)
-                
-                # 一時ファイル削除
-                try:
-                    os.unlink(wav_path)
-                except:
-                    pass
-                    
+            await self.player.play_stream(self.stream_audio(text), self.sample_rate)
         except Exception as e:
             logger.error(f"TTS synthesis error: {e}")
 
-    def _synthesize_audio(self, text: str) -> bytes:
-        """音声合成（同期処理）"""
-        try:
-            audio_stream = self.voice.synthesize(text)
-            return b''.join(audio_stream)
-        except Exception as e:
-            logger.error(f"Audio synthesis failed: {e}")
-            return b''
+    async def stream_audio(self, text: str) -> AsyncIterator[bytes]:
+        """ワーカースレッドで合成し、生成されたPCMチャンクを順にyield"""
+        if self.voice is None:
+            return
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def worker():
+            try:
+                for chunk in self.voice.synthesize(text):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, self._chunk_bytes(chunk))
+            except Exception as e:
+                logger.error(f"Audio synthesis failed: {e}")
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
 
-    async def _play_audio(self, wav_path: str):
-        """WAVファイルを再生（macOS用）"""
+        future = loop.run_in_executor(None, worker)
         try:
-            # macOSのafplayコマンドを使用
-            process = await asyncio.create_subprocess_exec(
-                "afplay", wav_path,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode != 0:
-                logger.error(f"Audio playback failed: {stderr.decode()}")
-                
-        except Exception as e:
-            logger.error(f"Audio playback error: {e}")
\ No newline at end of file
+            while True:
+                pcm = await queue.get()
+                if pcm is None:
+                    break
+                yield pcm
+        finally:
+            # 消費側が途中で抜けた場合も合成スレッドを止める
+            stop.set()
+            await future
+
+    @staticmethod
+    def _chunk_bytes(chunk) -> bytes:
+        """piper-tts 1.3のAudioChunkと旧APIのbytesの両方に対応"""
+        if isinstance(chunk, (bytes, bytearray)):
+            return bytes(chunk)
+        return chunk.audio_int16_bytes
+
+    def close(self):
+        """出力デバイスを解放"""
+        self.player.close()
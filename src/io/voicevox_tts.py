@@ -1,27 +1,36 @@
 import asyncio
-import tempfile
-import os
 import hashlib
-import aiohttp
 from typing import AsyncIterator
 from ..core.config import TTSConfig
+from ..audio.format import parse_wav
+from ..core.metrics import REGISTRY
+from .playback import AudioPlayer
 from loguru import logger
 
+TTS_CACHE = REGISTRY.counter("tts_cache_requests_total", "TTS audio cache lookups", ("cache", "result"))
+CACHE_HITS = TTS_CACHE.labels("voicevox", "hit")
+CACHE_MISSES = TTS_CACHE.labels("voicevox", "miss")
+
 
 class VoicevoxTTS:
+    name = "voicevox"
+    sample_rate = 24000  # audio_queryのoutputSamplingRateに指定
+
     def __init__(self, config: TTSConfig):
         self.config = config
-        self.base_url = "http://127.0.0.1:50021"  # VOICEVOX Engine URL
-        self.speaker_id = 3  # ずんだもん（ノーマル）
+        self.base_url = config.voicevox_url  # VOICEVOX Engine URL
+        self.speaker_id = config.voicevox_speaker  # 3: ずんだもん（ノーマル）
         self.audio_cache = {}  # 音声キャッシュ
         self.session = None  # aiohttp session
         self.available = False
+        self.player = AudioPlayer(config.output_device, config.output_rate)
         
         # 非同期初期化は後で行う
-        asyncio.create_task(self._async_init())
+        self.init_task = asyncio.create_task(self._async_init())
 
     async def _async_init(self):
         """非同期初期化"""
+        import aiohttp  # 読み込みが重いのでVOICEVOXを使う場合だけ
         try:
             self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
             async with self.session.get(f"{self.base_url}/version") as response:
@@ -36,6 +45,18 @@ class VoicevoxTTS:
                 await self.session.close()
                 self.session = None
 
+    def is_available(self) -> bool:
+        return self.available and self.session is not None
+
+    async def stream_audio(self, text: str) -> AsyncIterator[bytes]:
+        """1文を合成してPCM(int16)をyield"""
+        if not self.is_available():
+            return
+        wav_data = await self._synthesize_cached(text)
+        if wav_data:
+            # ヘッダだけ解析し、データ部はコピーせずに渡す
+            yield parse_wav(wav_data).samples.data
+
     async def speak_sentences(self, sentences: AsyncIterator[str]):
         """文ごとにTTS合成して再生（高速化版）"""
         if not self.available or not self.session:
@@ -77,8 +98,10 @@ class VoicevoxTTS:
         cache_key = hashlib.md5(f"{text}:{self.speaker_id}".encode()).hexdigest()
         
         if cache_key in self.audio_cache:
+            CACHE_HITS.inc()
             logger.debug(f"Cache hit for: {text}")
             return self.audio_cache[cache_key]
+        CACHE_MISSES.inc()
         
         try:
             # 音声クエリ生成
@@ -90,6 +113,7 @@ class VoicevoxTTS:
                     logger.error(f"Audio query failed: {response.status}")
                     return b''
                 audio_query = await response.json()
+            audio_query["outputSamplingRate"] = self.sample_rate
             
             # 音声合成
             async with self.session.post(
@@ -117,37 +141,20 @@ class VoicevoxTTS:
             return b''
 
     async def _play_audio_data(self, audio_data: bytes):
-        """音声データを直接再生"""
+        """WAVデータを出力デバイスのレートへ変換して再生"""
         try:
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-                tmp_file.write(audio_data)
-                wav_path = tmp_file.name
-            
-            # 再生
-            process = await asyncio.create_subprocess_exec(
-                "afplay", wav_path,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            await process.communicate()
-            
-            # 一時ファイル削除
-            try:
-                os.unlink(wav_path)
-            except:
-                pass
-                
+            wav = parse_wav(audio_data)
+            await self.player.play(wav.samples.data, wav.sample_rate)
         except Exception as e:
             logger.error(f"Audio playback error: {e}")
 
-
     async def close(self):
         """リソースクリーンアップ"""
         if self.session:
             await self.session.close()
             self.session = None
             logger.debug("VOICEVOX TTS session closed")
+        self.player.close()
     
     def __del__(self):
         """デストラクタでセッションクローズ"""
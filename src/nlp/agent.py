@@ -1,22 +1,39 @@
+import asyncio
 import re
 import json
-from typing import AsyncIterator
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
 from ..nlp.llm import LocalLLM
 from ..tools.base import Tool
 from ..core.config import AgentConfig
 from loguru import logger
 
+HISTORY_TURNS = 5  # プロンプトに含める直近のやり取り数
+
+
+@dataclass(slots=True)
+class Conversation:
+    """ストリーム（話者）ごとの会話履歴"""
+    history: deque = field(default_factory=lambda: deque(maxlen=HISTORY_TURNS))
+
 
 class Agent:
     def __init__(self, llm: LocalLLM, tools: dict[str, Tool], system_prompt: str):
         self.llm = llm
         self.tools = tools
         self.system_prompt = system_prompt
-        self.conversation_history = []
+        # 単一ストリームで使う場合の既定の会話
+        self.conversation = Conversation()
         
         logger.info(f"Agent initialized with {len(tools)} tools: {list(tools.keys())}")
 
-    def _build_prompt(self, user_text: str) -> str:
+    @property
+    def conversation_history(self) -> deque:
+        return self.conversation.history
+
+    def _prompt_prefix(self, conversation: Conversation) -> str:
+        """発話内容より前のプロンプト（システムプロンプト・ツール説明・履歴・"Human: "）"""
         # 利用可能なツールの説明を生成
         tools_desc = ""
         if self.tools:
@@ -29,13 +46,32 @@ class Agent:
         prompt = f"{self.system_prompt}\n\n{tools_desc}\n"
         
         # 会話履歴を追加
-        for entry in self.conversation_history[-5:]:  # 直近5回のやり取りのみ
+        for entry in conversation.history:  # 直近HISTORY_TURNS回のやり取りのみ
             prompt += f"Human: {entry['human']}\nAssistant: {entry['assistant']}\n\n"
         
-        prompt += f"Human: {user_text}\nAssistant: "
+        prompt += "Human: "
         
         return prompt
 
+    def _build_prompt(self, user_text: str, conversation: Conversation) -> str:
+        return self._prompt_prefix(conversation) + f"{user_text}\nAssistant: "
+
+    async def prefill(self, conversation: Optional[Conversation] = None):
+        """発話の認識を待たずにプロンプトの既知部分をLLMに評価させておく（投機的prefill）
+
+        キャンセルされた場合はLLM側もチャンクの区切りで止まる。
+        """
+        if self.llm.llm is None:
+            return
+        conversation = conversation or self.conversation
+        try:
+            await self.llm.aprefill(self._prompt_prefix(conversation))
+        except asyncio.CancelledError:
+            logger.debug("LLM prefill cancelled")
+            raise
+        except Exception as e:
+            logger.warning(f"LLM prefill failed: {e}")
+
     def _extract_tool_calls(self, text: str) -> list[tuple[str, dict]]:
         """テキストからツール呼び出しを抽出"""
         tool_pattern = r'<tool:(\w+)\s+([^>]+)>'
@@ -56,15 +92,17 @@ class Agent:
         
         return tool_calls
 
-    async def handle(self, user_text: str) -> AsyncIterator[str]:
-        prompt = self._build_prompt(user_text)
+    async def handle(self, user_text: str, conversation: Optional[Conversation] = None) -> AsyncIterator[str]:
+        """応答をストリーミング生成（conversation省略時は既定の会話）"""
+        conversation = conversation or self.conversation
+        prompt = self._build_prompt(user_text, conversation)
         response_buffer = ""
         
         logger.debug(f"Agent processing: '{user_text}'")
         
         try:
             # LLMからストリーミング生成
-            for token in self.llm.stream(prompt):
+            async for token in self.llm.astream(prompt):
                 response_buffer += token
                 yield token
                 
@@ -90,7 +128,7 @@ class Agent:
                             logger.error(f"Tool execution failed: {e}")
             
             # 会話履歴に追加
-            self.conversation_history.append({
+            conversation.history.append({
                 "human": user_text,
                 "assistant": response_buffer
             })
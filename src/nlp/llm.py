@@ -1,12 +1,31 @@
-from typing import Iterator
-from llama_cpp import Llama
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterator
 from ..core.config import LLMConfig
+from ..core.metrics import REGISTRY
+from ..core.worker import ProcessWorker, WorkerCrashed
 from loguru import logger
 
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Generated tokens")
+LLM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "llm_tokens_per_second", "Decode throughput per generation (after the first token)",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 100)
+)
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram("llm_first_token_seconds", "Prompt evaluation time until the first token")
+LLM_DRAFT_ACCEPTANCE = REGISTRY.histogram(
+    "llm_draft_acceptance", "Share of speculative draft tokens accepted per generation",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+LLM_PREFILL_TOKENS = REGISTRY.counter("llm_prefill_tokens_total", "Prompt tokens evaluated speculatively before the transcript")
+
+PREFILL_CHUNK = 32  # 投機的prefillはこのトークン数ごとに中断を確認する
+
 
 class LocalLLM:
     def __init__(self, config: LLMConfig):
         self.config = config
+        self.lock = threading.Lock()  # llama.cppのコンテキストは同時に1生成のみ
         logger.info(f"Loading LLM model from: {config.gguf_path}")
         
         # モデルファイルの存在確認
@@ -15,20 +34,67 @@ class LocalLLM:
             logger.error(f"LLM model file not found: {config.gguf_path}")
             logger.info("Please download a model file first. See README.md for instructions.")
             self.llm = None
+            self.draft = None
             return
         
         try:
+            # llama_cppの読み込みはモデルのロード時に（子プロセスのワーカーでは親で読み込まない）
+            from llama_cpp import Llama
+            from .speculative import create_draft_model
+            # 投機的デコーディング（offならNone）
+            self.draft = create_draft_model(config)
             self.llm = Llama(
                 model_path=config.gguf_path,
                 n_ctx=config.ctx_size,
                 n_threads=config.n_threads,
                 n_gpu_layers=config.n_gpu_layers,
+                draft_model=self.draft,
                 verbose=False
             )
-            logger.info("LLM model loaded successfully")
+            logger.info(f"LLM model loaded successfully (speculative: {config.speculative if self.draft else 'off'})")
         except Exception as e:
             logger.error(f"Failed to load LLM model: {e}")
             self.llm = None
+            self.draft = None
+
+    def warm_up(self):
+        """1トークンだけ生成してグラフ構築等の初回コストを払っておく"""
+        if self.llm is None:
+            return
+        with self.lock:
+            self.llm.create_completion("こんにちは", max_tokens=1)
+
+    def prefill(self, prefix: str, cancelled: Callable[[], bool]) -> int:
+        """プロンプトの先頭部分をKVキャッシュに評価しておき、評価したトークン数を返す
+
+        llama.cppは次の生成時に評価済みトークンとの共通部分を再利用するので、
+        残りの発話部分だけが評価される。cancelled()がTrueになったらチャンクの区切りで止める。
+        """
+        if self.llm is None:
+            return 0
+        with self.lock:
+            # 末尾のトークンは続く発話と結合しうるので評価しない
+            tokens = self.llm.tokenize(prefix.encode("utf-8"), special=True)[:-1]
+            reuse = self.llm.longest_token_prefix(self.llm.input_ids[:self.llm.n_tokens].tolist(), tokens)
+            self.llm.n_tokens = reuse  # eval()はn_tokens以降のKVキャッシュを捨ててから評価する
+            for start in range(reuse, len(tokens), PREFILL_CHUNK):
+                if cancelled():
+                    break
+                self.llm.eval(tokens[start:start + PREFILL_CHUNK])
+            evaluated = self.llm.n_tokens - reuse
+        LLM_PREFILL_TOKENS.inc(evaluated)
+        logger.debug(f"LLM prefill: {evaluated} tokens evaluated, {reuse} reused")
+        return evaluated
+
+    async def aprefill(self, prefix: str) -> int:
+        """prefillをワーカースレッドで実行（タスクのキャンセルで中断）"""
+        cancel = threading.Event()
+        future = asyncio.get_running_loop().run_in_executor(None, self.prefill, prefix, cancel.is_set)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel.set()
+            raise
 
     def stream(self, prompt: str) -> Iterator[str]:
         if self.llm is None:
@@ -37,6 +103,12 @@ class LocalLLM:
             
         try:
             logger.debug(f"LLM generation started for prompt length: {len(prompt)}")
+            start = time.perf_counter()
+            first_at = None
+            count = 0
+            if self.draft is not None:
+                self.draft.begin()
+                proposed, accepted = self.draft.proposed, self.draft.accepted
             
             for output in self.llm.create_completion(
                 prompt,
@@ -49,12 +121,148 @@ class LocalLLM:
             ):
                 token = output["choices"][0]["text"]
                 if token:
+                    count += 1
+                    if first_at is None:
+                        first_at = time.perf_counter()
+                        LLM_FIRST_TOKEN_SECONDS.observe(first_at - start)
                     yield token
+
+            LLM_TOKENS.inc(count)
+            decode_s = time.perf_counter() - first_at if first_at is not None else 0.0
+            if count > 1 and decode_s > 0:
+                LLM_TOKENS_PER_SECOND.observe((count - 1) / decode_s)
+            if self.draft is not None and self.draft.proposed > proposed:
+                LLM_DRAFT_ACCEPTANCE.observe((self.draft.accepted - accepted) / (self.draft.proposed - proposed))
                     
         except Exception as e:
             logger.error(f"LLM generation failed: {e}")
             yield "申し訳ありませんが、応答の生成中にエラーが発生しました。"
 
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """ワーカースレッドで生成し、トークンをイベントループ側へ順にyield"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def worker():
+            try:
+                with self.lock:
+                    for token in self.stream(prompt):
+                        if stop.is_set():
+                            break
+                        loop.call_soon_threadsafe(queue.put_nowait, token)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        future = loop.run_in_executor(None, worker)
+        try:
+            while True:
+                token = await queue.get()
+                if token is None:
+                    break
+                yield token
+        finally:
+            # 消費側が途中で抜けた場合も生成を止める
+            stop.set()
+            await future
+
     def generate(self, prompt: str) -> str:
         tokens = list(self.stream(prompt))
-        return "".join(tokens)
\ No newline at end of file
+        return "".join(tokens)
+
+
+def _llm_worker(conn, config: LLMConfig):
+    """子プロセス側: プロンプトを受け取りトークンを逐次送り返す"""
+    llm = LocalLLM(config)
+    llm.warm_up()
+    conn.send(("ready", {"available": llm.llm is not None}))
+    stopping = False
+
+    def interrupted() -> bool:
+        """処理中に届いたcancel・stopの確認（要求は同時に1つなので他の要求は届かない）"""
+        nonlocal stopping
+        try:
+            if not conn.poll():
+                return False
+            if conn.recv()[0] == "stop":
+                stopping = True  # 終了処理中 → 今の要求を打ち切ってループも抜ける
+        except EOFError:
+            stopping = True
+        return True
+
+    while not stopping:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == "stop":
+            break
+        if message[0] == "prefill":
+            evaluated = llm.prefill(message[1], interrupted)
+            conn.send(("done", evaluated))
+            continue
+        if message[0] != "generate":
+            continue  # 生成終了後に届いたcancelは読み捨てる
+        draft = llm.draft
+        before = (draft.proposed, draft.accepted) if draft is not None else (0, 0)
+        for token in llm.stream(message[1]):
+            if interrupted():
+                break
+            conn.send(("token", token))
+        # 子プロセスのメトリクスは公開されないので、下書きの提案・受理数の増分を親へ返す
+        after = (draft.proposed, draft.accepted) if draft is not None else (0, 0)
+        conn.send(("done", after[0] - before[0], after[1] - before[1]))
+
+
+class RemoteLLM:
+    """LocalLLM互換。llama.cppを子プロセスで動かし、トークンをPipeで受け取る"""
+
+    def __init__(self, config: LLMConfig, restart_delay_s: float = 1.0):
+        self.config = config
+        self.worker = ProcessWorker("llm", _llm_worker, (config,), restart_delay_s)
+
+    @property
+    def llm(self):
+        """モデルが利用可能か（LocalLLM.llm is not None と同じ判定に使う）"""
+        return self if self.worker.info.get("available") else None
+
+    async def start(self) -> "RemoteLLM":
+        await self.worker.start()
+        return self
+
+    async def aprefill(self, prefix: str) -> int:
+        """子プロセスでprefill（タスクのキャンセルはProcessWorker.callがcancelとして伝える）"""
+        evaluated = 0
+        try:
+            async for message in self.worker.call(("prefill", prefix)):
+                if message[0] == "done":
+                    evaluated = message[1]
+        except WorkerCrashed as e:
+            logger.warning(f"LLM prefill failed: {e}")
+        LLM_PREFILL_TOKENS.inc(evaluated)
+        return evaluated
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        first_at = None
+        count = 0
+        try:
+            async for message in self.worker.call(("generate", prompt)):
+                if message[0] == "token":
+                    count += 1
+                    if first_at is None:
+                        first_at = time.perf_counter()
+                        LLM_FIRST_TOKEN_SECONDS.observe(first_at - start)
+                    yield message[1]
+                elif message[0] == "done" and message[1] > 0:
+                    LLM_DRAFT_ACCEPTANCE.observe(message[2] / message[1])
+        except WorkerCrashed as e:
+            logger.error(f"LLM generation failed: {e}")
+            yield "申し訳ありませんが、応答の生成中にエラーが発生しました。"
+            return
+        LLM_TOKENS.inc(count)
+        if count > 1 and first_at is not None:
+            LLM_TOKENS_PER_SECOND.observe((count - 1) / max(time.perf_counter() - first_at, 1e-9))
+
+    async def close(self):
+        await self.worker.close()
@@ -0,0 +1,86 @@
+from typing import Any, Optional
+import numpy as np
+from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
+from ..core.config import LLMConfig
+from loguru import logger
+
+
+class GGUFDraftModel(LlamaDraftModel):
+    """小さいGGUFモデルで貪欲に数トークン先まで予測する下書きモデル
+
+    本体と語彙（トークナイザ）が同じモデルを使うこと。評価済みトークンとの共通部分は再評価しない。
+    """
+
+    def __init__(self, config: LLMConfig):
+        self.num_pred_tokens = config.draft_tokens
+        self.llm = Llama(
+            model_path=config.draft_gguf_path,
+            n_ctx=config.ctx_size,
+            n_threads=config.n_threads,
+            n_gpu_layers=config.n_gpu_layers,
+            verbose=False
+        )
+
+    def __call__(self, input_ids: np.ndarray, /, **kwargs: Any) -> np.ndarray:
+        llm = self.llm
+        tokens = input_ids.tolist()
+        # 最後のトークンは必ず評価し直して次の予測のlogitsを得る
+        reuse = min(llm.longest_token_prefix(llm.input_ids[:llm.n_tokens].tolist(), tokens), len(tokens) - 1)
+        llm.n_tokens = reuse
+        llm.eval(tokens[reuse:])
+        draft = []
+        for _ in range(min(self.num_pred_tokens, llm.n_ctx() - llm.n_tokens - 1)):
+            token = llm.sample(temp=0.0)
+            if llm.token_eos() == token:
+                break
+            draft.append(token)
+            llm.eval([token])
+        return np.array(draft, dtype=np.intc)
+
+
+class DraftStats(LlamaDraftModel):
+    """下書きモデルを包み、提案・受理されたトークン数を数える
+
+    llama.cppは評価1回ごとに下書きを求め、受理された下書き＋本体がサンプルした1トークンを
+    入力に加えて次の呼び出しを行う。入力長の増分から前回の下書きの受理数が分かる。
+    """
+
+    def __init__(self, draft: LlamaDraftModel):
+        self.draft = draft
+        self.proposed = 0  # 受理数を確認できた提案トークン数
+        self.accepted = 0
+        self.last_len: Optional[int] = None
+        self.pending = 0  # 直前の呼び出しで提案したトークン数
+
+    def begin(self):
+        """生成の開始（直前の生成の最後の提案は結果が分からないので数えない）"""
+        self.last_len = None
+        self.pending = 0
+
+    def __call__(self, input_ids: np.ndarray, /, **kwargs: Any) -> np.ndarray:
+        length = len(input_ids)
+        if self.last_len is not None and self.pending:
+            self.proposed += self.pending
+            self.accepted += min(self.pending, max(0, length - self.last_len - 1))
+        draft = self.draft(input_ids, **kwargs)
+        self.last_len = length
+        self.pending = len(draft)
+        return draft
+
+
+def create_draft_model(config: LLMConfig) -> Optional[DraftStats]:
+    """LLMConfig.speculativeに応じた下書きモデル（off / prompt_lookup / draft）"""
+    if config.speculative == "prompt_lookup":
+        # プロンプト（発話・ツール結果）に出てきた語句の続きをそのまま提案する
+        return DraftStats(LlamaPromptLookupDecoding(
+            max_ngram_size=config.lookup_ngram,
+            num_pred_tokens=config.draft_tokens
+        ))
+    if config.speculative == "draft":
+        if not config.draft_gguf_path:
+            logger.warning("llm.speculative is 'draft' but draft_gguf_path is not set - disabled")
+            return None
+        logger.info(f"Loading draft model from: {config.draft_gguf_path}")
+        return DraftStats(GGUFDraftModel(config))
+    return None
@@ -0,0 +1,273 @@
+import asyncio
+import itertools
+import time
+from typing import TYPE_CHECKING, Optional
+
+from .core.bus import Bus, Event, Policy, Subscription
+from .core.trace import Tracer
+from .nlp.agent import Conversation
+from .nlp.splitter import sentence_stream
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from .app import VoiceAgent
+
+# イベント種別
+AUDIO_FRAME = "audio.frame"  # {"frame": AudioFrame}
+WAKE = "wake"  # {"turn_id"}
+SPEECH_START = "speech.start"  # {"turn_id"}
+UTTERANCE = "utterance"  # {"turn_id", "pcm"}
+TRANSCRIPT = "transcript"  # {"turn_id", "text"}
+AGENT_TOKEN = "agent.token"  # {"turn_id", "token"}
+AGENT_DONE = "agent.done"  # {"turn_id", "text"}
+SENTENCE = "sentence"  # {"turn_id", "index", "text"}
+SENTENCE_END = "sentence.end"  # {"turn_id"}
+TTS_AUDIO = "tts.audio"  # {"turn_id", "index", "chunk"}
+TTS_DONE = "tts.done"  # {"turn_id"}
+PLAYBACK_START = "playback.start"  # {"turn_id"}
+PLAYBACK_END = "playback.end"  # {"turn_id"}
+TURN_END = "turn.end"  # {"turn_id", "reason"}
+
+
+class Pipeline:
+    """各ステージを独立したタスクとして動かし、バス経由で繋ぐ
+
+    capture → wake/VAD → ASR → agent → segmenter → TTS → playback
+    ステージ間のキューは有界で、キュー深さはbus.stats()で確認できる。
+    """
+
+    def __init__(self, agent: "VoiceAgent", bus: Bus):
+        self.va = agent
+        self.bus = bus
+        self.turn_ids = itertools.count(1)
+        self.current_turn = 0
+        self.endpoint_at = time.monotonic()
+        self.tasks: list[asyncio.Task] = []
+        self.prefill_task: Optional[asyncio.Task] = None
+        # 購読はステージ起動前に作っておく（起動順による取りこぼし防止）
+        self.subs: dict[str, Subscription] = {
+            "wake_vad": bus.subscribe(AUDIO_FRAME, name="wake_vad", maxsize=100, policy=Policy.DROP_OLDEST),
+            "asr": bus.subscribe(UTTERANCE, name="asr", maxsize=2),
+            "agent": bus.subscribe(TRANSCRIPT, name="agent", maxsize=2),
+            "segmenter": bus.subscribe(AGENT_TOKEN, AGENT_DONE, name="segmenter", maxsize=256),
+            "tts": bus.subscribe(SENTENCE, SENTENCE_END, name="tts", maxsize=16),
+            "playback": bus.subscribe(TTS_AUDIO, TTS_DONE, name="playback", maxsize=32),
+            "control": bus.subscribe(UTTERANCE, TURN_END, name="control", maxsize=16),
+        }
+        self.tracer = Tracer(bus)
+        # 発話音声・認識結果・応答をターン終了時にアーカイブへ（privacy設定で無効ならNone）
+        self.stream = "local"
+        self.archiver = getattr(agent, "archiver", None)
+        self.archive_turns: dict[int, dict] = {}
+        if self.archiver is not None:
+            self.subs["archive"] = bus.subscribe(
+                UTTERANCE, TRANSCRIPT, AGENT_DONE, name="archive", maxsize=16, policy=Policy.DROP_OLDEST
+            )
+            self.tracer.listeners.append(self._archive_turn)
+        # ストリームごとの状態（モデル類は共有）
+        self.wake_state = agent.wake_vad.new_state()
+        self.conversation = Conversation()
+
+    def _stages(self) -> dict:
+        return {
+            "capture": self._capture_stage,
+            "wake_vad": self._wake_vad_stage,
+            "asr": self._asr_stage,
+            "agent": self._agent_stage,
+            "segmenter": self._segmenter_stage,
+            "tts": self._tts_stage,
+            "playback": self._playback_stage,
+            "control": self._control_stage,
+            "monitor": self._monitor_stage,
+            "tracer": self.tracer.run,
+        } | ({"archive": self._archive_stage} if self.archiver is not None else {})
+
+    async def run(self):
+        stages = self._stages()
+        self.tasks = [asyncio.create_task(stage(), name=name) for name, stage in stages.items()]
+        try:
+            # いずれかのステージが終了・失敗したら全体を止める
+            done, _ = await asyncio.wait(self.tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    logger.error(f"Pipeline stage '{task.get_name()}' failed: {task.exception()}")
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        self._cancel_prefill()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def _start_prefill(self):
+        """発話中にLLMへプロンプトの既知部分を評価させておく（ASR後は発話部分だけ評価すれば済む）"""
+        self._cancel_prefill()
+        if self.va.config.llm.speculative_prefill:
+            self.prefill_task = asyncio.create_task(self._prefill(), name="prefill")
+
+    async def _prefill(self):
+        agent = await self.va.loader.get("agent")
+        await agent.prefill(self.conversation)
+
+    def _cancel_prefill(self):
+        if self.prefill_task is not None and not self.prefill_task.done():
+            self.prefill_task.cancel()
+        self.prefill_task = None
+
+    async def _publish(self, event_type: str, **payload):
+        await self.bus.publish(Event(event_type, payload))
+
+    async def _player(self):
+        """合成音声の出力先（AudioPlayer互換）"""
+        return (await self.va.loader.get("tts")).player
+
+    async def _capture_stage(self):
+        async for frame in self.va.audio_capture.stream():
+            await self._publish(AUDIO_FRAME, frame=frame)
+
+    async def _wake_vad_stage(self):
+        sub = self.subs["wake_vad"]
+
+        async def frames():
+            async for event in sub:
+                yield event.payload["frame"]
+
+        async def on_event(kind: str):
+            if kind == WAKE:
+                self.current_turn = next(self.turn_ids)
+                # 遅延ロード設定のLLMはここでロード開始
+                self.va.loader.start("agent")
+                self._start_prefill()
+            await self._publish(kind, turn_id=self.current_turn)
+
+        self.wake_state.on_event = on_event
+        async for utterance in self.va.wake_vad.iter_utterances(frames(), self.wake_state):
+            # 応答が終わるまで次の発話は受け付けない
+            self.va.wake_vad.pause(self.wake_state)
+            await self._publish(UTTERANCE, turn_id=self.current_turn, pcm=utterance)
+
+    async def _asr_stage(self):
+        asr = await self.va.loader.get("asr")
+        async for event in self.subs["asr"]:
+            turn_id = event.payload["turn_id"]
+            text = await asr.transcribe(event.payload["pcm"])
+            if not text.strip():
+                await self._publish(TURN_END, turn_id=turn_id, reason="empty")
+                continue
+            logger.info(f"User said: '{text}'")
+            await self._publish(TRANSCRIPT, turn_id=turn_id, text=text)
+
+    async def _agent_stage(self):
+        async for event in self.subs["agent"]:
+            agent = await self.va.loader.get("agent")
+            turn_id = event.payload["turn_id"]
+            response_text = ""
+            try:
+                async for token in agent.handle(event.payload["text"], self.conversation):
+                    response_text += token
+                    print(token, end='', flush=True)
+                    await self._publish(AGENT_TOKEN, turn_id=turn_id, token=token)
+            finally:
+                print()  # 改行
+                logger.info(f"Agent response: {response_text}")
+                await self._publish(AGENT_DONE, turn_id=turn_id, text=response_text)
+
+    async def _segmenter_stage(self):
+        sub = self.subs["segmenter"]
+        while True:
+            first = await sub.get()
+            turn_id = first.payload["turn_id"]
+
+            async def tokens(event: Event = first):
+                while event.type != AGENT_DONE:
+                    yield event.payload["token"]
+                    event = await sub.get()
+
+            index = 0
+            async for sentence in sentence_stream(tokens()):
+                await self._publish(SENTENCE, turn_id=turn_id, index=index, text=sentence)
+                index += 1
+            await self._publish(SENTENCE_END, turn_id=turn_id)
+
+    async def _tts_stage(self):
+        tts = await self.va.loader.get("tts")
+        async for event in self.subs["tts"]:
+            turn_id = event.payload["turn_id"]
+            if event.type == SENTENCE_END:
+                await self._publish(TTS_DONE, turn_id=turn_id)
+                continue
+            if not tts.is_available():
+                print(f"[TTS] {event.payload['text']}")
+                continue
+            async for chunk in tts.stream_sentence(event.payload["text"]):
+                await self._publish(TTS_AUDIO, turn_id=turn_id, index=event.payload["index"], chunk=chunk)
+
+    async def _playback_stage(self):
+        player = await self._player()
+        pause_s = self.va.config.tts.sentence_pause_ms / 1000.0
+        playing_turn = None
+        last_index = None
+        async for event in self.subs["playback"]:
+            turn_id = event.payload["turn_id"]
+            if event.type == TTS_DONE:
+                if playing_turn == turn_id:
+                    await self._publish(PLAYBACK_END, turn_id=turn_id)
+                playing_turn = last_index = None
+                await self._publish(TURN_END, turn_id=turn_id, reason="done")
+                continue
+
+            if playing_turn != turn_id:
+                # 本応答の最初の音声 → 相槌を止めて再生開始
+                playing_turn = turn_id
+                if self.va.filler is not None:
+                    await self.va.filler.cancel()
+                    self.va.filler.observe((time.monotonic() - self.endpoint_at) * 1000)
+                await self._publish(PLAYBACK_START, turn_id=turn_id)
+            elif last_index is not None and event.payload["index"] != last_index:
+                await asyncio.sleep(pause_s)  # 文間の間隔
+            last_index = event.payload["index"]
+            chunk = event.payload["chunk"]
+            await player.play(chunk.pcm, chunk.sample_rate)
+
+    async def _control_stage(self):
+        """相槌の開始と、ターン終了時の音声入力再開"""
+        async for event in self.subs["control"]:
+            if event.type == UTTERANCE:
+                self.endpoint_at = event.ts
+                if self.va.filler is not None:
+                    self.va.filler.start()
+                continue
+            if self.va.filler is not None:
+                await self.va.filler.cancel()
+            # 空の発話などで応答しなかった場合の投機的prefillを止める
+            self._cancel_prefill()
+            self.va.wake_vad.resume(self.wake_state)
+            logger.debug(f"Turn {event.payload['turn_id']} ended ({event.payload['reason']}) - audio input resumed")
+
+    async def _archive_stage(self):
+        """アーカイブするターンの内容を集める（書き出しはトレース確定時）"""
+        async for event in self.subs["archive"]:
+            turn = self.archive_turns.setdefault(event.payload["turn_id"], {})
+            if event.type == UTTERANCE:
+                turn["pcm"] = event.payload["pcm"]
+            elif event.type == TRANSCRIPT:
+                turn["transcript"] = event.payload["text"]
+            else:
+                turn["response"] = event.payload["text"]
+
+    def _archive_turn(self, trace):
+        turn = self.archive_turns.pop(trace.turn_id, {})
+        # 取りこぼしたターンの残りを溜め込まない
+        for turn_id in [t for t in self.archive_turns if t < trace.turn_id]:
+            del self.archive_turns[turn_id]
+        pcm = turn.pop("pcm", None)
+        self.archiver.submit({"stream": self.stream, **trace.to_dict(), **turn}, pcm)
+
+    async def _monitor_stage(self):
+        """ステージ間キューの深さを定期的にログ出力"""
+        while True:
+            await asyncio.sleep(10)
+            logger.debug(f"Bus queues: {self.bus.stats()}")
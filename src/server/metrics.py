@@ -0,0 +1,36 @@
+from typing import Optional
+from aiohttp import web
+from ..core.config import MetricsConfig
+from ..core.metrics import REGISTRY, MetricsRegistry
+from loguru import logger
+
+
+class MetricsServer:
+    """メトリクスをPrometheusテキスト形式で公開する小さなHTTPサーバ（GET /metrics）"""
+
+    def __init__(self, config: MetricsConfig, registry: MetricsRegistry = REGISTRY):
+        self.config = config
+        self.registry = registry
+        self.runner: Optional[web.AppRunner] = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"},
+            charset="utf-8"
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get(self.config.path, self._handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.config.host, self.config.port)
+        await site.start()
+        logger.info(f"Metrics endpoint: http://{self.config.host}:{self.config.port}{self.config.path}")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,211 @@
+"""
+WebSocket音声サーバ
+複数のサテライトマイクからPCMを受け取り、ASR・LLM・TTSのモデルを共有して応答音声を返す。
+
+プロトコル（1接続 = 1セッション）:
+    client → {"type": "hello", "sample_rate": 16000, "output_rate": 16000}  最初に送る
+    server → {"type": "ready", "session_id": N}
+    client → バイナリ: int16 モノラルPCM（sample_rate）
+    client → {"type": "wake"}  Wake Word検知をクライアント側で行う場合（プッシュトゥトーク）
+    server → {"type": "wake" | "transcript" | "response" | "playback.start" | "turn.end", ...}
+    server → バイナリ: 応答音声 int16 モノラルPCM（output_rate）
+"""
+import asyncio
+import itertools
+import json
+import time
+from typing import TYPE_CHECKING, Optional
+import numpy as np
+from aiohttp import WSMsgType, web
+from ..audio.format import PCMResampler, StreamResampler, int16_to_float32
+from ..audio.frame import AudioFrame
+from ..core.bus import Bus, Event, Policy
+from ..core.config import ServerConfig
+from ..core.metrics import REGISTRY
+from ..pipeline import AGENT_DONE, AUDIO_FRAME, PLAYBACK_START, TRANSCRIPT, TURN_END, WAKE, Pipeline
+from loguru import logger
+
+if TYPE_CHECKING:
+    from ..app import VoiceAgent
+
+SESSIONS = REGISTRY.gauge("ws_sessions", "Connected WebSocket clients")
+REJECTED = REGISTRY.counter("ws_rejected_total", "Connections rejected because the server was full")
+
+
+class WebSocketPlayer:
+    """AudioPlayer互換。応答音声をクライアントの出力レートに変換してバイナリフレームで送る
+
+    送信はクライアントの受信速度に合わせて待つ（send_timeout_sを超えたら失敗）。
+    """
+
+    def __init__(self, ws: web.WebSocketResponse, rate: int, send_timeout_s: float):
+        self.ws = ws
+        self.rate = rate
+        self.send_timeout_s = send_timeout_s
+        self.resampler = PCMResampler(rate)
+
+    async def play(self, pcm, sample_rate: int, stop=None):
+        samples = self.resampler.convert(pcm, sample_rate)
+        await asyncio.wait_for(self.ws.send_bytes(samples.tobytes()), self.send_timeout_s)
+
+    def close(self):
+        pass
+
+
+class ClientSession:
+    """接続ごとの入出力。Wake/VAD・ASR・LLM・TTSのエンジンはVoiceAgentのものを共有し、
+    ストリームごとの状態（StreamState・Conversation）はSessionPipelineが持つ
+    """
+
+    def __init__(self, session_id: int, ws: web.WebSocketResponse, va: "VoiceAgent", hello: dict):
+        self.id = session_id
+        self.ws = ws
+        self.config = va.config
+        self.loader = va.loader
+        self.wake_vad = va.wake_vad
+        self.filler = None
+        self.archiver = va.archiver
+        self.input_rate = int(hello.get("sample_rate", self.config.audio.rate))
+        self.player = WebSocketPlayer(
+            ws,
+            int(hello.get("output_rate", self.config.server.output_rate)),
+            self.config.server.send_timeout_s
+        )
+
+
+class SessionPipeline(Pipeline):
+    """WebSocket接続1本分のパイプライン
+
+    受信音声は古いフレームから捨て（wake_vadの購読がDROP_OLDEST）、
+    送信はWebSocketPlayerが待つことでTTS以降のステージに背圧がかかる。
+    """
+
+    def __init__(self, session: ClientSession, bus: Bus):
+        super().__init__(session, bus)
+        self.subs["notify"] = bus.subscribe(
+            WAKE, TRANSCRIPT, AGENT_DONE, PLAYBACK_START, TURN_END,
+            name="notify", maxsize=64, policy=Policy.DROP_OLDEST
+        )
+        self.stream = f"client-{session.id}"
+
+    def _stages(self) -> dict:
+        stages = super()._stages()
+        del stages["monitor"]
+        stages["notify"] = self._notify_stage
+        return stages
+
+    async def _player(self):
+        return self.va.player
+
+    async def _capture_stage(self):
+        """受信したPCMをリサンプリングし、設定のチャンク長に揃えて流す"""
+        rate = self.va.config.audio.rate
+        chunk_size = rate * self.va.config.audio.chunk_ms // 1000
+        pending = np.zeros(0, dtype=np.float32)
+        # メッセージごとに独立して変換すると境界に段差が出て長さもずれるので、接続中は状態を引き継ぐ
+        resampler = StreamResampler(self.va.input_rate, rate)
+        async for msg in self.va.ws:
+            if msg.type == WSMsgType.BINARY:
+                timestamp = time.monotonic()
+                data = msg.data[:len(msg.data) // 2 * 2]
+                pcm = np.frombuffer(data, dtype=np.int16)
+                if self.va.input_rate == rate and len(pending) == 0 and len(pcm) == chunk_size:
+                    # クライアントがチャンク長で送ってくる場合は受信したint16をそのまま使う
+                    self.bus.publish_nowait(Event(AUDIO_FRAME, {"frame": AudioFrame.from_int16(pcm, timestamp)}))
+                    continue
+                samples = resampler.process(int16_to_float32(pcm))
+                pending = np.concatenate([pending, samples])
+                usable = len(pending) // chunk_size * chunk_size
+                for start in range(0, usable, chunk_size):
+                    frame = AudioFrame(pending[start:start + chunk_size], timestamp)
+                    self.bus.publish_nowait(Event(AUDIO_FRAME, {"frame": frame}))
+                pending = pending[usable:]
+            elif msg.type == WSMsgType.TEXT:
+                await self._on_control(json.loads(msg.data))
+            elif msg.type == WSMsgType.ERROR:
+                logger.warning(f"Session {self.va.id}: connection error: {self.va.ws.exception()}")
+                break
+
+    async def _on_control(self, message: dict):
+        state = self.wake_state
+        if message.get("type") != "wake" or state.on_event is None:
+            return
+        if not state.paused and not state.is_awake:
+            # クライアント側でWake Wordを検知済み → 発話待ちへ
+            state.is_awake = True
+            await state.on_event(WAKE)
+
+    async def _notify_stage(self):
+        async for event in self.subs["notify"]:
+            message = {"type": event.type, "turn_id": event.payload["turn_id"]}
+            if event.type == TRANSCRIPT:
+                message["text"] = event.payload["text"]
+            elif event.type == AGENT_DONE:
+                message = {"type": "response", "turn_id": event.payload["turn_id"], "text": event.payload["text"]}
+            elif event.type == TURN_END:
+                message["reason"] = event.payload["reason"]
+            await self.va.ws.send_json(message)
+
+
+class VoiceServer:
+    """WebSocketで複数クライアントを受け付け、接続ごとにSessionPipelineを動かす"""
+
+    def __init__(self, agent: "VoiceAgent", config: ServerConfig):
+        self.va = agent
+        self.config = config
+        self.sessions: dict[int, ClientSession] = {}
+        self.session_ids = itertools.count(1)
+        self.runner: Optional[web.AppRunner] = None
+        SESSIONS.set_function(lambda: len(self.sessions))
+
+    async def _receive_hello(self, ws: web.WebSocketResponse) -> Optional[dict]:
+        try:
+            msg = await ws.receive(timeout=self.config.hello_timeout_s)
+        except asyncio.TimeoutError:
+            return None
+        if msg.type != WSMsgType.TEXT:
+            return None
+        hello = json.loads(msg.data)
+        return hello if hello.get("type") == "hello" else None
+
+    async def _handle_ws(self, request: web.Request) -> web.StreamResponse:
+        if len(self.sessions) >= self.config.max_clients:
+            REJECTED.inc()
+            logger.warning(f"Rejected client {request.remote}: {len(self.sessions)} sessions active")
+            return web.Response(status=503, text="Too many clients")
+
+        ws = web.WebSocketResponse(heartbeat=self.config.heartbeat_s, max_msg_size=self.config.max_message_bytes)
+        await ws.prepare(request)
+        hello = await self._receive_hello(ws)
+        if hello is None:
+            await ws.close(code=4000, message=b"hello expected")
+            return ws
+
+        session = ClientSession(next(self.session_ids), ws, self.va, hello)
+        self.sessions[session.id] = session
+        logger.info(f"Session {session.id} connected from {request.remote} ({len(self.sessions)} active)")
+        bus = Bus()
+        try:
+            await ws.send_json({"type": "ready", "session_id": session.id})
+            await SessionPipeline(session, bus).run()
+        except Exception as e:
+            logger.error(f"Session {session.id} failed: {e}")
+        finally:
+            del self.sessions[session.id]
+            await ws.close()
+            logger.info(f"Session {session.id} closed (queues: {bus.stats()})")
+        return ws
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get(self.config.path, self._handle_ws)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.config.host, self.config.port)
+        await site.start()
+        logger.info(f"Voice server listening on ws://{self.config.host}:{self.config.port}{self.config.path}")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
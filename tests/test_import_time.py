@@ -0,0 +1,10 @@
+"""起動時のimport時間の予算（benchmarks.import_timeと同じ計測）"""
+from benchmarks.import_time import report
+
+BUDGET_MS = 500.0
+
+
+def test_startup_import_budget():
+    result = report("src.app", runs=3, top=10, budget_ms=BUDGET_MS)
+    assert not result["deferred_imported"], f"imported at startup: {result['deferred_imported']}"
+    assert result["import_ms"] <= BUDGET_MS, f"{result['import_ms']}ms, heaviest: {result['direct_imports_ms']}"
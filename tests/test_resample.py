@@ -0,0 +1,47 @@
+"""StreamResampler / PCMResamplerが一括のresample()と一致すること"""
+import numpy as np
+import pytest
+
+from src.audio.format import PCMResampler, StreamResampler, float32_to_int16, int16_to_float32, resample
+
+
+def _random_chunks(samples: np.ndarray, rng: np.random.Generator) -> list[np.ndarray]:
+    chunks = []
+    start = 0
+    while start < len(samples):
+        size = int(rng.integers(0, 700))  # 空チャンクやフィルタ長より短いチャンクも混ぜる
+        chunks.append(samples[start:start + size])
+        start += size
+    return chunks
+
+
+@pytest.mark.parametrize("src_rate,dst_rate", [(22050, 16000), (24000, 16000), (16000, 48000), (44100, 22050)])
+def test_stream_matches_batch(src_rate, dst_rate):
+    rng = np.random.default_rng(src_rate + dst_rate)
+    for _ in range(5):
+        samples = rng.uniform(-0.8, 0.8, int(rng.integers(1, 8000))).astype(np.float32)
+        resampler = StreamResampler(src_rate, dst_rate)
+        out = [resampler.process(chunk) for chunk in _random_chunks(samples, rng)]
+        out.append(resampler.flush())
+        streamed = np.concatenate(out)
+        expected = resample(samples, src_rate, dst_rate)
+        assert len(streamed) == len(expected)
+        np.testing.assert_allclose(streamed, expected, atol=1e-5)
+
+
+def test_pcm_resampler_flushes_tail_on_rate_change():
+    rng = np.random.default_rng(0)
+    first = float32_to_int16(rng.uniform(-0.5, 0.5, 3000).astype(np.float32))
+    second = float32_to_int16(rng.uniform(-0.5, 0.5, 2000).astype(np.float32))
+    converter = PCMResampler(16000)
+    out = np.concatenate([
+        converter.convert(first[:1000].tobytes(), 22050),
+        converter.convert(first[1000:].tobytes(), 22050),
+        converter.convert(second.tobytes(), 16000),  # 出力レートと同じになっても前の残りを出し切る
+    ])
+    expected = np.concatenate([
+        float32_to_int16(resample(int16_to_float32(first), 22050, 16000)),
+        second,
+    ])
+    assert len(out) == len(expected)
+    assert np.abs(out.astype(np.int32) - expected).max() <= 1